@@ -1,37 +1,313 @@
 """Alert evaluation module."""
+import json
 import yaml
-from datetime import datetime
-from typing import Dict, Any, List
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+import sys
+import os
+import time
+
+# Add parent directory to path for db imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import psycopg2
+
+from config.loader import load_config, load_analytics_settings
+from db.conexion import get_connection
+from analytics.detectores import AlmacenDetectores, crear_detector
+from analytics.indice_alertas import ClaveAlerta, IndiceAlertas, PlanAlertas, ahora_utc, clave_alerta
+
+_, alert_settings, _ = load_config()
+analytics_settings = load_analytics_settings()
+
+# Online detector states, persisted between runs
+almacen_detectores = AlmacenDetectores(
+    analytics_settings.resolve_path(analytics_settings.detectores_dir)
+)
+
+# Open alerts, rebuilt from the alerta table on first use
+indice_alertas = IndiceAlertas(alert_settings.cooldown_hours)
+
+# Upper bound on the backlog an online detector replays after a long pause
+MAX_DIAS_DETECTOR = 366
+
+RUTA_REGLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas", "alertas.yaml")
+
+# Whitelists for identifiers interpolated into SQL
+COLUMNAS_NIVEL = {"entidad": "cve_ent", "municipio": "cve_mun"}
+COLUMNAS_SERIE = {"casos": "casos", "defunciones": "defunciones"}
+
+
+class MatrizSerie(NamedTuple):
+    """Daily series of many areas aligned on a common date axis."""
+    filas: List[Tuple[str, Optional[int]]]  # (cve area, morbilidad_id) per row
+    fecha_ini: date
+    valores: np.ndarray  # shape (len(filas), días)
+
+
+def recortar(matriz: MatrizSerie, dias: int) -> MatrizSerie:
+    """Keep only the last ``dias`` days of a series matrix."""
+    sobrantes = matriz.valores.shape[1] - dias
+    if sobrantes <= 0:
+        return matriz
+    return MatrizSerie(
+        matriz.filas,
+        matriz.fecha_ini + timedelta(days=sobrantes),
+        matriz.valores[:, sobrantes:]
+    )
+
+
+def cargar_matriz_serie(
+    conn,
+    serie: str,
+    fecha_fin: date,
+    dias: int,
+    nivel: str = "municipio"
+) -> MatrizSerie:
+    """
+    Load one official series for every area and morbidity into a 2-D array.
+
+    Days without rows are filled with zeros.
+
+    Args:
+        conn: Open PostgreSQL connection
+        serie: "casos" or "defunciones"
+        fecha_fin: Last day of the window (inclusive)
+        dias: Number of days in the window
+        nivel: "entidad" or "municipio"
+
+    Returns:
+        MatrizSerie with one row per (area, morbilidad)
+    """
+    columna_area = COLUMNAS_NIVEL[nivel]
+    columna_serie = COLUMNAS_SERIE[serie]
+    fecha_ini = fecha_fin - timedelta(days=dias - 1)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {columna_area}, morbilidad_id, fecha, SUM({columna_serie})
+            FROM serie_oficial
+            WHERE fecha BETWEEN %s AND %s
+              AND {columna_area} IS NOT NULL
+              AND morbilidad_id IS NOT NULL
+            GROUP BY {columna_area}, morbilidad_id, fecha
+            """,
+            (fecha_ini, fecha_fin)
+        )
+        registros = cur.fetchall()
+
+    if not registros:
+        return MatrizSerie([], fecha_ini, np.zeros((0, dias), dtype=np.float64))
+
+    areas, morbs, fechas, valores = zip(*registros)
+    claves = np.array([f"{a}|{m}" for a, m in zip(areas, morbs)])
+    unicas, fila = np.unique(claves, return_inverse=True)
+    columna = np.fromiter(((f - fecha_ini).days for f in fechas), dtype=np.intp, count=len(fechas))
+
+    matriz = np.zeros((len(unicas), dias), dtype=np.float64)
+    matriz[fila, columna] = np.asarray(valores, dtype=np.float64)
+    filas = [(a, int(m)) for a, m in (u.split("|") for u in unicas)]
+    return MatrizSerie(filas, fecha_ini, matriz)
+
+
+def cargar_matriz_social(
+    conn,
+    fecha_fin: date,
+    dias: int,
+    nivel: str = "entidad"
+) -> Tuple[MatrizSerie, MatrizSerie]:
+    """
+    Load daily relevant mentions and their mean sentiment for every area.
+
+    Args:
+        conn: Open PostgreSQL connection
+        fecha_fin: Last day of the window (inclusive)
+        dias: Number of days in the window
+        nivel: "entidad" or "municipio"
+
+    Returns:
+        Tuple (conteos, sentimiento) with identical rows
+    """
+    columna_area = COLUMNAS_NIVEL[nivel]
+    fecha_ini = fecha_fin - timedelta(days=dias - 1)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {columna_area}, ts::date AS fecha, SUM(conteo),
+                   SUM(sentimiento * conteo) / NULLIF(SUM(conteo), 0)
+            FROM social_menciones
+            WHERE ts >= %s AND ts < %s
+              AND relevancia
+              AND {columna_area} IS NOT NULL
+            GROUP BY {columna_area}, fecha
+            """,
+            (fecha_ini, fecha_fin + timedelta(days=1))
+        )
+        registros = cur.fetchall()
+
+    vacia = MatrizSerie([], fecha_ini, np.zeros((0, dias), dtype=np.float64))
+    if not registros:
+        return vacia, vacia
+
+    areas, fechas, conteos, sentimientos = zip(*registros)
+    unicas, fila = np.unique(np.array(areas), return_inverse=True)
+    columna = np.fromiter(((f - fecha_ini).days for f in fechas), dtype=np.intp, count=len(fechas))
+
+    matriz_conteo = np.zeros((len(unicas), dias), dtype=np.float64)
+    matriz_sentimiento = np.zeros((len(unicas), dias), dtype=np.float64)
+    matriz_conteo[fila, columna] = np.asarray(conteos, dtype=np.float64)
+    matriz_sentimiento[fila, columna] = np.array(
+        [0.0 if v is None else float(v) for v in sentimientos]
+    )
+    filas = [(str(a), None) for a in unicas]
+    return (
+        MatrizSerie(filas, fecha_ini, matriz_conteo),
+        MatrizSerie(filas, fecha_ini, matriz_sentimiento),
+    )
+
+
+def evaluar_incremento_matriz(regla: Dict[str, Any], valores: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the sudden-increase rule (a1) for every row of a series matrix.
+
+    The last column is the current day; the ``ventana_ref`` days before it
+    form the reference moving mean. A row triggers when the current value is
+    at least ``min_casos`` and exceeds the mean by more than ``umbral_delta``
+    (a jump from a zero mean always counts).
+
+    Args:
+        regla: Rule configuration (ventana_ref, umbral_delta, min_casos)
+        valores: Array (filas, días) with at least ventana_ref + 1 days
+
+    Returns:
+        Dictionary of per-row arrays: disparo, actual, promedio, delta
+    """
+    ventana = int(regla["ventana_ref"])
+    actual = valores[:, -1]
+    promedio = valores[:, -1 - ventana:-1].mean(axis=1)
+
+    delta = np.full(actual.shape, np.inf)
+    np.divide(actual - promedio, promedio, out=delta, where=promedio > 0)
+
+    disparo = (actual >= regla["min_casos"]) & (delta > regla["umbral_delta"])
+    return {"disparo": disparo, "actual": actual, "promedio": promedio, "delta": delta}
+
+
+def evaluar_social_matriz(
+    regla: Dict[str, Any],
+    conteos: np.ndarray,
+    sentimiento: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate the social-peak rule (a2) for every row of the mentions matrices.
+
+    A row triggers when today's mentions have a z-score above ``zscore``
+    against the previous ``ventana_ref`` days and the mean sentiment stayed
+    below ``sentimiento_max`` on each of the last ``ventana_dias`` days.
+
+    Args:
+        regla: Rule configuration (ventana_ref, zscore, sentimiento_max, ventana_dias)
+        conteos: Array (filas, días) of daily mentions
+        sentimiento: Array (filas, días) of daily mean sentiment
+
+    Returns:
+        Dictionary of per-row arrays: disparo, actual, promedio, zscore, sentimiento
+    """
+    ventana = int(regla["ventana_ref"])
+    actual = conteos[:, -1]
+    historia = conteos[:, -1 - ventana:-1]
+    promedio = historia.mean(axis=1)
+    desviacion = historia.std(axis=1)
+
+    # A flat history makes any increase infinitely surprising
+    z = np.where(actual > promedio, np.inf, 0.0)
+    np.divide(actual - promedio, desviacion, out=z, where=desviacion > 0)
+
+    recientes = sentimiento[:, -int(regla["ventana_dias"]):]
+    negativo = np.all(recientes < regla["sentimiento_max"], axis=1)
+    return {
+        "disparo": (z > regla["zscore"]) & negativo,
+        "actual": actual,
+        "promedio": promedio,
+        "zscore": z,
+        "sentimiento": recientes.mean(axis=1),
+    }
 
 
 def evaluar_alertas():
     """
     Evaluate alert rules against current data.
     
-    MVP: Placeholder function. Production: Query data and evaluate rules.
+    Rules come from the compiled catalog; each distinct series is fetched
+    once and every rule is evaluated for all areas at once. Triggered
+    conditions are deduplicated against open alerts and all writes of the
+    run are committed in one transaction.
     """
     print(f"[{datetime.now()}] Evaluando alertas...")
     
-    # TODO: Implement actual alert evaluation
-    # 1. Load alert rules from YAML
-    # 2. Query current data from PostgreSQL
-    # 3. Evaluate each rule
-    # 4. Create/update alerts in database
-    # 5. Send notifications if configured
+    evaluadores = catalogo_reglas.obtener()
+    try:
+        conn = get_connection()
+    except psycopg2.OperationalError as e:
+        print(f"[WARNING] Base de datos no disponible, alertas no evaluadas: {e}")
+        return {"status": "error", "alertas_evaluadas": 0, "alertas_activas": 0}
+    
+    disparadas = 0
+    tiempos: Dict[str, float] = {}
+    plan = PlanAlertas()
+    ahora = ahora_utc()
+    try:
+        indice_alertas.asegurar_cargado(conn, ahora)
+        hoy = date.today()
+        datos = cargar_datos_reglas(conn, [ev.requisito_para(hoy) for ev in evaluadores])
+        for evaluador in evaluadores:
+            t0 = time.perf_counter()
+            evidencias = evaluador.evaluar(datos[evaluador.requisito.clave])
+            tiempos[evaluador.id] = round(time.perf_counter() - t0, 4)
+            indice_alertas.planificar(
+                plan, evaluador.id, evaluador.tipo, evaluador.parametros, evidencias, ahora,
+                evaluador.evaluadas
+            )
+            disparadas += len(evidencias)
+        indice_alertas.escribir(conn, plan, ahora)
+        for evaluador in evaluadores:
+            evaluador.confirmar()
+    finally:
+        conn.close()
     
-    print("[INFO] Alertas evaluadas exitosamente (mock)")
-    return {"status": "success", "alertas_evaluadas": 2, "alertas_activas": 1}
+    # TODO: Send notifications if configured
+    for regla_id, segundos in tiempos.items():
+        print(f"[INFO] Regla {regla_id} evaluada en {segundos:.4f}s")
+    print(
+        f"[INFO] Alertas evaluadas: {len(evaluadores)} reglas, {disparadas} disparadas "
+        f"({len(plan.nuevas)} nuevas, {len(plan.actualizadas)} actualizadas, "
+        f"{len(plan.resueltas)} resueltas, {plan.suprimidas} en enfriamiento)"
+    )
+    return {
+        "status": "success",
+        "alertas_evaluadas": len(evaluadores),
+        "alertas_activas": indice_alertas.activas,
+        "alertas_nuevas": len(plan.nuevas),
+        "alertas_resueltas": len(plan.resueltas),
+        "tiempos_por_regla": tiempos,
+    }
 
 
-def cargar_reglas() -> List[Dict[str, Any]]:
+def cargar_reglas(ruta: str = RUTA_REGLAS) -> List[Dict[str, Any]]:
     """
     Load alert rules from YAML configuration.
     
+    Args:
+        ruta: Path to the rules file (defaults to analytics/reglas/alertas.yaml)
+    
     Returns:
         List of alert rule dictionaries
     """
     try:
-        with open("analytics/reglas/alertas.yaml", "r", encoding="utf-8") as f:
+        with open(ruta, "r", encoding="utf-8") as f:
             reglas = yaml.safe_load(f)
         return reglas
     except FileNotFoundError:
@@ -55,22 +331,392 @@ def cargar_reglas() -> List[Dict[str, Any]]:
         ]
 
 
+class Requisito(NamedTuple):
+    """Data a compiled rule needs: one series, at one level, over N days."""
+    fuente: str  # "oficial" or "social"
+    serie: str
+    nivel: str
+    dias: int
+
+    @property
+    def clave(self) -> Tuple[str, str, str]:
+        """Key shared by every rule reading the same series."""
+        return self.fuente, self.serie, self.nivel
+
+
+class Evaluador:
+    """Base class for compiled alert rules."""
+
+    tipo = ""
+
+    # Alert keys evaluated by the last ``evaluar``; None means every key
+    evaluadas: Optional[List[ClaveAlerta]] = None
+
+    def __init__(self, config: Dict[str, Any]):
+        """Compile common rule fields."""
+        self.id = str(config["id"])
+        self.nombre = config.get("nombre", self.id)
+        self.tipo = config.get("tipo") or self.tipo
+        self.parametros: Dict[str, Any] = {}
+
+    @property
+    def requisito(self) -> Requisito:
+        """Series and window this rule reads (a pure function of the rule)."""
+        raise NotImplementedError
+
+    def requisito_para(self, hoy: date) -> Requisito:
+        """Series and window a run on ``hoy`` reads; stateful rules may need a longer backlog."""
+        return self.requisito
+
+    def evaluar(self, datos: Any) -> List[Dict[str, Any]]:
+        """Evaluate the rule for every area and return evidence of triggering ones."""
+        raise NotImplementedError
+
+    def confirmar(self):
+        """Keep state advanced by the last ``evaluar`` (called once its alerts are committed)."""
+
+
+class EvaluadorIncremento(Evaluador):
+    """Sudden increase of an official series against its moving mean (a1)."""
+
+    tipo = "incremento_subito"
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.serie = config.get("serie", "casos")
+        if self.serie not in COLUMNAS_SERIE:
+            raise ValueError(f"Regla {self.id}: serie oficial desconocida '{self.serie}'")
+        self.nivel = config.get("nivel", "municipio")
+        self.parametros = {
+            "ventana_ref": int(config.get("ventana_ref", alert_settings.alert_windows_days)),
+            "umbral_delta": float(config.get("umbral_delta", alert_settings.delta_threshold)),
+            "min_casos": int(config.get("min_casos", alert_settings.min_cases_threshold)),
+        }
+
+    @property
+    def requisito(self) -> Requisito:
+        return Requisito("oficial", self.serie, self.nivel, self.parametros["ventana_ref"] + 1)
+
+    def evaluar(self, datos: MatrizSerie) -> List[Dict[str, Any]]:
+        return evaluar_incremento_areas(self.parametros, recortar(datos, self.requisito.dias), self.nivel)
+
+
+class EvaluadorSocial(Evaluador):
+    """Mentions peak with sustained negative sentiment (a2)."""
+
+    tipo = "pico_social"
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.nivel = config.get("nivel", "entidad")
+        self.parametros = {
+            "ventana_ref": int(config.get("ventana_ref", alert_settings.alert_windows_days)),
+            "zscore": float(config.get("zscore", alert_settings.zscore_threshold)),
+            "sentimiento_max": float(
+                config.get("sentimiento_max", alert_settings.sentiment_negative_threshold)
+            ),
+            "ventana_dias": int(config.get("ventana_dias", 3)),
+        }
+
+    @property
+    def requisito(self) -> Requisito:
+        dias = max(self.parametros["ventana_ref"] + 1, self.parametros["ventana_dias"])
+        return Requisito("social", "menciones", self.nivel, dias)
+
+    def evaluar(self, datos: Tuple[MatrizSerie, MatrizSerie]) -> List[Dict[str, Any]]:
+        conteos, sentimiento = (recortar(m, self.requisito.dias) for m in datos)
+        if not conteos.filas:
+            return []
+        resultado = evaluar_social_matriz(self.parametros, conteos.valores, sentimiento.valores)
+        fecha = conteos.fecha_ini + timedelta(days=conteos.valores.shape[1] - 1)
+        return [
+            {
+                "nivel": self.nivel,
+                "area": conteos.filas[i][0],
+                "fecha": fecha.isoformat(),
+                "menciones_actual": int(resultado["actual"][i]),
+                "menciones_promedio": round(float(resultado["promedio"][i]), 2),
+                "zscore": round(float(resultado["zscore"][i]), 2)
+                if np.isfinite(resultado["zscore"][i]) else None,
+                "sentimiento_promedio": round(float(resultado["sentimiento"][i]), 3),
+            }
+            for i in np.flatnonzero(resultado["disparo"])
+        ]
+
+
+class EvaluadorDetector(Evaluador):
+    """Rule evaluated by an online detector on observations newer than the last run.
+
+    Days already folded into the detector state are not replayed, so late
+    revisions of past days only affect future scores through new data.
+    """
+
+    PARAMETROS = (
+        "ventana_ref", "umbral_delta", "min_casos", "zscore", "lambda", "umbral",
+        "k", "h", "calentamiento", "sentimiento_max", "ventana_dias",
+    )
+
+    def __init__(self, config: Dict[str, Any], almacen: Optional[AlmacenDetectores] = None):
+        self.serie = config.get("serie", "casos")
+        social = self.serie == "menciones"
+        self.tipo = EvaluadorSocial.tipo if social else EvaluadorIncremento.tipo
+        super().__init__(config)
+        if not social and self.serie not in COLUMNAS_SERIE:
+            raise ValueError(f"Regla {self.id}: serie oficial desconocida '{self.serie}'")
+        self.fuente = "social" if social else "oficial"
+        self.nivel = config.get("nivel", "entidad" if social else "municipio")
+        self.parametros = {
+            "detector": config["detector"],
+            "ventana_ref": alert_settings.alert_windows_days,
+            "umbral_delta": alert_settings.delta_threshold,
+            "min_casos": alert_settings.min_cases_threshold,
+            "zscore": alert_settings.zscore_threshold,
+            **{k: config[k] for k in self.PARAMETROS if k in config},
+        }
+        self.detector = crear_detector(config["detector"], self.parametros)
+        self.almacen = almacen if almacen is not None else almacen_detectores
+        self.firma = json.dumps(
+            {"serie": self.serie, "nivel": self.nivel, **self.parametros}, sort_keys=True
+        )
+        self._pendiente: Optional[Tuple[Any, np.ndarray, Dict[str, np.ndarray], np.ndarray]] = None
+
+    @property
+    def requisito(self) -> Requisito:
+        return Requisito(self.fuente, self.serie, self.nivel, self.detector.calentamiento + 1)
+
+    def requisito_para(self, hoy: date) -> Requisito:
+        """Days since the oldest series' last processed day, so a paused run catches up."""
+        estado = self.almacen.obtener(self.id, self.firma)
+        dias = 1 if estado.claves else self.requisito.dias
+        procesadas = estado.ultima[estado.ultima > 0]
+        if len(procesadas):
+            dias = max(dias, hoy.toordinal() - int(procesadas.min()))
+        return self.requisito._replace(dias=min(dias, MAX_DIAS_DETECTOR))
+
+    def evaluar(self, datos: Any) -> List[Dict[str, Any]]:
+        matriz, sentimiento = datos if self.fuente == "social" else (datos, None)
+        estado = self.almacen.obtener(self.id, self.firma)
+
+        # Known series without rows in the window still observe zeros
+        claves_datos = [f"{a}|{m}" for a, m in matriz.filas]
+        claves = list(dict.fromkeys(claves_datos + estado.claves))
+        filas = estado.asegurar_filas(claves, self.detector)
+        n_dias = matriz.valores.shape[1]
+        valores = np.zeros((len(claves), n_dias))
+        valores[:len(claves_datos)] = matriz.valores
+        if sentimiento is not None:
+            sentimientos = np.zeros((len(claves), n_dias))
+            sentimientos[:len(claves_datos)] = sentimiento.valores
+
+        sub = {campo: arreglo[filas] for campo, arreglo in estado.estado.items()}
+        ultima = estado.ultima[filas]
+        previa = ultima.copy()
+        disparo = np.zeros(len(claves), dtype=bool)
+        puntaje = np.zeros(len(claves))
+        referencia = np.zeros(len(claves))
+
+        origen = matriz.fecha_ini.toordinal()
+        for col in range(n_dias):
+            dia = origen + col
+            activo = ultima < dia
+            if not activo.any():
+                continue
+            paso = self.detector.paso(sub, valores[:, col], activo)
+            if sentimiento is not None and "sentimiento_max" in self.parametros:
+                negativo = sentimientos[:, col] < self.parametros["sentimiento_max"]
+                sub["racha"] = np.where(activo, np.where(negativo, sub["racha"] + 1, 0), sub["racha"])
+                paso["disparo"] &= sub["racha"] >= int(self.parametros.get("ventana_dias", 1))
+            disparo = np.where(activo, paso["disparo"], disparo)
+            puntaje = np.where(activo, paso["puntaje"], puntaje)
+            referencia = np.where(activo, paso["referencia"], referencia)
+            ultima = np.where(activo, dia, ultima)
+
+        # Folded into the state only after the run's alerts are committed, so
+        # a failed write scores these days again on the next run
+        self._pendiente = (estado, filas, sub, ultima)
+
+        fin = origen + n_dias - 1
+        fecha = date.fromordinal(fin).isoformat()
+
+        def area_morbilidad(i: int) -> Dict[str, Any]:
+            area, morbilidad_id = claves[i].split("|")
+            return {"area": area, "morbilidad_id": int(morbilidad_id) if morbilidad_id != "None" else None}
+
+        # Only series scored on a new day can clear their open alert; in runs
+        # without new data every series keeps its alert as it is
+        self.evaluadas = [
+            clave_alerta(self.id, area_morbilidad(i))
+            for i in np.flatnonzero((previa < fin) & (ultima == fin))
+        ]
+        evidencias = []
+        for i in np.flatnonzero(disparo & (ultima == fin)):
+            evidencias.append({
+                "nivel": self.nivel,
+                **area_morbilidad(i),
+                "fecha": fecha,
+                "detector": self.parametros["detector"],
+                f"{self.serie}_actual": float(valores[i, -1]),
+                f"{self.serie}_referencia": round(float(referencia[i]), 2),
+                "puntaje": round(float(puntaje[i]), 3) if np.isfinite(puntaje[i]) else None,
+            })
+        return evidencias
+
+    def confirmar(self):
+        """Apply and persist the detector state advanced by the last evaluation."""
+        if self._pendiente is None:
+            return
+        estado, filas, sub, ultima = self._pendiente
+        self._pendiente = None
+        for campo, arreglo in sub.items():
+            estado.estado[campo][filas] = arreglo
+        estado.ultima[filas] = ultima
+        self.almacen.guardar(self.id)
+
+
+TIPOS_EVALUADOR = {
+    EvaluadorIncremento.tipo: EvaluadorIncremento,
+    EvaluadorSocial.tipo: EvaluadorSocial,
+}
+
+
+def compilar_reglas(
+    reglas: List[Dict[str, Any]],
+    almacen: Optional[AlmacenDetectores] = None
+) -> List[Evaluador]:
+    """
+    Compile rule dictionaries into evaluator objects.
+
+    Rules with a ``detector`` key are evaluated online by that detector,
+    keeping its state in ``almacen`` (the persisted production store by
+    default). Otherwise the evaluator type comes from the rule's ``tipo``
+    key, or is inferred from its ``serie`` ("menciones" is social,
+    anything else official).
+
+    Raises:
+        ValueError: If a rule has an unknown type or series
+    """
+    evaluadores = []
+    for regla in reglas:
+        if regla.get("detector"):
+            evaluadores.append(EvaluadorDetector(regla, almacen))
+            continue
+        tipo = regla.get("tipo") or (
+            EvaluadorSocial.tipo if regla.get("serie") == "menciones" else EvaluadorIncremento.tipo
+        )
+        if tipo not in TIPOS_EVALUADOR:
+            raise ValueError(f"Regla {regla.get('id')}: tipo desconocido '{tipo}'")
+        evaluadores.append(TIPOS_EVALUADOR[tipo](regla))
+    return evaluadores
+
+
+class CatalogoReglas:
+    """Compiled rule set, recompiled only when the rules file changes."""
+
+    def __init__(self, ruta: str = RUTA_REGLAS):
+        """Initialize the catalog for a rules file."""
+        self.ruta = ruta
+        self._mtime: Optional[int] = None
+        self._evaluadores: Optional[List[Evaluador]] = None
+
+    def obtener(self) -> List[Evaluador]:
+        """Get the compiled rules, recompiling if the file's mtime changed."""
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._evaluadores is None or mtime != self._mtime:
+            self._evaluadores = compilar_reglas(cargar_reglas(self.ruta))
+            self._mtime = mtime
+            print(f"[INFO] Reglas de alerta compiladas ({len(self._evaluadores)})")
+        return self._evaluadores
+
+
+# Global catalog used by evaluar_alertas
+catalogo_reglas = CatalogoReglas()
+
+
+def cargar_datos_reglas(conn, requisitos: List[Requisito]) -> Dict[Tuple[str, str, str], Any]:
+    """
+    Fetch each distinct series once, over the longest window any rule needs.
+
+    Args:
+        conn: Open PostgreSQL connection
+        requisitos: Requirements declared by the compiled rules
+
+    Returns:
+        Data keyed by Requisito.clave
+    """
+    dias: Dict[Tuple[str, str, str], int] = {}
+    for req in requisitos:
+        dias[req.clave] = max(dias.get(req.clave, 0), req.dias)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(fecha) FROM serie_oficial")
+        fin_oficial = cur.fetchone()[0] or date.today()
+        cur.execute("SELECT MAX(ts)::date FROM social_menciones")
+        fin_social = cur.fetchone()[0] or date.today()
+
+    datos: Dict[Tuple[str, str, str], Any] = {}
+    for (fuente, serie, nivel), n_dias in dias.items():
+        if fuente == "oficial":
+            datos[(fuente, serie, nivel)] = cargar_matriz_serie(conn, serie, fin_oficial, n_dias, nivel)
+        else:
+            datos[(fuente, serie, nivel)] = cargar_matriz_social(conn, fin_social, n_dias, nivel)
+    return datos
+
+
+def evaluar_incremento_areas(
+    regla: Dict[str, Any],
+    matriz: MatrizSerie,
+    nivel: str = "municipio"
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate rule a1 for every area and return the triggering ones.
+
+    Args:
+        regla: Rule configuration
+        matriz: Series loaded with cargar_matriz_serie
+        nivel: Area level of the matrix rows
+
+    Returns:
+        List of evidence dictionaries, one per triggering (area, morbilidad)
+    """
+    if not matriz.filas:
+        return []
+
+    resultado = evaluar_incremento_matriz(regla, matriz.valores)
+    fecha = matriz.fecha_ini + timedelta(days=matriz.valores.shape[1] - 1)
+    evidencias = []
+    for i in np.flatnonzero(resultado["disparo"]):
+        area, morbilidad_id = matriz.filas[i]
+        delta = resultado["delta"][i]
+        evidencias.append({
+            "nivel": nivel,
+            "area": area,
+            "morbilidad_id": morbilidad_id,
+            "fecha": fecha.isoformat(),
+            "casos_actual": int(resultado["actual"][i]),
+            "casos_promedio": round(float(resultado["promedio"][i]), 2),
+            "delta_porcentaje": round(float(delta) * 100, 1) if np.isfinite(delta) else None,
+        })
+    return evidencias
+
+
 def evaluar_regla_incremento(regla: Dict[str, Any], datos: List[Dict[str, Any]]) -> bool:
     """
     Evaluate sudden increase rule.
     
     Args:
         regla: Rule configuration
-        datos: Time series data
+        datos: Time series data (daily, oldest first, with a "casos" key)
     
     Returns:
         True if alert should be triggered
     """
-    # TODO: Implement actual rule evaluation
-    # 1. Calculate moving average for reference window
-    # 2. Compare current value with threshold
-    # 3. Check minimum cases requirement
-    return False
+    if len(datos) < regla["ventana_ref"] + 1:
+        return False
+    valores = np.array([[d.get(regla.get("serie", "casos"), 0) for d in datos]], dtype=np.float64)
+    return bool(evaluar_incremento_matriz(regla, valores)["disparo"][0])
 
 
 def evaluar_regla_social(regla: Dict[str, Any], datos: List[Dict[str, Any]]) -> bool:
@@ -79,29 +725,18 @@ def evaluar_regla_social(regla: Dict[str, Any], datos: List[Dict[str, Any]]) ->
     
     Args:
         regla: Rule configuration
-        datos: Social mentions data
+        datos: Social mentions data (daily, oldest first, with "conteo"
+               and "sentimiento" keys)
     
     Returns:
         True if alert should be triggered
     """
-    # TODO: Implement actual rule evaluation
-    # 1. Calculate z-score for mentions
-    # 2. Check sentiment threshold
-    # 3. Verify sustained negative sentiment
-    return False
-
-
-def crear_alerta(tipo: str, regla: str, evidencia: Dict[str, Any]):
-    """
-    Create a new alert in the database.
-    
-    Args:
-        tipo: Alert type
-        regla: Rule ID that triggered the alert
-        evidencia: Evidence supporting the alert
-    """
-    # TODO: Implement database insert
-    print(f"[INFO] Alerta creada: {tipo} (regla: {regla})")
+    evaluador = EvaluadorSocial({"id": "social", **regla})
+    if len(datos) < evaluador.requisito.dias:
+        return False
+    conteos = np.array([[d.get("conteo", 0) for d in datos]], dtype=np.float64)
+    sentimiento = np.array([[d.get("sentimiento", 0.0) for d in datos]], dtype=np.float64)
+    return bool(evaluar_social_matriz(evaluador.parametros, conteos, sentimiento)["disparo"][0])
 
 
 if __name__ == "__main__":
@@ -110,5 +745,5 @@ if __name__ == "__main__":
     print(result)
     
     # Test rule loading
-    reglas = cargar_reglas()
-    print(f"Reglas cargadas: {len(reglas)}")
+    reglas = catalogo_reglas.obtener()
+    print(f"Reglas cargadas: {[(r.id, r.tipo, r.requisito) for r in reglas]}")
@@ -0,0 +1,401 @@
+"""Historical backtesting of alert rules.
+
+Replays a historical range of ``serie_oficial``/``social_menciones`` and
+reports every alert a rule would have raised, scored against a labeled
+list of outbreaks. Batch rules are evaluated for every day at once using
+cumulative sums along the day axis; online detectors are stepped one day
+at a time over all areas. Parameter grids are swept across a process pool.
+"""
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+# Add parent directory to path for analytics imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from analytics.alertas import (
+    Evaluador,
+    EvaluadorDetector,
+    EvaluadorSocial,
+    MatrizSerie,
+    cargar_matriz_serie,
+    cargar_matriz_social,
+    compilar_reglas,
+)
+from analytics.detectores import AlmacenDetectores, crear_detector
+
+
+class Brote(NamedTuple):
+    """Labeled outbreak used as ground truth."""
+    area: str
+    morbilidad_id: Optional[int]  # None matches every morbidity of the area
+    fecha_ini: date
+    fecha_fin: date
+
+
+def cargar_brotes(ruta: str) -> List[Brote]:
+    """
+    Load labeled outbreaks from a CSV with columns area, morbilidad_id, fecha_ini, fecha_fin.
+
+    An empty ``morbilidad_id`` matches every morbidity of the area.
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        return [
+            Brote(
+                fila["area"],
+                int(fila["morbilidad_id"]) if fila.get("morbilidad_id") else None,
+                date.fromisoformat(fila["fecha_ini"]),
+                date.fromisoformat(fila["fecha_fin"]),
+            )
+            for fila in csv.DictReader(f)
+        ]
+
+
+def _ventanas(valores: np.ndarray, ventana: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum and sum of squares of the ``ventana`` days before each column."""
+    n_dias = valores.shape[1]
+    suma = np.zeros((valores.shape[0], n_dias + 1))
+    cuadrados = np.zeros((valores.shape[0], n_dias + 1))
+    np.cumsum(valores, axis=1, out=suma[:, 1:])
+    np.cumsum(valores * valores, axis=1, out=cuadrados[:, 1:])
+
+    s = np.zeros_like(valores)
+    q = np.zeros_like(valores)
+    s[:, ventana:] = suma[:, ventana:-1] - suma[:, :n_dias - ventana]
+    q[:, ventana:] = cuadrados[:, ventana:-1] - cuadrados[:, :n_dias - ventana]
+    return s, q
+
+
+def disparos_incremento(parametros: Dict[str, Any], valores: np.ndarray) -> np.ndarray:
+    """
+    Rule a1 (``evaluar_incremento_matriz``) evaluated on every day at once.
+
+    Returns:
+        Boolean array (filas, días); days without a full reference window are False
+    """
+    ventana = int(parametros["ventana_ref"])
+    promedio = _ventanas(valores, ventana)[0] / ventana
+
+    delta = np.full(valores.shape, np.inf)
+    np.divide(valores - promedio, promedio, out=delta, where=promedio > 0)
+    disparo = (valores >= parametros["min_casos"]) & (delta > parametros["umbral_delta"])
+    disparo[:, :ventana] = False
+    return disparo
+
+
+def disparos_social(
+    parametros: Dict[str, Any],
+    conteos: np.ndarray,
+    sentimiento: np.ndarray
+) -> np.ndarray:
+    """
+    Rule a2 (``evaluar_social_matriz``) evaluated on every day at once.
+
+    Returns:
+        Boolean array (filas, días); days without a full reference window are False
+    """
+    ventana = int(parametros["ventana_ref"])
+    ventana_dias = int(parametros["ventana_dias"])
+    s, q = _ventanas(conteos, ventana)
+    promedio = s / ventana
+    # (n·Σx² − (Σx)²) / n² is exact for integer counts, so flat histories give 0
+    varianza = np.maximum(ventana * q - s * s, 0.0) / (ventana * ventana)
+    desviacion = np.sqrt(varianza)
+
+    z = np.where(conteos > promedio, np.inf, 0.0)
+    np.divide(conteos - promedio, desviacion, out=z, where=desviacion > 0)
+
+    negativos = np.zeros((conteos.shape[0], conteos.shape[1] + 1))
+    np.cumsum(sentimiento < parametros["sentimiento_max"], axis=1, out=negativos[:, 1:])
+    racha = np.zeros(conteos.shape, dtype=bool)
+    racha[:, ventana_dias - 1:] = (
+        negativos[:, ventana_dias:] - negativos[:, :conteos.shape[1] - ventana_dias + 1]
+    ) == ventana_dias
+
+    disparo = (z > parametros["zscore"]) & racha
+    disparo[:, :max(ventana, ventana_dias - 1)] = False
+    return disparo
+
+
+def disparos_detector(
+    parametros: Dict[str, Any],
+    valores: np.ndarray,
+    sentimiento: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Replay an online detector from an empty state, one day at a time.
+
+    Returns:
+        Boolean array (filas, días)
+    """
+    detector = crear_detector(parametros["detector"], parametros)
+    n_filas, n_dias = valores.shape
+    estado = detector.estado_inicial(n_filas)
+    racha = np.zeros(n_filas, dtype=np.int64)
+    activo = np.ones(n_filas, dtype=bool)
+    disparo = np.zeros(valores.shape, dtype=bool)
+    for col in range(n_dias):
+        paso = detector.paso(estado, valores[:, col], activo)
+        if sentimiento is not None and "sentimiento_max" in parametros:
+            racha = np.where(sentimiento[:, col] < parametros["sentimiento_max"], racha + 1, 0)
+            paso["disparo"] &= racha >= int(parametros.get("ventana_dias", 1))
+        disparo[:, col] = paso["disparo"]
+    return disparo
+
+
+def compilar_regla(regla: Dict[str, Any]) -> Evaluador:
+    """Compile one rule with its own in-memory detector store, apart from production state."""
+    return compilar_reglas([regla], AlmacenDetectores())[0]
+
+
+def disparos_regla(regla: Dict[str, Any], datos: Any) -> np.ndarray:
+    """
+    Daily trigger matrix of one rule over a historical data window.
+
+    Args:
+        regla: Rule configuration as written in alertas.yaml
+        datos: MatrizSerie, or (conteos, sentimiento) for social rules
+
+    Returns:
+        Boolean array (filas, días)
+    """
+    evaluador = compilar_regla(regla)
+    social = evaluador.requisito.fuente == "social"
+    matriz, sentimiento = datos if social else (datos, None)
+    if isinstance(evaluador, EvaluadorDetector):
+        return disparos_detector(
+            evaluador.parametros, matriz.valores,
+            sentimiento.valores if sentimiento is not None else None
+        )
+    if isinstance(evaluador, EvaluadorSocial):
+        return disparos_social(evaluador.parametros, matriz.valores, sentimiento.valores)
+    return disparos_incremento(evaluador.parametros, matriz.valores)
+
+
+def puntuar(
+    disparo: np.ndarray,
+    matriz: MatrizSerie,
+    brotes: List[Brote],
+    desde: Optional[date] = None,
+    margen_dias: int = 14
+) -> Dict[str, Any]:
+    """
+    Score a trigger matrix against labeled outbreaks.
+
+    Consecutive triggering days of one series count as a single alert, as
+    they would update one open alert in production. An alert is a true
+    positive if it starts within ``margen_dias`` before an outbreak of the
+    same area (and morbidity, if labeled) or during it. Lead time is the
+    number of days between the first trigger in that window and the
+    outbreak start (negative when the alert came late).
+
+    Args:
+        disparo: Boolean array (filas, días) aligned with ``matriz``
+        matriz: Series whose rows and dates the triggers refer to
+        brotes: Labeled outbreaks
+        desde: First day to score (earlier days are warm-up only)
+        margen_dias: Days before an outbreak where an alert still counts
+
+    Returns:
+        Dictionary with alert counts, precision, recall and lead-time stats
+    """
+    n_dias = disparo.shape[1]
+    inicio = 0 if desde is None else max((desde - matriz.fecha_ini).days, 0)
+    disparo = disparo.copy()
+    disparo[:, :inicio] = False
+    inicios = disparo.copy()
+    inicios[:, 1:] &= ~disparo[:, :-1]
+
+    filas_area: Dict[str, List[int]] = {}
+    for i, (area, _) in enumerate(matriz.filas):
+        filas_area.setdefault(str(area), []).append(i)
+
+    en_brote = np.zeros(disparo.shape, dtype=bool)
+    anticipaciones: List[int] = []
+    evaluados = 0
+    for brote in brotes:
+        filas = [
+            i for i in filas_area.get(brote.area, [])
+            if brote.morbilidad_id is None or matriz.filas[i][1] == brote.morbilidad_id
+        ]
+        ini = (brote.fecha_ini - matriz.fecha_ini).days
+        fin = (brote.fecha_fin - matriz.fecha_ini).days
+        a, b = max(ini - margen_dias, inicio), min(fin, n_dias - 1)
+        if b < a:
+            continue
+        evaluados += 1
+        if not filas:
+            continue
+        en_brote[filas, a:b + 1] = True
+        dias = np.flatnonzero(disparo[filas, a:b + 1].any(axis=0))
+        if len(dias):
+            anticipaciones.append(ini - (a + int(dias[0])))
+
+    alertas = int(inicios.sum())
+    verdaderas = int((inicios & en_brote).sum())
+    return {
+        "alertas": alertas,
+        "verdaderas": verdaderas,
+        "precision": round(verdaderas / alertas, 4) if alertas else None,
+        "brotes": evaluados,
+        "detectados": len(anticipaciones),
+        "sensibilidad": round(len(anticipaciones) / evaluados, 4) if evaluados else None,
+        "anticipacion_media": round(float(np.mean(anticipaciones)), 2) if anticipaciones else None,
+        "anticipacion_mediana": float(np.median(anticipaciones)) if anticipaciones else None,
+    }
+
+
+def listar_alertas(disparo: np.ndarray, matriz: MatrizSerie, desde: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Every (area, morbilidad, fecha) where the rule would have triggered."""
+    inicio = 0 if desde is None else max((desde - matriz.fecha_ini).days, 0)
+    filas, columnas = np.nonzero(disparo[:, inicio:])
+    return [
+        {
+            "area": matriz.filas[i][0],
+            "morbilidad_id": matriz.filas[i][1],
+            "fecha": (matriz.fecha_ini + timedelta(days=int(c) + inicio)).isoformat(),
+        }
+        for i, c in zip(filas, columnas)
+    ]
+
+
+def cargar_historico(conn, regla: Dict[str, Any], fecha_ini: date, fecha_fin: date) -> Any:
+    """
+    Load the series a rule reads over a historical range plus its warm-up window.
+
+    Returns:
+        MatrizSerie, or (conteos, sentimiento) for social rules
+    """
+    evaluador = compilar_regla(regla)
+    requisito = evaluador.requisito
+    calentamiento = (
+        evaluador.detector.calentamiento if isinstance(evaluador, EvaluadorDetector)
+        else requisito.dias
+    )
+    dias = (fecha_fin - fecha_ini).days + 1 + calentamiento
+    if requisito.fuente == "social":
+        return cargar_matriz_social(conn, fecha_fin, dias, requisito.nivel)
+    return cargar_matriz_serie(conn, requisito.serie, fecha_fin, dias, requisito.nivel)
+
+
+def combinaciones(regla: Dict[str, Any], grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Rule variants for every combination of the parameter grid."""
+    nombres = sorted(grid)
+    return [
+        {**regla, **dict(zip(nombres, valores))}
+        for valores in itertools.product(*(grid[n] for n in nombres))
+    ]
+
+
+# Data installed once per worker process by _inicializar_worker
+_datos: Any = None
+_brotes: List[Brote] = []
+
+
+def _inicializar_worker(datos: Any, brotes: List[Brote]):
+    """Install the historical data and labels in a worker."""
+    global _datos, _brotes
+    _datos, _brotes = datos, brotes
+
+
+def _evaluar_variante(regla: Dict[str, Any], desde: Optional[date], margen_dias: int) -> Dict[str, Any]:
+    """Backtest one rule variant against the installed data (runs inside a worker)."""
+    matriz = _datos if isinstance(_datos, MatrizSerie) else _datos[0]
+    disparo = disparos_regla(regla, _datos)
+    return {"regla": regla, **puntuar(disparo, matriz, _brotes, desde, margen_dias)}
+
+
+def barrer(
+    regla: Dict[str, Any],
+    grid: Dict[str, List[Any]],
+    datos: Any,
+    brotes: List[Brote],
+    desde: Optional[date] = None,
+    margen_dias: int = 14,
+    workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Backtest every parameter combination of a rule.
+
+    Args:
+        regla: Base rule configuration
+        grid: Parameter name -> list of values to try
+        datos: Historical data from cargar_historico
+        brotes: Labeled outbreaks
+        desde: First scored day
+        margen_dias: Days before an outbreak where an alert still counts
+        workers: Worker processes (None for os.cpu_count(), 1 for serial)
+
+    Returns:
+        One score dictionary per variant, best precision/sensitivity first
+    """
+    variantes = combinaciones(regla, grid)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(variantes) == 1:
+        _inicializar_worker(datos, brotes)
+        resultados = [_evaluar_variante(v, desde, margen_dias) for v in variantes]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_inicializar_worker, initargs=(datos, brotes)
+        ) as pool:
+            futuros = [pool.submit(_evaluar_variante, v, desde, margen_dias) for v in variantes]
+            resultados = [futuro.result() for futuro in futuros]
+    return sorted(
+        resultados,
+        key=lambda r: (r["precision"] or 0.0) + (r["sensibilidad"] or 0.0),
+        reverse=True
+    )
+
+
+def _historico_sintetico(n_areas: int, n_dias: int) -> Tuple[MatrizSerie, List[Brote]]:
+    """Poisson baseline per area with injected outbreaks, for benchmarking."""
+    rng = np.random.default_rng(0)
+    inicio = date(2021, 1, 1)
+    base = rng.gamma(2.0, 5.0, size=(n_areas, 1))
+    valores = rng.poisson(base, size=(n_areas, n_dias)).astype(np.float64)
+
+    brotes = []
+    for area in rng.choice(n_areas, size=n_areas // 20, replace=False):
+        ini = int(rng.integers(30, n_dias - 30))
+        duracion = int(rng.integers(7, 21))
+        valores[area, ini:ini + duracion] += rng.poisson(base[area, 0] * 1.5, size=duracion)
+        brotes.append(Brote(
+            f"{area:05d}", 1,
+            inicio + timedelta(days=ini), inicio + timedelta(days=ini + duracion - 1)
+        ))
+    filas = [(f"{a:05d}", 1) for a in range(n_areas)]
+    return MatrizSerie(filas, inicio, valores), brotes
+
+
+if __name__ == "__main__":
+    # Replay three years of synthetic municipal data and sweep rule a1
+    n_areas, n_dias = 2469, 3 * 365
+    matriz, brotes = _historico_sintetico(n_areas, n_dias)
+    regla = {"id": "a1", "tipo": "incremento_subito", "serie": "casos", "nivel": "municipio",
+             "ventana_ref": 14, "umbral_delta": 0.2, "min_casos": 5}
+
+    t0 = time.perf_counter()
+    disparo = disparos_regla(regla, matriz)
+    print(f"Replay a1: {n_areas} áreas x {n_dias} días en {time.perf_counter() - t0:.3f}s")
+    print(puntuar(disparo, matriz, brotes))
+
+    t0 = time.perf_counter()
+    disparo = disparos_regla({**regla, "detector": "cusum", "k": 0.5, "h": 5.0}, matriz)
+    print(f"Replay CUSUM en línea: {time.perf_counter() - t0:.3f}s")
+    print(puntuar(disparo, matriz, brotes))
+
+    grid = {"umbral_delta": [0.2, 0.5, 1.0], "ventana_ref": [7, 14, 28], "min_casos": [5, 10]}
+    t0 = time.perf_counter()
+    resultados = barrer(regla, grid, matriz, brotes)
+    print(f"Barrido de {len(resultados)} variantes en {time.perf_counter() - t0:.3f}s")
+    for r in resultados[:3]:
+        params = {k: r["regla"][k] for k in grid}
+        print(f"  {params}: precisión={r['precision']} sensibilidad={r['sensibilidad']} "
+              f"anticipación={r['anticipacion_media']}")
@@ -0,0 +1,356 @@
+"""Prefix-sum KPI cube.
+
+Stores cumulative cases and deaths indexed by [entidad, morbilidad, día], so
+any date-range total (and any moving average) is the difference of two
+array lookups instead of an aggregate scan over ``serie_oficial``.
+"""
+import json
+import os
+import re
+import shutil
+from datetime import date
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Entity axis is indexed directly by the INEGI integer code (01..32); slot 0 is unused
+N_ENTIDADES = 33
+
+Fecha = Union[str, date]
+
+# Subdirectory holding the arrays of one saved version of the cube
+_GENERACION = "g{:06d}"
+
+
+def _ordinal(fecha: Fecha) -> int:
+    """Convert an ISO date string or date object to a proleptic ordinal."""
+    if isinstance(fecha, str):
+        fecha = date.fromisoformat(fecha[:10])
+    return fecha.toordinal()
+
+
+class CuboKPI:
+    """Cumulative cases/deaths cube with O(1) range queries.
+
+    ``casos[e, m, k]`` holds the cases of entity ``e`` and morbidity index
+    ``m`` accumulated over the days ``[0, k)`` counted from ``fecha_origen``,
+    so the last axis has one more slot than there are days.
+    """
+
+    def __init__(self):
+        """Initialize an empty cube."""
+        self.origen: Optional[int] = None
+        self.morbilidades: List[int] = []
+        self._idx_morb: Dict[int, int] = {}
+        self.casos = np.zeros((N_ENTIDADES, 0, 1), dtype=np.int64)
+        self.defunciones = np.zeros((N_ENTIDADES, 0, 1), dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Shape helpers
+    # ------------------------------------------------------------------
+    @property
+    def n_dias(self) -> int:
+        """Number of days covered by the cube."""
+        return self.casos.shape[2] - 1
+
+    @property
+    def fecha_origen(self) -> Optional[date]:
+        """First day covered by the cube."""
+        return date.fromordinal(self.origen) if self.origen is not None else None
+
+    @property
+    def fecha_fin(self) -> Optional[date]:
+        """Last day covered by the cube."""
+        if self.origen is None or self.n_dias == 0:
+            return None
+        return date.fromordinal(self.origen + self.n_dias - 1)
+
+    def indice_morbilidad(self, morbilidad_id: int) -> Optional[int]:
+        """Return the cube axis index of a morbidity, or None if unknown."""
+        return self._idx_morb.get(int(morbilidad_id))
+
+    def _asegurar_morbilidades(self, ids: Sequence[int]):
+        """Append axis slots for morbidities not seen before."""
+        nuevas = [int(i) for i in dict.fromkeys(ids) if int(i) not in self._idx_morb]
+        if not nuevas:
+            return
+        for morb_id in nuevas:
+            self._idx_morb[morb_id] = len(self.morbilidades)
+            self.morbilidades.append(morb_id)
+        pad = ((0, 0), (0, len(nuevas)), (0, 0))
+        self.casos = np.pad(self.casos, pad)
+        self.defunciones = np.pad(self.defunciones, pad)
+
+    def _asegurar_rango(self, ord_min: int, ord_max: int):
+        """Grow the day axis so that [ord_min, ord_max] is covered."""
+        if self.origen is None:
+            self.origen = ord_min
+        antes = max(0, self.origen - ord_min)
+        despues = max(0, ord_max - (self.origen + self.n_dias - 1))
+        if antes:
+            # Days prepended before the origin start with zero accumulation
+            pad = ((0, 0), (0, 0), (antes, 0))
+            self.casos = np.pad(self.casos, pad)
+            self.defunciones = np.pad(self.defunciones, pad)
+            self.origen -= antes
+        if despues:
+            # New trailing days carry the last cumulative value forward
+            pad = ((0, 0), (0, 0), (0, despues))
+            self.casos = np.pad(self.casos, pad, mode="edge")
+            self.defunciones = np.pad(self.defunciones, pad, mode="edge")
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def actualizar(
+        self,
+        fechas: Sequence[Fecha],
+        cve_ents: Sequence[Union[str, int]],
+        morbilidad_ids: Sequence[int],
+        casos: Sequence[int],
+        defunciones: Sequence[int],
+    ) -> int:
+        """
+        Upsert daily totals into the cube.
+
+        Values are absolute daily totals (not deltas), one row per
+        (fecha, entidad, morbilidad); if a cell is repeated the last row
+        wins. Only the suffix of the day axis that starts at the earliest
+        changed day is touched.
+
+        Args:
+            fechas: Dates of each row
+            cve_ents: Entity codes of each row
+            morbilidad_ids: Morbidity IDs of each row
+            casos: Daily cases of each row
+            defunciones: Daily deaths of each row
+
+        Returns:
+            Number of cells applied
+        """
+        if len(fechas) == 0:
+            return 0
+
+        ords = np.fromiter((_ordinal(f) for f in fechas), dtype=np.int64, count=len(fechas))
+        self._asegurar_rango(int(ords.min()), int(ords.max()))
+        self._asegurar_morbilidades(morbilidad_ids)
+
+        e = np.asarray([int(c) for c in cve_ents], dtype=np.intp)
+        m = np.asarray([self._idx_morb[int(i)] for i in morbilidad_ids], dtype=np.intp)
+        d = (ords - self.origen).astype(np.intp)
+
+        # A repeated cell would add its delta once per row; keep its last row
+        celda = (e * len(self.morbilidades) + m) * (self.n_dias + 1) + d
+        _, desde_final = np.unique(celda[::-1], return_index=True)
+        ultimas = len(celda) - 1 - desde_final
+        e, m, d = e[ultimas], m[ultimas], d[ultimas]
+        d_min = int(d.min())
+
+        for cubo, nuevos in ((self.casos, casos), (self.defunciones, defunciones)):
+            actuales = cubo[e, m, d + 1] - cubo[e, m, d]
+            delta = np.zeros(cubo.shape[:2] + (self.n_dias - d_min,), dtype=np.int64)
+            delta[e, m, d - d_min] = np.asarray(nuevos, dtype=np.int64)[ultimas] - actuales
+            cubo[:, :, d_min + 1:] += np.cumsum(delta, axis=2)
+
+        return len(ultimas)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def _valores(
+        self,
+        cubo: np.ndarray,
+        columnas: Sequence[int],
+        cve_ent: Optional[str],
+        morbilidad_id: Optional[int],
+    ) -> Optional[np.ndarray]:
+        """Cumulative values at the given day columns for an entity/morbidity selection."""
+        # Gather the requested columns first so aggregating over entities or
+        # morbidities costs O(E·M), independent of the number of days
+        sel = cubo[:, :, list(columnas)]
+        if morbilidad_id is not None:
+            idx = self.indice_morbilidad(morbilidad_id)
+            if idx is None:
+                return None
+            sel = sel[:, idx, :]
+        else:
+            sel = sel.sum(axis=1)
+        if cve_ent is not None:
+            return sel[int(cve_ent)]
+        return sel.sum(axis=0)
+
+    def _limites(self, fecha_ini: Optional[Fecha], fecha_fin: Optional[Fecha]) -> Tuple[int, int]:
+        """Translate an inclusive date range into clamped prefix-sum indices."""
+        i = 0 if fecha_ini is None else _ordinal(fecha_ini) - self.origen
+        j = self.n_dias if fecha_fin is None else _ordinal(fecha_fin) - self.origen + 1
+        i = min(max(i, 0), self.n_dias)
+        j = min(max(j, i), self.n_dias)
+        return i, j
+
+    def total(
+        self,
+        cve_ent: Optional[str] = None,
+        morbilidad_id: Optional[int] = None,
+        fecha_ini: Optional[Fecha] = None,
+        fecha_fin: Optional[Fecha] = None,
+    ) -> Tuple[int, int]:
+        """
+        Total cases and deaths over an inclusive date range.
+
+        Args:
+            cve_ent: Entity code, or None for the national total
+            morbilidad_id: Morbidity ID, or None for all morbidities
+            fecha_ini: Start date (inclusive), or None for the cube origin
+            fecha_fin: End date (inclusive), or None for the last day
+
+        Returns:
+            Tuple (casos, defunciones)
+        """
+        if self.origen is None or self.n_dias == 0:
+            return 0, 0
+        i, j = self._limites(fecha_ini, fecha_fin)
+        resultado = []
+        for cubo in (self.casos, self.defunciones):
+            valores = self._valores(cubo, (i, j), cve_ent, morbilidad_id)
+            resultado.append(0 if valores is None else int(valores[1] - valores[0]))
+        return resultado[0], resultado[1]
+
+    def totales_lote(
+        self,
+        cve_ents: Sequence[Optional[str]],
+        morbilidad_ids: Optional[Sequence[int]] = None,
+        fecha_ini: Optional[Fecha] = None,
+        fecha_fin: Optional[Fecha] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Totals of many entity/morbidity pairs over one date range in a single lookup.
+
+        Args:
+            cve_ents: Entity codes; None entries are national totals
+            morbilidad_ids: Morbidity IDs (one column each), or None for a
+                            single column summing all morbidities
+            fecha_ini: Start date (inclusive), or None for the cube origin
+            fecha_fin: End date (inclusive), or None for the last day
+
+        Returns:
+            Tuple (casos, defunciones) of int64 arrays shaped
+            (len(cve_ents), len(morbilidad_ids) or 1); unknown morbidities are 0
+        """
+        columnas = 1 if morbilidad_ids is None else len(morbilidad_ids)
+        if self.origen is None or self.n_dias == 0:
+            vacio = np.zeros((len(cve_ents), columnas), dtype=np.int64)
+            return vacio, vacio.copy()
+        i, j = self._limites(fecha_ini, fecha_fin)
+        filas = np.array([int(e) if e is not None else 0 for e in cve_ents], dtype=np.int64)
+        nacional = np.array([e is None for e in cve_ents], dtype=bool)
+        resultado = []
+        for cubo in (self.casos, self.defunciones):
+            extremos = cubo[:, :, [i, j]]
+            rango = extremos[:, :, 1] - extremos[:, :, 0]  # (entidad, morbilidad)
+            if morbilidad_ids is None:
+                rango = rango.sum(axis=1, keepdims=True)
+            else:
+                idx = np.array([self._idx_morb.get(int(m), -1) for m in morbilidad_ids], dtype=np.int64)
+                rango = np.where(idx >= 0, rango[:, np.maximum(idx, 0)], 0)
+            valores = rango[filas]
+            valores[nacional] = rango.sum(axis=0)
+            resultado.append(valores)
+        return resultado[0], resultado[1]
+
+    def promedio_movil(
+        self,
+        ventana: int,
+        cve_ent: Optional[str] = None,
+        morbilidad_id: Optional[int] = None,
+        fecha_fin: Optional[Fecha] = None,
+    ) -> Tuple[float, float]:
+        """
+        Moving average of daily cases and deaths over the last ``ventana`` days.
+
+        Args:
+            ventana: Window length in days
+            cve_ent: Entity code, or None for the national total
+            morbilidad_id: Morbidity ID, or None for all morbidities
+            fecha_fin: Last day of the window, or None for the last day
+
+        Returns:
+            Tuple (promedio_casos, promedio_defunciones)
+        """
+        if self.origen is None or self.n_dias == 0:
+            return 0.0, 0.0
+        _, j = self._limites(None, fecha_fin)
+        fin = date.fromordinal(self.origen + j - 1) if j > 0 else self.fecha_origen
+        ini = date.fromordinal(fin.toordinal() - ventana + 1)
+        casos, defunciones = self.total(cve_ent, morbilidad_id, ini, fin)
+        return casos / ventana, defunciones / ventana
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def guardar(self, directorio: str):
+        """
+        Persist the cube as plain ``.npy`` arrays plus a JSON metadata file.
+
+        Arrays are written to a new generation subdirectory and then
+        ``meta.json``, which names the generation, is swapped in with one
+        ``os.replace``. A reader going through meta.json therefore never
+        pairs new metadata with old arrays. The previous generation is kept
+        for readers still loading it; older ones are removed.
+        """
+        os.makedirs(directorio, exist_ok=True)
+        meta_path = os.path.join(directorio, "meta.json")
+        previa = None
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                previa = json.load(f).get("generacion")
+        generacion = (previa or 0) + 1
+        destino = os.path.join(directorio, _GENERACION.format(generacion))
+        shutil.rmtree(destino, ignore_errors=True)  # left over by an interrupted save
+        os.makedirs(destino)
+        for nombre, arreglo in (("casos", self.casos), ("defunciones", self.defunciones)):
+            np.save(os.path.join(destino, f"{nombre}.npy"), arreglo)
+
+        meta: Dict[str, Any] = {
+            "origen": self.fecha_origen.isoformat() if self.origen is not None else None,
+            "morbilidades": self.morbilidades,
+            "generacion": generacion,
+        }
+        tmp = os.path.join(directorio, "meta.tmp.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+        conservar = {_GENERACION.format(generacion), _GENERACION.format(previa or 0)}
+        for nombre in os.listdir(directorio):
+            if re.fullmatch(r"g\d{6}", nombre) and nombre not in conservar:
+                shutil.rmtree(os.path.join(directorio, nombre), ignore_errors=True)
+        if previa is not None:
+            # Arrays of the layout without generations, now unreachable
+            for nombre in ("casos.npy", "defunciones.npy"):
+                if os.path.exists(os.path.join(directorio, nombre)):
+                    os.remove(os.path.join(directorio, nombre))
+
+    @classmethod
+    def cargar(cls, directorio: str, mmap_mode: Optional[str] = None) -> "CuboKPI":
+        """
+        Load a persisted cube, or return an empty one if none exists.
+
+        Args:
+            directorio: Directory written by ``guardar``
+            mmap_mode: Optional NumPy memory-map mode (e.g. "r")
+        """
+        cubo = cls()
+        meta_path = os.path.join(directorio, "meta.json")
+        if not os.path.exists(meta_path):
+            return cubo
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        cubo.origen = _ordinal(meta["origen"]) if meta.get("origen") else None
+        cubo.morbilidades = [int(i) for i in meta.get("morbilidades", [])]
+        cubo._idx_morb = {morb_id: i for i, morb_id in enumerate(cubo.morbilidades)}
+        if meta.get("generacion"):
+            directorio = os.path.join(directorio, _GENERACION.format(meta["generacion"]))
+        cubo.casos = np.load(os.path.join(directorio, "casos.npy"), mmap_mode=mmap_mode)
+        cubo.defunciones = np.load(os.path.join(directorio, "defunciones.npy"), mmap_mode=mmap_mode)
+        return cubo
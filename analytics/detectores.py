@@ -0,0 +1,312 @@
+"""Streaming (online) detectors for alert rules.
+
+Each detector keeps a small fixed-size state per series (running
+mean/variance, EWMA, CUSUM accumulators or a moving-window ring buffer)
+that is updated in O(1) per new observation. States of all series of a
+rule are stored as aligned NumPy arrays, so one update step processes a
+whole day for every area at once, and are persisted between runs so only
+observations newer than the last processed day are consumed.
+"""
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+Estado = Dict[str, np.ndarray]
+Paso = Dict[str, np.ndarray]
+
+
+class Detector:
+    """Base class for vectorized online detectors."""
+
+    nombre = ""
+
+    def __init__(self, parametros: Dict[str, Any]):
+        """Store the rule parameters relevant to the detector."""
+        self.parametros = parametros
+
+    @property
+    def calentamiento(self) -> int:
+        """Observations needed before the detector may trigger."""
+        return 2
+
+    def estado_inicial(self, n: int) -> Estado:
+        """State arrays for ``n`` new series."""
+        raise NotImplementedError
+
+    def paso(self, estado: Estado, x: np.ndarray, activo: np.ndarray) -> Paso:
+        """
+        Score one new observation per series and update the state in place.
+
+        Scores are computed against the state *before* the observation.
+
+        Args:
+            estado: State arrays (rows aligned with ``x``)
+            x: New observation per series
+            activo: Mask of series that actually receive an observation
+
+        Returns:
+            Dictionary with per-row ``disparo``, ``puntaje`` and ``referencia``
+        """
+        raise NotImplementedError
+
+
+class DetectorMediaMovil(Detector):
+    """Relative increase over a moving mean kept in a ring buffer (rule a1)."""
+
+    nombre = "media_movil"
+
+    def __init__(self, parametros: Dict[str, Any]):
+        super().__init__(parametros)
+        self.ventana = int(parametros["ventana_ref"])
+        self.umbral = float(parametros["umbral_delta"])
+        self.minimo = float(parametros.get("min_casos", 0))
+
+    @property
+    def calentamiento(self) -> int:
+        return self.ventana
+
+    def estado_inicial(self, n: int) -> Estado:
+        return {
+            "buffer": np.zeros((n, self.ventana)),
+            "suma": np.zeros(n),
+            "pos": np.zeros(n, dtype=np.int64),
+            "n": np.zeros(n, dtype=np.int64),
+        }
+
+    def paso(self, estado: Estado, x: np.ndarray, activo: np.ndarray) -> Paso:
+        media = estado["suma"] / self.ventana
+        delta = np.full(x.shape, np.inf)
+        np.divide(x - media, media, out=delta, where=media > 0)
+        listo = estado["n"] >= self.ventana
+        disparo = activo & listo & (x >= self.minimo) & (delta > self.umbral)
+
+        filas = np.flatnonzero(activo)
+        pos = estado["pos"][filas]
+        estado["suma"][filas] += x[filas] - estado["buffer"][filas, pos]
+        estado["buffer"][filas, pos] = x[filas]
+        estado["pos"][filas] = (pos + 1) % self.ventana
+        estado["n"][filas] += 1
+        return {"disparo": disparo, "puntaje": delta, "referencia": media}
+
+
+class DetectorWelford(Detector):
+    """Z-score against the running mean/variance of the whole history."""
+
+    nombre = "welford"
+
+    def __init__(self, parametros: Dict[str, Any]):
+        super().__init__(parametros)
+        self.umbral = float(parametros["zscore"])
+        self.minimo_n = int(parametros.get("calentamiento", 2))
+
+    @property
+    def calentamiento(self) -> int:
+        return self.minimo_n
+
+    def estado_inicial(self, n: int) -> Estado:
+        return {"n": np.zeros(n), "media": np.zeros(n), "m2": np.zeros(n)}
+
+    @staticmethod
+    def zscore(estado: Estado, x: np.ndarray) -> np.ndarray:
+        """Z-score of ``x`` against the running statistics."""
+        varianza = np.zeros_like(x)
+        np.divide(estado["m2"], estado["n"], out=varianza, where=estado["n"] > 0)
+        desviacion = np.sqrt(varianza)
+        z = np.where(x > estado["media"], np.inf, 0.0)
+        np.divide(x - estado["media"], desviacion, out=z, where=desviacion > 0)
+        return z
+
+    @staticmethod
+    def acumular(estado: Estado, x: np.ndarray, filas: np.ndarray):
+        """Welford update of mean and sum of squared deviations."""
+        estado["n"][filas] += 1
+        d = x[filas] - estado["media"][filas]
+        estado["media"][filas] += d / estado["n"][filas]
+        estado["m2"][filas] += d * (x[filas] - estado["media"][filas])
+
+    def paso(self, estado: Estado, x: np.ndarray, activo: np.ndarray) -> Paso:
+        z = self.zscore(estado, x)
+        referencia = estado["media"].copy()
+        disparo = activo & (estado["n"] >= self.minimo_n) & (z > self.umbral)
+        self.acumular(estado, x, np.flatnonzero(activo))
+        return {"disparo": disparo, "puntaje": z, "referencia": referencia}
+
+
+class DetectorEWMA(Detector):
+    """Exponentially weighted mean/variance; triggers on large standardized jumps."""
+
+    nombre = "ewma"
+
+    def __init__(self, parametros: Dict[str, Any]):
+        super().__init__(parametros)
+        self.lam = float(parametros.get("lambda", 0.3))
+        self.umbral = float(parametros.get("umbral", 3.0))
+        self.minimo_n = int(parametros.get("calentamiento", 7))
+
+    @property
+    def calentamiento(self) -> int:
+        return self.minimo_n
+
+    def estado_inicial(self, n: int) -> Estado:
+        return {"n": np.zeros(n), "media": np.zeros(n), "varianza": np.zeros(n)}
+
+    def paso(self, estado: Estado, x: np.ndarray, activo: np.ndarray) -> Paso:
+        desviacion = np.sqrt(estado["varianza"])
+        z = np.where(x > estado["media"], np.inf, 0.0)
+        np.divide(x - estado["media"], desviacion, out=z, where=desviacion > 0)
+        referencia = estado["media"].copy()
+        disparo = activo & (estado["n"] >= self.minimo_n) & (z > self.umbral)
+
+        filas = np.flatnonzero(activo)
+        primera = estado["n"][filas] == 0
+        d = x[filas] - estado["media"][filas]
+        estado["media"][filas] = np.where(primera, x[filas], estado["media"][filas] + self.lam * d)
+        estado["varianza"][filas] = np.where(
+            primera, 0.0, (1 - self.lam) * (estado["varianza"][filas] + self.lam * d * d)
+        )
+        estado["n"][filas] += 1
+        return {"disparo": disparo, "puntaje": z, "referencia": referencia}
+
+
+class DetectorCUSUM(Detector):
+    """One-sided upper CUSUM of standardized deviations from the running mean."""
+
+    nombre = "cusum"
+
+    def __init__(self, parametros: Dict[str, Any]):
+        super().__init__(parametros)
+        self.k = float(parametros.get("k", 0.5))
+        self.h = float(parametros.get("h", 5.0))
+        self.minimo_n = int(parametros.get("calentamiento", 7))
+
+    @property
+    def calentamiento(self) -> int:
+        return self.minimo_n
+
+    def estado_inicial(self, n: int) -> Estado:
+        return {"n": np.zeros(n), "media": np.zeros(n), "m2": np.zeros(n), "s": np.zeros(n)}
+
+    def paso(self, estado: Estado, x: np.ndarray, activo: np.ndarray) -> Paso:
+        listo = estado["n"] >= self.minimo_n
+        z = np.where(listo, DetectorWelford.zscore(estado, x), 0.0)
+        z = np.minimum(z, self.h + self.k)  # a flat baseline must not poison s with inf
+        s = np.where(activo & listo, np.maximum(0.0, estado["s"] + z - self.k), estado["s"])
+        disparo = activo & (s > self.h)
+        referencia = estado["media"].copy()
+
+        # Restart accumulation after a signal
+        estado["s"] = np.where(disparo, 0.0, s)
+        DetectorWelford.acumular(estado, x, np.flatnonzero(activo))
+        return {"disparo": disparo, "puntaje": s, "referencia": referencia}
+
+
+TIPOS_DETECTOR = {
+    cls.nombre: cls
+    for cls in (DetectorMediaMovil, DetectorWelford, DetectorEWMA, DetectorCUSUM)
+}
+
+
+def crear_detector(nombre: str, parametros: Dict[str, Any]) -> Detector:
+    """
+    Build a detector by name.
+
+    Raises:
+        ValueError: If the detector type is unknown
+    """
+    if nombre not in TIPOS_DETECTOR:
+        raise ValueError(f"Detector desconocido '{nombre}' (opciones: {sorted(TIPOS_DETECTOR)})")
+    return TIPOS_DETECTOR[nombre](parametros)
+
+
+class EstadoRegla:
+    """Persisted detector state of every series of one rule."""
+
+    def __init__(self, firma: str):
+        """Initialize an empty state for a rule signature."""
+        self.firma = firma
+        self.claves: List[str] = []
+        self._idx: Dict[str, int] = {}
+        self.ultima = np.zeros(0, dtype=np.int64)  # last processed day (ordinal) per series
+        self.estado: Estado = {}
+
+    def asegurar_filas(self, claves: List[str], detector: Detector) -> np.ndarray:
+        """
+        Map series keys to state rows, appending fresh rows for new series.
+
+        Returns:
+            Row indices aligned with ``claves``
+        """
+        nuevas = [c for c in claves if c not in self._idx]
+        if nuevas:
+            for clave in nuevas:
+                self._idx[clave] = len(self.claves)
+                self.claves.append(clave)
+            inicial = detector.estado_inicial(len(nuevas))
+            inicial["racha"] = np.zeros(len(nuevas), dtype=np.int64)
+            for campo, valores in inicial.items():
+                previo = self.estado.get(campo)
+                self.estado[campo] = valores if previo is None else np.concatenate([previo, valores])
+            self.ultima = np.concatenate([self.ultima, np.zeros(len(nuevas), dtype=np.int64)])
+        return np.array([self._idx[c] for c in claves], dtype=np.intp)
+
+
+class AlmacenDetectores:
+    """Loads and persists rule states as ``.npz`` arrays plus a JSON index."""
+
+    def __init__(self, directorio: Optional[str] = None):
+        """Initialize a store rooted at ``directorio``, or kept only in memory if None."""
+        self.directorio = directorio
+        self._estados: Dict[str, EstadoRegla] = {}
+
+    def _rutas(self, regla_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directorio, regla_id)
+        return base + ".npz", base + ".json"
+
+    def obtener(self, regla_id: str, firma: str) -> EstadoRegla:
+        """
+        Get a rule's state, loading it from disk on first use.
+
+        A state saved with a different signature (detector or parameters
+        changed) is discarded and the detector warms up again.
+        """
+        estado = self._estados.get(regla_id)
+        if estado is not None and estado.firma == firma:
+            return estado
+
+        estado = EstadoRegla(firma)
+        if self.directorio is None:
+            self._estados[regla_id] = estado
+            return estado
+        ruta_npz, ruta_json = self._rutas(regla_id)
+        if os.path.exists(ruta_json):
+            with open(ruta_json, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("firma") == firma:
+                with np.load(ruta_npz) as arreglos:
+                    estado.estado = {k: arreglos[k] for k in arreglos.files if k != "_ultima"}
+                    estado.ultima = arreglos["_ultima"]
+                estado.claves = meta["claves"]
+                estado._idx = {c: i for i, c in enumerate(estado.claves)}
+            else:
+                print(f"[INFO] Regla {regla_id} cambió, reiniciando detectores")
+        self._estados[regla_id] = estado
+        return estado
+
+    def guardar(self, regla_id: str):
+        """Persist a rule's state atomically (a no-op for in-memory stores)."""
+        if self.directorio is None:
+            return
+        estado = self._estados[regla_id]
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta_npz, ruta_json = self._rutas(regla_id)
+
+        tmp_npz = ruta_npz + ".tmp.npz"
+        np.savez(tmp_npz, _ultima=estado.ultima, **estado.estado)
+        os.replace(tmp_npz, ruta_npz)
+
+        tmp_json = ruta_json + ".tmp"
+        with open(tmp_json, "w", encoding="utf-8") as f:
+            json.dump({"firma": estado.firma, "claves": estado.claves}, f)
+        os.replace(tmp_json, ruta_json)
@@ -0,0 +1,215 @@
+"""In-memory index of open alerts with cooldown and deduplication.
+
+Alerts are keyed by (regla, area, morbilidad_id). The index is rebuilt
+from the ``alerta`` table on first use and kept in sync after each run,
+so deciding whether a triggered condition is new, ongoing, suppressed by
+the cooldown or cleared never requires a per-alert query.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from db.version import incrementar_version
+
+ClaveAlerta = Tuple[str, str, Optional[int]]
+
+SQL_ALERTAS_VIGENTES = """
+    SELECT id, regla, evidencia->>'area', evidencia->>'morbilidad_id',
+           estado, created_at, resolved_at
+    FROM alerta
+    WHERE estado = 'activa' OR resolved_at >= %s
+"""
+
+SQL_INSERTAR = """
+    INSERT INTO alerta (tipo, regla, parametros, evidencia, estado, created_at)
+    VALUES %s
+    RETURNING id
+"""
+
+SQL_ACTUALIZAR = """
+    UPDATE alerta SET evidencia = v.evidencia
+    FROM (VALUES %s) AS v(id, evidencia)
+    WHERE alerta.id = v.id
+"""
+
+SQL_RESOLVER = """
+    UPDATE alerta SET estado = 'resuelta', resolved_at = %s
+    WHERE id = ANY(%s)
+"""
+
+
+def clave_alerta(regla: str, evidencia: Dict[str, Any]) -> ClaveAlerta:
+    """Deduplication key of an alert from its rule and evidence."""
+    morbilidad_id = evidencia.get("morbilidad_id")
+    return (
+        str(regla),
+        str(evidencia.get("area")),
+        int(morbilidad_id) if morbilidad_id is not None else None,
+    )
+
+
+class EntradaAlerta(NamedTuple):
+    """Last known alert for one key."""
+    id: int
+    activa: bool
+    resolved_at: Optional[datetime]
+
+
+class PlanAlertas:
+    """Inserts, evidence updates and resolutions computed for one run."""
+
+    def __init__(self):
+        """Initialize an empty plan."""
+        self.nuevas: List[Tuple[ClaveAlerta, str, Dict[str, Any], Dict[str, Any]]] = []
+        self.actualizadas: List[Tuple[int, Dict[str, Any]]] = []
+        self.resueltas: List[ClaveAlerta] = []
+        self.suprimidas = 0
+
+    @property
+    def vacio(self) -> bool:
+        """Whether the plan writes nothing."""
+        return not (self.nuevas or self.actualizadas or self.resueltas)
+
+
+class IndiceAlertas:
+    """Active and recently resolved alerts keyed by (regla, area, morbilidad)."""
+
+    def __init__(self, cooldown_horas: int):
+        """
+        Initialize an empty index.
+
+        Args:
+            cooldown_horas: Hours after a resolution during which the same
+                            key does not open a new alert
+        """
+        self.cooldown = timedelta(hours=cooldown_horas)
+        self._entradas: Dict[ClaveAlerta, EntradaAlerta] = {}
+        self._cargado = False
+
+    def asegurar_cargado(self, conn, ahora: datetime):
+        """Rebuild the index from the ``alerta`` table on first use."""
+        if self._cargado:
+            return
+        with conn.cursor() as cur:
+            cur.execute(SQL_ALERTAS_VIGENTES, (ahora - self.cooldown,))
+            filas = cur.fetchall()
+        self._entradas = {}
+        # Rows sorted by creation so the newest alert of a key wins
+        for id_, regla, area, morbilidad_id, estado, created_at, resolved_at in sorted(
+            filas, key=lambda f: f[5]
+        ):
+            clave = (regla, str(area), int(morbilidad_id) if morbilidad_id is not None else None)
+            self._entradas[clave] = EntradaAlerta(id_, estado == "activa", resolved_at)
+        self._cargado = True
+        print(f"[INFO] Índice de alertas reconstruido ({len(self._entradas)} vigentes)")
+
+    @property
+    def activas(self) -> int:
+        """Number of open alerts."""
+        return sum(1 for e in self._entradas.values() if e.activa)
+
+    def planificar(
+        self,
+        plan: PlanAlertas,
+        regla: str,
+        tipo: str,
+        parametros: Dict[str, Any],
+        evidencias: List[Dict[str, Any]],
+        ahora: datetime,
+        evaluadas: Optional[Iterable[ClaveAlerta]] = None
+    ):
+        """
+        Add the writes implied by one rule's evaluation to a plan.
+
+        Open alerts of the rule whose key was evaluated but did not trigger
+        are resolved; triggering keys update their open alert, are
+        suppressed inside the cooldown, or open a new alert.
+
+        Args:
+            plan: Plan being accumulated for the run
+            regla: Rule ID
+            tipo: Alert type
+            parametros: Rule parameters stored with new alerts
+            evidencias: Evidence of every triggering area
+            ahora: Evaluation time (timezone-aware)
+            evaluadas: Keys whose condition was evaluated in this run, or
+                       None if every key of the rule was
+        """
+        disparadas: Dict[ClaveAlerta, Dict[str, Any]] = {
+            clave_alerta(regla, evidencia): evidencia for evidencia in evidencias
+        }
+        evaluadas = set(evaluadas) if evaluadas is not None else None
+        for clave, entrada in self._entradas.items():
+            if (
+                clave[0] == regla and entrada.activa and clave not in disparadas
+                and (evaluadas is None or clave in evaluadas)
+            ):
+                plan.resueltas.append(clave)
+
+        for clave, evidencia in disparadas.items():
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.activa:
+                plan.actualizadas.append((entrada.id, evidencia))
+            elif (
+                entrada is not None and entrada.resolved_at is not None
+                and ahora - entrada.resolved_at < self.cooldown
+            ):
+                plan.suprimidas += 1
+            else:
+                plan.nuevas.append((clave, tipo, parametros, evidencia))
+
+    def escribir(self, conn, plan: PlanAlertas, ahora: datetime):
+        """
+        Write a plan in a single transaction and apply it to the index.
+
+        The index is only modified after the commit succeeds, so a failed
+        run leaves it consistent with the table.
+        """
+        if plan.vacio:
+            return
+        ids_resueltas = [self._entradas[clave].id for clave in plan.resueltas]
+        try:
+            with conn.cursor() as cur:
+                ids_nuevas: List[int] = []
+                if plan.nuevas:
+                    filas = execute_values(
+                        cur, SQL_INSERTAR,
+                        [
+                            (tipo, clave[0], Json(parametros), Json(evidencia), "activa", ahora)
+                            for clave, tipo, parametros, evidencia in plan.nuevas
+                        ],
+                        fetch=True
+                    )
+                    ids_nuevas = [fila[0] for fila in filas]
+                if plan.actualizadas:
+                    execute_values(
+                        cur, SQL_ACTUALIZAR,
+                        [(id_, Json(evidencia)) for id_, evidencia in plan.actualizadas],
+                        template="(%s, %s::jsonb)"
+                    )
+                if ids_resueltas:
+                    cur.execute(SQL_RESOLVER, (ahora, ids_resueltas))
+                incrementar_version(cur)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for (clave, _, _, _), id_ in zip(plan.nuevas, ids_nuevas):
+            self._entradas[clave] = EntradaAlerta(id_, True, None)
+        for clave in plan.resueltas:
+            self._entradas[clave] = self._entradas[clave]._replace(activa=False, resolved_at=ahora)
+        self._purgar(ahora)
+
+    def _purgar(self, ahora: datetime):
+        """Forget resolved alerts whose cooldown has expired."""
+        self._entradas = {
+            clave: e for clave, e in self._entradas.items()
+            if e.activa or e.resolved_at is None or ahora - e.resolved_at < self.cooldown
+        }
+
+
+def ahora_utc() -> datetime:
+    """Current timezone-aware time, comparable with TIMESTAMPTZ values."""
+    return datetime.now(timezone.utc)
@@ -1,60 +1,311 @@
 """KPI calculation module."""
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import sys
+import os
+import time
+
+# Add parent directory to path for config/db imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+from config.loader import load_analytics_settings
+from db.conexion import get_connection
+from db.version import incrementar_version
+from analytics.cubo import CuboKPI, N_ENTIDADES
+from analytics.tasas import motor_tasas
+from analytics.paralelo import calcular_kpis_paralelo
+
+analytics_settings = load_analytics_settings()
+
+# Cube shared by every KPI query in this process (lazily loaded from disk)
+_cubo: Optional[CuboKPI] = None
+
+# KPIs as of the cube's last day, keyed by (cve_ent, morbilidad_id or None)
+_kpis_actuales: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = {}
+
+SQL_CAMBIOS_PENDIENTES = """
+    SELECT id, cve_ent, morbilidad_id, fecha_ini, fecha_fin
+    FROM serie_oficial_cambio
+    WHERE NOT procesado
+    ORDER BY id
+    FOR UPDATE SKIP LOCKED
+"""
+
+# Partitions are merged to one range per (entidad, morbilidad) before this
+# query, so the join never matches a serie_oficial row twice
+SQL_AGREGADO_PARTICIONES = """
+    SELECT s.fecha, s.cve_ent, s.morbilidad_id, SUM(s.casos), SUM(s.defunciones)
+    FROM serie_oficial s
+    JOIN unnest(%s::char(2)[], %s::int[], %s::date[], %s::date[])
+         AS p(cve_ent, morbilidad_id, fecha_ini, fecha_fin)
+      ON s.cve_ent = p.cve_ent
+     AND s.morbilidad_id = p.morbilidad_id
+     AND s.fecha BETWEEN p.fecha_ini AND p.fecha_fin
+    GROUP BY s.fecha, s.cve_ent, s.morbilidad_id
+"""
+
+SQL_AGREGADO_COMPLETO = """
+    SELECT fecha, cve_ent, morbilidad_id, SUM(casos), SUM(defunciones)
+    FROM serie_oficial
+    WHERE cve_ent IS NOT NULL AND morbilidad_id IS NOT NULL
+    GROUP BY fecha, cve_ent, morbilidad_id
+"""
+
+Particion = Tuple[str, int, date, date]
+
+
+def obtener_cubo() -> CuboKPI:
+    """
+    Get the process-wide KPI cube, loading it from disk on first use.
+
+    Returns:
+        CuboKPI instance
+    """
+    global _cubo
+    if _cubo is None:
+        _cubo = CuboKPI.cargar(analytics_settings.resolve_path(analytics_settings.cube_dir))
+    return _cubo
+
+
+def obtener_kpis_actuales() -> Dict[Tuple[str, Optional[int]], Dict[str, Any]]:
+    """Get the KPIs computed by the last recalcular_kpis run."""
+    return _kpis_actuales
+
+
+def fusionar_particiones(cambios: List[Tuple]) -> List[Particion]:
+    """
+    Merge change-log entries into one date range per (entidad, morbilidad).
+
+    Args:
+        cambios: Rows (id, cve_ent, morbilidad_id, fecha_ini, fecha_fin)
+
+    Returns:
+        List of (cve_ent, morbilidad_id, fecha_ini, fecha_fin) partitions
+    """
+    rangos: Dict[Tuple[str, int], List[date]] = {}
+    for _, cve_ent, morbilidad_id, fecha_ini, fecha_fin in cambios:
+        rango = rangos.setdefault((cve_ent, morbilidad_id), [fecha_ini, fecha_fin])
+        rango[0] = min(rango[0], fecha_ini)
+        rango[1] = max(rango[1], fecha_fin)
+    return [(ent, morb, ini, fin) for (ent, morb), (ini, fin) in rangos.items()]
+
+
+def _filas_particiones(particiones: List[Particion], agregados: List[Tuple]) -> List[Tuple]:
+    """Expand partitions to one row per day, zero-filling days without data."""
+    valores = {(f, ent, morb): (casos, defs) for f, ent, morb, casos, defs in agregados}
+    filas = []
+    for ent, morb, ini, fin in particiones:
+        for n in range((fin - ini).days + 1):
+            fecha = ini + timedelta(days=n)
+            casos, defs = valores.get((fecha, ent, morb), (0, 0))
+            filas.append((fecha, ent, morb, casos, defs))
+    return filas
+
+
+def sincronizar_cubo(conn) -> Tuple[List[Particion], bool]:
+    """
+    Fold pending serie_oficial changes into the cube.
+
+    Reads the loader's change log, re-aggregates only the affected
+    partitions and marks the entries as processed. An empty cube is built
+    from the whole table instead.
+
+    Args:
+        conn: Open PostgreSQL connection
+
+    Returns:
+        Tuple (partitions touched, whether the cube was fully rebuilt)
+    """
+    cubo = obtener_cubo()
+    completo = cubo.origen is None
+
+    with conn.cursor() as cur:
+        cur.execute(SQL_CAMBIOS_PENDIENTES)
+        pendientes = cur.fetchall()
+        particiones = fusionar_particiones(pendientes)
+
+        if completo:
+            cur.execute(SQL_AGREGADO_COMPLETO)
+            filas = cur.fetchall()
+        elif particiones:
+            cur.execute(SQL_AGREGADO_PARTICIONES, [list(col) for col in zip(*particiones)])
+            filas = _filas_particiones(particiones, cur.fetchall())
+        else:
+            filas = []
+
+        if filas:
+            cubo.actualizar(*zip(*filas))
+            cubo.guardar(analytics_settings.resolve_path(analytics_settings.cube_dir))
+
+        if pendientes:
+            cur.execute(
+                "UPDATE serie_oficial_cambio SET procesado = true WHERE id = ANY(%s)",
+                ([c[0] for c in pendientes],)
+            )
+    conn.commit()
+    return particiones, completo
+
+
+def _registrar_ejecucion(conn, inicio: datetime, resultado: Dict[str, Any], publicar: bool):
+    """
+    Record a KPI run in ingesta_log.
+
+    Args:
+        publicar: Whether the cube changed; only then is the published data
+                  version bumped (it invalidates every ETag and compressed body)
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ingesta_log
+                (fuente, fecha_inicio, fecha_fin, filas_procesadas,
+                 filas_insertadas, duracion_segundos, estado)
+            VALUES ('kpis', %s, now(), %s, %s, %s, 'completado')
+            """,
+            (inicio, resultado["particiones"], resultado["kpis_updated"],
+             resultado["duracion_segundos"])
+        )
+        if publicar:
+            incrementar_version(cur)
+    conn.commit()
 
 
 def recalcular_kpis():
     """
     Recalculate KPIs from official data.
-    
-    MVP: Placeholder function. Production: Query PostgreSQL and calculate.
+
+    Only KPIs of the partitions listed in the loader's change log are
+    recomputed; every KPI is recomputed when the cube is rebuilt, its last
+    day advances (all moving windows shift) or population is reloaded.
     """
-    print(f"[{datetime.now()}] Recalculando KPIs...")
-    
-    # TODO: Implement actual KPI calculation
-    # 1. Query serie_oficial for latest data
-    # 2. Calculate total cases, deaths, active cases
-    # 3. Calculate moving averages (7, 14, 28 days)
-    # 4. Calculate rates per 100k population (using INEGI data)
-    # 5. Store calculated KPIs in cache (Redis) or materialized view
-    
-    print("[INFO] KPIs recalculados exitosamente (mock)")
-    return {"status": "success", "kpis_updated": 32}
-
-
-def calcular_kpis_entidad(cve_ent: str, fecha_ini: str, fecha_fin: str) -> Dict[str, Any]:
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    print(f"[{inicio}] Recalculando KPIs...")
+
+    cubo = obtener_cubo()
+    fecha_fin_previa = cubo.fecha_fin
+    particiones: List[Particion] = []
+    completo = False
+    poblacion_recargada = False
+
+    try:
+        conn = get_connection()
+    except psycopg2.OperationalError as e:
+        conn = None
+        print(f"[WARNING] Base de datos no disponible, usando cubo persistido: {e}")
+
+    try:
+        if conn is not None:
+            particiones, completo = sincronizar_cubo(conn)
+            poblacion_recargada = motor_tasas.asegurar_cargado(conn)
+
+        if cubo.fecha_fin is None:
+            print("[INFO] Cubo KPI vacío, no hay KPIs que recalcular")
+            return {"status": "success", "kpis_updated": 0}
+
+        recalculo_total = (
+            completo or poblacion_recargada or cubo.fecha_fin != fecha_fin_previa
+            or not _kpis_actuales
+        )
+        if recalculo_total:
+            entidades = [f"{cve:02d}" for cve in range(1, N_ENTIDADES)]
+            claves = {(ent, morb) for ent in entidades for morb in [None, *cubo.morbilidades]}
+        else:
+            claves = {(ent, morb) for ent, morb, _, _ in particiones}
+            claves |= {(ent, None) for ent, _ in claves}
+
+        fecha_ini = cubo.fecha_origen.isoformat()
+        fecha_fin = cubo.fecha_fin.isoformat()
+        workers = analytics_settings.workers
+        if recalculo_total and workers > 1:
+            _kpis_actuales.update(calcular_kpis_paralelo(
+                list(claves), fecha_ini, fecha_fin,
+                analytics_settings.resolve_path(analytics_settings.cube_dir), workers
+            ))
+        else:
+            for cve_ent, morbilidad_id in claves:
+                _kpis_actuales[(cve_ent, morbilidad_id)] = calcular_kpis_entidad(
+                    cve_ent, fecha_ini, fecha_fin, morbilidad_id
+                )
+
+        duracion = time.perf_counter() - t0
+        resultado = {
+            "status": "success",
+            "kpis_updated": len(claves),
+            "particiones": len(particiones),
+            "recalculo_completo": completo,
+            "duracion_segundos": round(duracion, 3),
+        }
+        print(
+            f"[INFO] KPIs recalculados al {fecha_fin}: {len(claves)} KPIs, "
+            f"{len(particiones)} particiones en {duracion:.3f}s"
+        )
+        if conn is not None:
+            cambio = bool(particiones) or completo or poblacion_recargada or cubo.fecha_fin != fecha_fin_previa
+            _registrar_ejecucion(conn, inicio, resultado, cambio)
+        return resultado
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def calcular_kpis_entidad(
+    cve_ent: str,
+    fecha_ini: str,
+    fecha_fin: str,
+    morbilidad_id: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Calculate KPIs for a specific entity and date range.
-    
+
+    Every value is a pair of lookups in the prefix-sum cube; rates use the
+    INEGI population of the year of ``fecha_fin``.
+
     Args:
         cve_ent: Entity code (2 digits)
         fecha_ini: Start date (YYYY-MM-DD)
         fecha_fin: End date (YYYY-MM-DD)
-    
+        morbilidad_id: Morbidity ID, or None for all morbidities
+
     Returns:
         Dictionary with calculated KPIs
     """
-    # TODO: Implement database query and calculation
-    return {
+    cubo = obtener_cubo()
+    casos, defunciones = cubo.total(cve_ent, morbilidad_id, fecha_ini, fecha_fin)
+
+    # Active cases: cases reported within the last N days of the range
+    ventana_activos = analytics_settings.active_window_days
+    inicio_activos = (
+        datetime.fromisoformat(fecha_fin) - timedelta(days=ventana_activos - 1)
+    ).date().isoformat()
+    casos_activos, _ = cubo.total(cve_ent, morbilidad_id, max(fecha_ini, inicio_activos), fecha_fin)
+
+    anio = int(fecha_fin[:4])
+    kpis = {
         "cve_ent": cve_ent,
-        "casos_totales": 0,
-        "defunciones_totales": 0,
-        "casos_activos": 0,
-        "tasa_casos_100k": 0.0,
-        "tasa_defunciones_100k": 0.0,
-        "promedio_movil_7d": 0.0,
-        "promedio_movil_14d": 0.0
+        "morbilidad_id": morbilidad_id,
+        "casos_totales": casos,
+        "defunciones_totales": defunciones,
+        "casos_activos": casos_activos,
+        "tasa_casos_100k": round(motor_tasas.tasa_100k(casos, cve_ent, anio), 2),
+        "tasa_defunciones_100k": round(motor_tasas.tasa_100k(defunciones, cve_ent, anio), 2),
     }
+    for ventana in analytics_settings.moving_window_days:
+        promedio, _ = cubo.promedio_movil(ventana, cve_ent, morbilidad_id, fecha_fin)
+        kpis[f"promedio_movil_{ventana}d"] = round(promedio, 2)
+    return kpis
 
 
 def calcular_sentimiento_agregado(fecha_ini: str, fecha_fin: str) -> Dict[str, Any]:
     """
     Calculate aggregated sentiment from social mentions.
-    
+
     Args:
         fecha_ini: Start date (YYYY-MM-DD)
         fecha_fin: End date (YYYY-MM-DD)
-    
+
     Returns:
         Dictionary with sentiment metrics
     """
@@ -0,0 +1,144 @@
+"""Parallel KPI computation sharded by entity.
+
+Each worker process memory-maps the persisted KPI cube read-only instead of
+receiving a pickled copy, so all workers share the same pages of the OS
+page cache. Only the small per-entity task descriptions and KPI results
+cross process boundaries.
+"""
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+# Add parent directory to path for analytics imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from analytics.cubo import CuboKPI, N_ENTIDADES
+from analytics.tasas import motor_tasas
+
+ClaveKPI = Tuple[str, Optional[int]]
+
+
+def _inicializar_worker(cubo_dir: str, anios: List[int], poblacion_entidades: np.ndarray):
+    """Install the memory-mapped cube and population vectors in a worker."""
+    from analytics import kpis
+
+    kpis._cubo = CuboKPI.cargar(cubo_dir, mmap_mode="r")
+    motor_tasas.establecer(anios, poblacion_entidades)
+
+
+def _kpis_entidad(
+    cve_ent: str,
+    morbilidades: List[Optional[int]],
+    fecha_ini: str,
+    fecha_fin: str
+) -> List[Dict[str, Any]]:
+    """Compute the KPIs of one entity shard (runs inside a worker)."""
+    from analytics import kpis
+
+    return [
+        kpis.calcular_kpis_entidad(cve_ent, fecha_ini, fecha_fin, morbilidad_id)
+        for morbilidad_id in morbilidades
+    ]
+
+
+def calcular_kpis_paralelo(
+    claves: List[ClaveKPI],
+    fecha_ini: str,
+    fecha_fin: str,
+    cubo_dir: str,
+    workers: int
+) -> Dict[ClaveKPI, Dict[str, Any]]:
+    """
+    Compute KPIs across a process pool, one task per entity.
+
+    The cube must already be persisted in ``cubo_dir``.
+
+    Args:
+        claves: (cve_ent, morbilidad_id) pairs to compute
+        fecha_ini: Start date (YYYY-MM-DD)
+        fecha_fin: End date (YYYY-MM-DD)
+        cubo_dir: Directory of the persisted cube
+        workers: Number of worker processes
+
+    Returns:
+        Dictionary of KPIs keyed by (cve_ent, morbilidad_id)
+    """
+    por_entidad: Dict[str, List[Optional[int]]] = {}
+    for cve_ent, morbilidad_id in claves:
+        por_entidad.setdefault(cve_ent, []).append(morbilidad_id)
+
+    resultado: Dict[ClaveKPI, Dict[str, Any]] = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_inicializar_worker,
+        initargs=(cubo_dir, motor_tasas.anios, motor_tasas.entidades)
+    ) as pool:
+        futuros = [
+            pool.submit(_kpis_entidad, cve_ent, morbilidades, fecha_ini, fecha_fin)
+            for cve_ent, morbilidades in por_entidad.items()
+        ]
+        for futuro in futuros:
+            for kpi in futuro.result():
+                resultado[(kpi["cve_ent"], kpi["morbilidad_id"])] = kpi
+    return resultado
+
+
+def _cubo_sintetico(n_morbilidades: int, n_dias: int) -> CuboKPI:
+    """Build a random national cube for benchmarking."""
+    rng = np.random.default_rng(0)
+    cubo = CuboKPI()
+    inicio = date(2020, 1, 1)
+    ents, morbs, fechas = np.meshgrid(
+        np.arange(1, N_ENTIDADES), np.arange(1, n_morbilidades + 1), np.arange(n_dias),
+        indexing="ij"
+    )
+    n = ents.size
+    cubo.actualizar(
+        [inicio + timedelta(days=int(d)) for d in fechas.ravel()],
+        ents.ravel(),
+        morbs.ravel(),
+        rng.poisson(20, n),
+        rng.poisson(1, n),
+    )
+    return cubo
+
+
+def benchmark(n_morbilidades: int = 40, n_dias: int = 3 * 365):
+    """Compare serial and parallel full recomputes for 1..cpu_count workers."""
+    from analytics import kpis
+
+    print(f"Construyendo cubo sintético: 32 entidades x {n_morbilidades} morbilidades x {n_dias} días")
+    cubo = _cubo_sintetico(n_morbilidades, n_dias)
+    cubo_dir = tempfile.mkdtemp(prefix="cubo_bench_")
+    cubo.guardar(cubo_dir)
+    kpis._cubo = cubo
+
+    fecha_ini, fecha_fin = cubo.fecha_origen.isoformat(), cubo.fecha_fin.isoformat()
+    claves = [
+        (f"{cve:02d}", morb)
+        for cve in range(1, N_ENTIDADES)
+        for morb in [None, *cubo.morbilidades]
+    ]
+
+    t0 = time.perf_counter()
+    for cve_ent, morb in claves:
+        kpis.calcular_kpis_entidad(cve_ent, fecha_ini, fecha_fin, morb)
+    serial = time.perf_counter() - t0
+    print(f"{'workers':>8} {'segundos':>10} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:>10.3f} {1.0:>8.2f}")
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        t0 = time.perf_counter()
+        calcular_kpis_paralelo(claves, fecha_ini, fecha_fin, cubo_dir, workers)
+        duracion = time.perf_counter() - t0
+        print(f"{workers:>8} {duracion:>10.3f} {serial / duracion:>8.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
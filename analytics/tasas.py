@@ -0,0 +1,256 @@
+"""Population-normalized rates (per 100k inhabitants).
+
+INEGI population is loaded once into NumPy vectors indexed by the integer
+INEGI codes, the same indexing used by the KPI cube, so rates for every
+area are computed in a single vectorized division.
+"""
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Union
+import sys
+import os
+
+# Add parent directory to path for analytics imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from analytics.cubo import N_ENTIDADES
+
+# Municipality axis is indexed by the 5-digit INEGI code (entity * 1000 + municipality)
+N_MUNICIPIOS = N_ENTIDADES * 1000
+
+SQL_POBLACION = """
+    SELECT anio, cve_ent, cve_mun, poblacion
+    FROM poblacion
+    ORDER BY anio
+"""
+
+# Watermark of the population rows: changes whenever any row is added,
+# removed or updated, whether or not the writer touched updated_at
+SQL_MARCA_POBLACION = """
+    SELECT md5(string_agg(concat_ws(':', anio, cve_ent, cve_mun, poblacion), ','
+                          ORDER BY anio, cve_ent, cve_mun))
+    FROM poblacion
+"""
+
+
+class MotorTasas:
+    """Per-100k rate engine with precomputed population denominators."""
+
+    def __init__(self):
+        """Initialize an engine with no population loaded."""
+        self.anios: List[int] = []
+        self.entidades = np.zeros((0, N_ENTIDADES), dtype=np.float64)
+        self.municipios = np.zeros((0, N_MUNICIPIOS), dtype=np.float64)
+        self.marca: Optional[str] = None
+        self._vigente = False
+        self._comprobar_marca = False
+
+    def cargar(self, conn):
+        """
+        Load the population table into aligned vectors.
+
+        Entity totals missing from the table are derived from the sum of
+        their municipalities.
+
+        Args:
+            conn: Open PostgreSQL connection
+        """
+        with conn.cursor() as cur:
+            cur.execute(SQL_MARCA_POBLACION)
+            marca = cur.fetchone()[0]
+            cur.execute(SQL_POBLACION)
+            self.cargar_filas(cur.fetchall(), marca)
+
+    def cargar_filas(self, filas: Sequence[Sequence[Any]], marca: Optional[str] = None):
+        """
+        Build the vectors from ``SQL_POBLACION`` rows (e.g. fetched by asyncpg).
+
+        Args:
+            filas: (anio, cve_ent, cve_mun, poblacion) rows
+            marca: ``SQL_MARCA_POBLACION`` watermark of the same rows
+        """
+        anios = sorted({int(f[0]) for f in filas})
+        idx_anio = {anio: i for i, anio in enumerate(anios)}
+        entidades = np.zeros((len(anios), N_ENTIDADES), dtype=np.float64)
+        municipios = np.zeros((len(anios), N_MUNICIPIOS), dtype=np.float64)
+
+        for anio, cve_ent, cve_mun, poblacion in filas:
+            if cve_mun:
+                municipios[idx_anio[int(anio)], int(cve_mun)] = poblacion
+            else:
+                entidades[idx_anio[int(anio)], int(cve_ent)] = poblacion
+
+        desde_mun = municipios.reshape(len(anios), N_ENTIDADES, 1000).sum(axis=2)
+        entidades = np.where(entidades > 0, entidades, desde_mun)
+
+        self.establecer(anios, entidades, municipios)
+        self.marca = marca
+        print(f"[INFO] Población INEGI cargada ({len(filas)} registros, años {anios})")
+
+    def establecer(
+        self,
+        anios: List[int],
+        entidades: np.ndarray,
+        municipios: Optional[np.ndarray] = None
+    ):
+        """
+        Install precomputed population vectors (e.g. in a worker process).
+
+        Args:
+            anios: Sorted census years, one row per year in the matrices
+            entidades: Matrix (años, N_ENTIDADES)
+            municipios: Matrix (años, N_MUNICIPIOS), or None to leave empty
+        """
+        self.anios = list(anios)
+        self.entidades = entidades
+        self.municipios = (
+            municipios if municipios is not None
+            else np.zeros((len(self.anios), N_MUNICIPIOS), dtype=np.float64)
+        )
+        self._vigente = True
+
+    @property
+    def cargado(self) -> bool:
+        """Whether any population has been loaded."""
+        return bool(self.anios)
+
+    def marcar_desactualizado(self):
+        """Force a reload on the next ``asegurar_cargado`` call."""
+        self._vigente = False
+
+    def notificar_inegi(self, resultado: Dict[str, Any]):
+        """
+        React to a ``fetch_inegi`` run.
+
+        New indicators do not necessarily touch population, so they only
+        schedule a watermark check: the next ``asegurar_cargado`` reloads
+        the vectors only if the ``poblacion`` rows actually changed.
+
+        Args:
+            resultado: Dictionary returned by ``fetch_inegi``
+        """
+        if resultado.get("indicadores_actualizados", 0) > 0:
+            self._comprobar_marca = True
+
+    def asegurar_cargado(self, conn) -> bool:
+        """
+        Load population if it was never loaded, was invalidated, or changed since loaded.
+
+        Returns:
+            True if the vectors were (re)loaded
+        """
+        if self._vigente and self._comprobar_marca:
+            self._comprobar_marca = False
+            with conn.cursor() as cur:
+                cur.execute(SQL_MARCA_POBLACION)
+                if cur.fetchone()[0] != self.marca:
+                    self.marcar_desactualizado()
+        if self._vigente:
+            return False
+        self.cargar(conn)
+        return True
+
+    def poblacion(self, nivel: str = "entidad", anio: Optional[int] = None) -> np.ndarray:
+        """
+        Population vector for a year.
+
+        The latest census year not after ``anio`` is used (or the earliest
+        available one if ``anio`` predates every year loaded).
+
+        Args:
+            nivel: "entidad" or "municipio"
+            anio: Reference year, or None for the latest
+
+        Returns:
+            Vector indexed by integer INEGI code
+        """
+        matriz = self.entidades if nivel == "entidad" else self.municipios
+        if not self.anios:
+            return np.zeros(matriz.shape[1], dtype=np.float64)
+        if anio is None:
+            return matriz[-1]
+        i = int(np.searchsorted(self.anios, anio, side="right")) - 1
+        return matriz[max(i, 0)]
+
+    def tasas_100k(
+        self,
+        conteos: np.ndarray,
+        nivel: str = "entidad",
+        anio: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Rates per 100k inhabitants for every area at once.
+
+        Args:
+            conteos: Counts indexed by integer INEGI code along the last axis
+                     (extra leading axes, e.g. casos/defunciones, broadcast)
+            nivel: "entidad" or "municipio"
+            anio: Reference year for the population
+
+        Returns:
+            Array of rates; areas without population get 0.0
+        """
+        poblacion = self.poblacion(nivel, anio)
+        conteos = np.asarray(conteos, dtype=np.float64)
+        resultado = np.zeros(np.broadcast(conteos, poblacion).shape, dtype=np.float64)
+        np.divide(conteos * 100_000, poblacion, out=resultado, where=poblacion > 0)
+        return resultado
+
+    def tasa_100k(
+        self,
+        conteo: Union[int, float],
+        cve_ent: Optional[str] = None,
+        anio: Optional[int] = None
+    ) -> float:
+        """
+        Rate per 100k for a single entity, or national if ``cve_ent`` is None.
+        """
+        poblacion = self.poblacion("entidad", anio)
+        total = poblacion[int(cve_ent)] if cve_ent is not None else poblacion.sum()
+        return float(conteo) * 100_000 / total if total > 0 else 0.0
+
+    def tasas_por_clave(
+        self,
+        claves: Sequence[Optional[str]],
+        conteos: Any,
+        nivel: str = "entidad",
+        anio: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Rates per 100k of a list of areas given by INEGI code.
+
+        Args:
+            claves: Entity (or municipality) codes; None is the national total
+            conteos: Counts with one row per code (extra columns, e.g.
+                     casos/defunciones or morbidities, share the denominator)
+            nivel: "entidad" or "municipio"
+            anio: Reference year for the population
+
+        Returns:
+            Array shaped (len(claves), columns); areas without population get 0.0
+        """
+        if not len(claves):
+            return np.zeros((0, 1), dtype=np.float64)
+        poblacion = self.poblacion(nivel, anio)
+        denominador = np.array(
+            [poblacion.sum() if c is None else poblacion[int(c)] for c in claves], dtype=np.float64
+        ).reshape(-1, 1)
+        conteos = np.asarray(conteos, dtype=np.float64).reshape(len(claves), -1)
+        resultado = np.zeros(conteos.shape, dtype=np.float64)
+        np.divide(conteos * 100_000, denominador, out=resultado, where=denominador > 0)
+        return resultado
+
+
+# Global instance shared by KPI calculations
+motor_tasas = MotorTasas()
+
+
+if __name__ == "__main__":
+    # Test vectorized rates with synthetic population
+    motor = MotorTasas()
+    poblacion = np.full((1, N_ENTIDADES), 1_000_000.0)
+    poblacion[0, 0] = 0
+    motor.establecer([datetime.now().year], poblacion)
+    casos = np.arange(N_ENTIDADES) * 10
+    print(f"Tasas por 100k: {motor.tasas_100k(casos)[:5]}")
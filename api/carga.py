@@ -0,0 +1,179 @@
+"""Load test for the read endpoints.
+
+Runs a fixed number of concurrent clients against a running API for a
+given duration and reports throughput and latency percentiles per
+endpoint. Example (API started with 2 uvicorn/gunicorn workers):
+
+    python api/carga.py --url http://localhost:8000 --concurrencia 50 --duracion 30 --workers 2
+
+``--mezcla mixta`` adds dashboard traffic against the unified app (page,
+layout and every server-side callback, with the layout's initial values)
+to compare how the dashboard serving modes (api/montaje.py) share the
+process with the API; run it once per mode:
+
+    EP_DASHBOARD_WSGI_MODE=compartido gunicorn api.unified:app ...
+    python api/carga.py --mezcla mixta
+    EP_DASHBOARD_WSGI_MODE=aislado gunicorn api.unified:app ...
+    python api/carga.py --mezcla mixta
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+# (method, path, JSON body) requested round-robin by every client
+PETICIONES: List[Tuple[str, str, Dict]] = [
+    ("POST", "/api/v1/kpi", {"entidad": "31"}),
+    ("GET", "/api/v1/timeseries?entidad=31", None),
+    ("GET", "/api/v1/map/entidad", None),
+    ("GET", "/api/v1/alerts", None),
+    ("GET", "/api/v1/bulletin/1", None),
+]
+
+DASH_CALLBACK = "/_dash-update-component"
+
+
+def _valores_layout(nodo: Any, valores: Dict[Tuple[str, str], Any]):
+    """Collect (component id, prop) -> initial value from a Dash layout tree."""
+    if isinstance(nodo, list):
+        for hijo in nodo:
+            _valores_layout(hijo, valores)
+    elif isinstance(nodo, dict):
+        props = nodo.get("props")
+        if isinstance(props, dict):
+            if isinstance(props.get("id"), str):
+                for prop, valor in props.items():
+                    valores[(props["id"], prop)] = valor
+            for valor in props.values():
+                _valores_layout(valor, valores)
+
+
+def _salidas(output: str) -> Any:
+    """Decode a dependency's output string ("id.prop" or "..a.x...b.y..")."""
+    if output.startswith(".."):
+        return [dict(zip(("id", "property"), o.rsplit(".", 1))) for o in output[2:-2].split("...")]
+    id_, prop = output.rsplit(".", 1)
+    return {"id": id_, "property": prop}
+
+
+async def peticiones_dashboard(http: httpx.AsyncClient) -> List[Tuple[str, str, Optional[Dict]]]:
+    """
+    Dashboard requests: page, layout and one request per server-side callback.
+
+    Callbacks with pattern-matching ids are skipped.
+    """
+    layout = (await http.get("/_dash-layout")).json()
+    dependencias = (await http.get("/_dash-dependencies")).json()
+    valores: Dict[Tuple[str, str], Any] = {}
+    _valores_layout(layout, valores)
+
+    def argumentos(lista):
+        return [{"id": a["id"], "property": a["property"], "value": valores.get((a["id"], a["property"]))}
+                for a in lista]
+
+    peticiones: List[Tuple[str, str, Optional[Dict]]] = [
+        ("GET", "/", None), ("GET", "/_dash-layout", None),
+    ]
+    for dep in dependencias:
+        ids = [a["id"] for a in dep["inputs"] + dep.get("state", [])]
+        if dep.get("clientside_function") or not all(isinstance(i, str) for i in ids) or "{" in dep["output"]:
+            continue
+        peticiones.append(("POST", DASH_CALLBACK, {
+            "output": dep["output"],
+            "outputs": _salidas(dep["output"]),
+            "inputs": argumentos(dep["inputs"]),
+            "changedPropIds": [],
+            "state": argumentos(dep.get("state", [])),
+        }))
+    return peticiones
+
+
+async def _cliente(
+    http: httpx.AsyncClient,
+    peticiones: List[Tuple[str, str, Optional[Dict]]],
+    fin: float,
+    desfase: int,
+    latencias: Dict[str, List[float]],
+    errores: Dict[str, int]
+):
+    """Issue requests back to back until ``fin``."""
+    i = desfase
+    while time.perf_counter() < fin:
+        metodo, ruta, cuerpo = peticiones[i % len(peticiones)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await http.request(metodo, ruta, json=cuerpo)
+            ok = r.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencias[ruta].append(time.perf_counter() - t0)
+        else:
+            errores[ruta] += 1
+
+
+async def ejecutar(
+    url: str,
+    concurrencia: int,
+    duracion: float,
+    mezcla: str = "api"
+) -> Tuple[Dict[str, List[float]], Dict[str, int]]:
+    """
+    Run the load test.
+
+    Args:
+        mezcla: "api" (read endpoints only) or "mixta" (API and dashboard
+            requests interleaved, about one dashboard request per API request)
+
+    Returns:
+        Tuple (latencias por ruta en segundos, errores por ruta)
+    """
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as http:
+        peticiones = list(PETICIONES)
+        if mezcla == "mixta":
+            dashboard = await peticiones_dashboard(http)
+            peticiones = [p for par in zip(peticiones * len(dashboard), dashboard * len(peticiones)) for p in par]
+        latencias: Dict[str, List[float]] = {ruta: [] for _, ruta, _ in peticiones}
+        errores: Dict[str, int] = {ruta: 0 for _, ruta, _ in peticiones}
+        fin = time.perf_counter() + duracion
+        await asyncio.gather(*(
+            _cliente(http, peticiones, fin, i, latencias, errores) for i in range(concurrencia)
+        ))
+    return latencias, errores
+
+
+def reportar(latencias: Dict[str, List[float]], errores: Dict[str, int], duracion: float, workers: int):
+    """Print requests/sec and p50/p99 latency per endpoint."""
+    print(f"{'ruta':<32} {'req/s':>8} {'req/s/w':>8} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    todas: List[float] = []
+    for ruta, valores in latencias.items():
+        todas.extend(valores)
+        if not valores:
+            print(f"{ruta:<32} {0:>8} {0:>8} {'-':>8} {'-':>8} {errores[ruta]:>8}")
+            continue
+        p50, p99 = np.percentile(valores, [50, 99]) * 1000
+        rps = len(valores) / duracion
+        print(f"{ruta:<32} {rps:>8.1f} {rps / workers:>8.1f} {p50:>8.1f} {p99:>8.1f} {errores[ruta]:>8}")
+    if todas:
+        p50, p99 = np.percentile(todas, [50, 99]) * 1000
+        rps = len(todas) / duracion
+        print(f"{'total':<32} {rps:>8.1f} {rps / workers:>8.1f} {p50:>8.1f} {p99:>8.1f} {sum(errores.values()):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de Episcopio")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=30.0, help="segundos")
+    parser.add_argument("--workers", type=int, default=1, help="workers de la API (para req/s por worker)")
+    parser.add_argument("--mezcla", choices=("api", "mixta"), default="api",
+                        help="mixta: intercala peticiones del dashboard (app unificada)")
+    args = parser.parse_args()
+
+    latencias, errores = asyncio.run(ejecutar(args.url, args.concurrencia, args.duracion, args.mezcla))
+    reportar(latencias, errores, args.duracion, args.workers)
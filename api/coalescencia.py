@@ -0,0 +1,52 @@
+"""Single-flight coalescing of identical concurrent API queries.
+
+The first request for a key starts the computation as a task; identical
+requests arriving while it is in flight await the same task instead of
+running the query again. The task is shielded, so a client disconnecting
+does not cancel the result other waiters are expecting.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class Coalescedor:
+    """Shares in-flight computations between concurrent requests with the same key."""
+
+    def __init__(self):
+        """Initialize with no computations in flight."""
+        self._en_vuelo: Dict[str, asyncio.Task] = {}
+        self.ejecutadas = 0
+        self.coalescidas = 0
+
+    async def ejecutar(self, clave: str, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fabrica()`` once for all concurrent callers with the same key.
+
+        Args:
+            clave: Normalized request key (route + parameters)
+            fabrica: Coroutine factory computing the result
+
+        Returns:
+            The shared result (exceptions are propagated to every waiter)
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(fabrica())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda _: self._en_vuelo.pop(clave, None))
+            self.ejecutadas += 1
+        else:
+            self.coalescidas += 1
+        return await asyncio.shield(tarea)
+
+    def metricas(self) -> Dict[str, int]:
+        """Counters of executed and coalesced requests."""
+        return {
+            "ejecutadas": self.ejecutadas,
+            "coalescidas": self.coalescidas,
+            "en_vuelo": len(self._en_vuelo),
+        }
+
+
+# Process-wide instance used by the read endpoints
+coalescedor = Coalescedor()
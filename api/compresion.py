@@ -0,0 +1,299 @@
+"""Response compression (brotli / gzip) for the API.
+
+Bodies of compressible types at least ``compression_min_bytes`` long are
+compressed with the best encoding the client accepts. Responses carrying
+an ETag (the conditional read endpoints) have identical bodies for the
+same tag, so their compressed bytes are kept in a bounded LRU keyed by
+(ETag, encoding) and served to every later client without compressing
+again. Streamed responses are compressed chunk by chunk.
+"""
+import gzip
+import os
+import sys
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.tiempos import medir
+from config.loader import load_api_settings
+
+api_settings = load_api_settings()
+
+# Content types worth compressing (prefix match)
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/geo+json",
+    "application/javascript",
+    "text/",
+    "image/svg+xml",
+    "application/vnd.mapbox-vector-tile",
+)
+
+
+def codificaciones_soportadas() -> Tuple[str, ...]:
+    """Encodings this process can produce, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the preferred supported encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value (e.g. "gzip, deflate, br;q=0.9")
+
+    Returns:
+        "br", "gzip" or None when the client accepts neither
+    """
+    aceptadas: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        aceptadas[nombre.strip().lower()] = q
+    comodin = aceptadas.get("*", 0.0)
+    for codificacion in codificaciones_soportadas():
+        if aceptadas.get(codificacion, comodin) > 0:
+            return codificacion
+    return None
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    """Compress a whole body with the configured level."""
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=api_settings.compression_brotli_quality)
+    return gzip.compress(cuerpo, compresslevel=api_settings.compression_gzip_level, mtime=0)
+
+
+class _CompresorFlujo:
+    """Incremental compressor for streamed bodies."""
+
+    def __init__(self, codificacion: str):
+        if codificacion == "br":
+            self._br = brotli.Compressor(quality=api_settings.compression_brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            # wbits 16 + MAX_WBITS writes a gzip header and trailer
+            self._gz = zlib.compressobj(api_settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def procesar(self, datos: bytes) -> bytes:
+        """Compress one chunk, flushing so clients can decode it immediately."""
+        if self._br is not None:
+            return self._br.process(datos) + self._br.flush()
+        return self._gz.compress(datos) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        """Close the stream."""
+        if self._br is not None:
+            return self._br.finish()
+        return self._gz.flush()
+
+
+class CacheComprimidos:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded in bytes."""
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes: Total compressed bytes kept before evicting the oldest
+        """
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, etag: str, codificacion: str) -> Optional[bytes]:
+        """Compressed body for a tag, or None."""
+        cuerpo = self._entradas.get((etag, codificacion))
+        if cuerpo is None:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end((etag, codificacion))
+        self.aciertos += 1
+        return cuerpo
+
+    def guardar(self, etag: str, codificacion: str, cuerpo: bytes):
+        """Store a compressed body, evicting least recently used entries."""
+        if len(cuerpo) > self.max_bytes:
+            return
+        anterior = self._entradas.pop((etag, codificacion), None)
+        if anterior is not None:
+            self._bytes -= len(anterior)
+        self._entradas[(etag, codificacion)] = cuerpo
+        self._bytes += len(cuerpo)
+        while self._bytes > self.max_bytes:
+            _, expulsado = self._entradas.popitem(last=False)
+            self._bytes -= len(expulsado)
+
+    def metricas(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        return {
+            "entradas": len(self._entradas),
+            "bytes": self._bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+# Process-wide cache shared by every request
+cache_comprimidos = CacheComprimidos(api_settings.compression_cache_max_bytes)
+
+
+class CompresionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip."""
+
+    def __init__(self, app: ASGIApp, min_bytes: Optional[int] = None):
+        """
+        Wrap an ASGI application.
+
+        Args:
+            app: Application to wrap
+            min_bytes: Smallest body compressed (defaults to compression_min_bytes)
+        """
+        self.app = app
+        self.min_bytes = api_settings.compression_min_bytes if min_bytes is None else min_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+        respuesta = _RespuestaComprimible(send, codificacion, self.min_bytes)
+        await self.app(scope, receive, respuesta.enviar)
+
+
+class _RespuestaComprimible:
+    """Send wrapper deciding, per response, whether and how to compress."""
+
+    def __init__(self, send: Send, codificacion: str, min_bytes: int):
+        self._send = send
+        self.codificacion = codificacion
+        self.min_bytes = min_bytes
+        self._inicio: Optional[Message] = None
+        self._partes: List[bytes] = []
+        self._flujo: Optional[_CompresorFlujo] = None
+        self._directo = False
+        self._completo = False
+
+    def _comprimible(self, encabezados: Headers) -> bool:
+        if "content-encoding" in encabezados:
+            return False
+        return encabezados.get("content-type", "").startswith(TIPOS_COMPRIMIBLES)
+
+    async def enviar(self, message: Message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            self._inicio = message
+            encabezados = Headers(raw=message["headers"])
+            longitud = encabezados.get("content-length")
+            # Bodies of known length are buffered whole (they may arrive in
+            # several messages through BaseHTTPMiddleware); the rest are streams
+            self._completo = longitud is not None
+            self._directo = (
+                message["status"] in (204, 304)
+                or not self._comprimible(encabezados)
+                or (longitud is not None and int(longitud) < self.min_bytes)
+            )
+            if self._directo:
+                await self._send(message)
+            return
+        if tipo != "http.response.body" or self._directo:
+            await self._send(message)
+            return
+
+        cuerpo = message.get("body", b"")
+        mas = message.get("more_body", False)
+
+        if self._flujo is not None:
+            salida = self._flujo.procesar(cuerpo)
+            if not mas:
+                salida += self._flujo.terminar()
+            await self._send({"type": "http.response.body", "body": salida, "more_body": mas})
+            return
+
+        self._partes.append(cuerpo)
+        if mas:
+            if self._completo or sum(len(p) for p in self._partes) < self.min_bytes:
+                return
+            # Streamed response: compress chunks as they arrive
+            self._flujo = _CompresorFlujo(self.codificacion)
+            self._encabezados_comprimidos()
+            await self._send(self._inicio)
+            salida = self._flujo.procesar(b"".join(self._partes))
+            self._partes = []
+            await self._send({"type": "http.response.body", "body": salida, "more_body": True})
+            return
+
+        completo = b"".join(self._partes)
+        if len(completo) < self.min_bytes:
+            await self._send(self._inicio)
+            await self._send({"type": "http.response.body", "body": completo})
+            return
+
+        etag = Headers(raw=self._inicio["headers"]).get("etag")
+        with medir("compress"):
+            comprimido = cache_comprimidos.obtener(etag, self.codificacion) if etag else None
+            if comprimido is None:
+                comprimido = comprimir(completo, self.codificacion)
+                if etag:
+                    cache_comprimidos.guardar(etag, self.codificacion, comprimido)
+        encabezados = self._encabezados_comprimidos()
+        encabezados["content-length"] = str(len(comprimido))
+        await self._send(self._inicio)
+        await self._send({"type": "http.response.body", "body": comprimido})
+
+    def _encabezados_comprimidos(self) -> MutableHeaders:
+        """Mark the held response start as encoded."""
+        encabezados = MutableHeaders(scope=self._inicio)
+        encabezados["content-encoding"] = self.codificacion
+        encabezados.add_vary_header("Accept-Encoding")
+        # The encoded representation differs byte-wise: expose the tag as weak,
+        # which If-None-Match still matches (weak comparison)
+        etag = encabezados.get("etag")
+        if etag and not etag.startswith("W/"):
+            encabezados["etag"] = f"W/{etag}"
+        return encabezados
+
+
+def benchmark(repeticiones: int = 20):
+    """Compression ratio and time of the synthetic large payloads."""
+    import time
+    from api.respuestas import _payloads_sinteticos, serializar
+
+    print(f"{'payload':<22} {'cod':<5} {'bytes':>10} {'comprimido':>11} {'ratio':>6} {'ms':>7}")
+    for nombre, payload in _payloads_sinteticos().items():
+        cuerpo = serializar(payload)
+        for codificacion in codificaciones_soportadas():
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                comprimido = comprimir(cuerpo, codificacion)
+            ms = (time.perf_counter() - t0) / repeticiones * 1000
+            print(f"{nombre:<22} {codificacion:<5} {len(cuerpo):>10} {len(comprimido):>11} "
+                  f"{len(cuerpo) / len(comprimido):>6.1f} {ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,127 @@
+"""HTTP conditional requests (ETag / Last-Modified / 304) for read endpoints.
+
+Responses are tagged with the published data version (``version_datos``)
+combined with the route and its normalized query parameters (and, for
+routes whose end date defaults to today, the date it resolves to). Because the
+tag is known before the endpoint runs, a matching ``If-None-Match`` (or a
+fresh ``If-Modified-Since``) is answered with 304 without querying the data.
+"""
+import hashlib
+import logging
+import time
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from api.db import ERRORES_CONEXION, obtener_pool
+from config.loader import load_api_settings
+from db.version import SQL_LEER_VERSION
+
+logger = logging.getLogger(__name__)
+
+api_settings = load_api_settings()
+
+# Read endpoints whose responses only change with the data version
+RUTAS_CONDICIONALES = (
+    "/api/v1/kpi",
+    "/api/v1/timeseries",
+    "/api/v1/map/",
+    "/api/v1/alerts",
+    "/api/v1/bulletin/",
+)
+
+# Routes whose missing fecha_fin defaults to today: the same URL answers
+# differently after midnight even if the data version did not move
+RUTAS_FIN_HOY = ("/api/v1/kpi", "/api/v1/timeseries")
+
+_version: Optional[Tuple[int, datetime]] = None
+_leida_en = float("-inf")
+
+
+async def version_datos() -> Optional[Tuple[int, datetime]]:
+    """
+    Current (version, updated_at), re-read at most every data_version_refresh_seconds.
+
+    Returns:
+        Tuple (version, updated_at), or None if it cannot be read
+    """
+    global _version, _leida_en
+    if time.monotonic() - _leida_en < api_settings.data_version_refresh_seconds:
+        return _version
+    try:
+        pool = await obtener_pool()
+        fila = await pool.fetchrow(SQL_LEER_VERSION)
+    except (HTTPException, *ERRORES_CONEXION) as e:
+        logger.debug(f"Versión de datos no disponible ({e})")
+        return None
+    _version = (fila["version"], fila["updated_at"]) if fila else None
+    _leida_en = time.monotonic()
+    return _version
+
+
+def _fin_hoy(request: Request) -> bool:
+    """Whether the request's end date is the implicit today."""
+    return request.url.path in RUTAS_FIN_HOY and not request.query_params.get("fecha_fin")
+
+
+def calcular_etag(version: int, request: Request) -> str:
+    """Strong ETag for a route, its normalized query parameters and a data version."""
+    parametros = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    if _fin_hoy(request):
+        parametros += f"#fecha_fin={date.today().isoformat()}"
+    digest = hashlib.sha1(f"{request.url.path}?{parametros}".encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def _coincide_etag(encabezado: str, etag: str) -> bool:
+    """Whether an If-None-Match header matches (weak comparison, as RFC 9110 requires)."""
+    etiquetas = [e.strip() for e in encabezado.split(",")]
+    return "*" in etiquetas or etag in (e[2:] if e.startswith("W/") else e for e in etiquetas)
+
+
+def _no_modificado(request: Request, etag: str, actualizado: datetime) -> bool:
+    """Evaluate the conditional headers of a request."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _coincide_etag(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return actualizado.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _encabezados(etag: str, actualizado: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(actualizado.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": f"public, max-age={api_settings.http_cache_max_age_seconds}, must-revalidate",
+    }
+
+
+async def respuestas_condicionales(request: Request, call_next):
+    """HTTP middleware adding validators to read endpoints and answering 304s."""
+    if request.method not in ("GET", "HEAD") or not request.url.path.startswith(RUTAS_CONDICIONALES):
+        return await call_next(request)
+
+    version = await version_datos()
+    if version is None:
+        return await call_next(request)
+
+    etag = calcular_etag(version[0], request)
+    actualizado = version[1]
+    if _fin_hoy(request):
+        # The implicit end date moved at midnight: nothing cached before then is fresh
+        actualizado = max(actualizado, datetime.combine(date.today(), datetime.min.time()).astimezone())
+    encabezados = _encabezados(etag, actualizado)
+    if _no_modificado(request, etag, actualizado):
+        return Response(status_code=304, headers=encabezados)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(encabezados)
+    return response
@@ -0,0 +1,480 @@
+"""Read queries behind the API endpoints.
+
+Every query is a constant, parameterized SQL string so asyncpg can
+prepare it once per connection and reuse the statement.
+"""
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional
+
+from api.lote import columnas_kpis, tasas_100k
+from api.paginacion import codificar_cursor
+from api.submuestreo import submuestrear
+
+SQL_KPIS = """
+    SELECT COALESCE(SUM(s.casos), 0) AS casos_totales,
+           COALESCE(SUM(s.defunciones), 0) AS defunciones_totales,
+           COALESCE(SUM(s.casos) FILTER (WHERE s.fecha > $4::date - $5::int), 0) AS casos_activos,
+           MAX(s.updated_at) AS actualizado
+    FROM serie_oficial s
+    WHERE s.cve_ent IS NOT NULL
+      AND ($1::char(2) IS NULL OR s.cve_ent = $1)
+      AND ($2::int IS NULL OR s.morbilidad_id = $2)
+      AND ($3::date IS NULL OR s.fecha >= $3)
+      AND s.fecha <= $4
+"""
+
+# Per (entity, morbidity) and national per-morbidity totals in one scan;
+# national rows have GROUPING(cve_ent) = 1
+SQL_KPIS_LOTE = """
+    SELECT s.cve_ent, s.morbilidad_id, GROUPING(s.cve_ent) = 1 AS nacional,
+           SUM(s.casos) AS casos_totales,
+           SUM(s.defunciones) AS defunciones_totales,
+           COALESCE(SUM(s.casos) FILTER (WHERE s.fecha > $4::date - $5::int), 0) AS casos_activos,
+           MAX(s.updated_at) AS actualizado
+    FROM serie_oficial s
+    WHERE s.cve_ent IS NOT NULL
+      AND ($1::char(2)[] IS NULL OR s.cve_ent = ANY($1))
+      AND ($2::int[] IS NULL OR s.morbilidad_id = ANY($2))
+      AND ($3::date IS NULL OR s.fecha >= $3)
+      AND s.fecha <= $4
+    GROUP BY GROUPING SETS ((s.cve_ent, s.morbilidad_id), (s.morbilidad_id))
+"""
+
+SQL_MORBILIDAD = "SELECT nombre FROM morbilidad WHERE id = $1"
+
+SQL_MORBILIDADES = "SELECT id FROM morbilidad ORDER BY id"
+
+SQL_SERIE_OFICIAL = """
+    SELECT fecha, SUM(casos) AS casos, SUM(defunciones) AS defunciones
+    FROM serie_oficial
+    WHERE cve_ent IS NOT NULL
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::int IS NULL OR morbilidad_id = $2)
+      AND fecha >= $3 AND fecha <= $4
+    GROUP BY fecha
+    ORDER BY fecha
+    LIMIT $5
+"""
+
+# Rows after the cursor (fecha, cve_ent, cve_mun, id), read from idx_serie_oficial_cursor
+SQL_SERIE_MUNICIPIO = """
+    SELECT id, fecha, cve_ent, cve_mun, morbilidad_id, fuente, casos, defunciones
+    FROM serie_oficial
+    WHERE cve_ent IS NOT NULL
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::int IS NULL OR morbilidad_id = $2)
+      AND (fecha, cve_ent, COALESCE(cve_mun, ''), id) > ($3::date, $4::char(2), $5::char(5), $6::bigint)
+      AND fecha <= $7
+    ORDER BY fecha, cve_ent, COALESCE(cve_mun, ''), id
+    LIMIT $8
+"""
+
+SQL_SERIE_SOCIAL = """
+    SELECT ts::date AS fecha, SUM(conteo) AS conteo,
+           SUM(sentimiento * conteo) / NULLIF(SUM(conteo), 0) AS sentimiento
+    FROM social_menciones
+    WHERE relevancia
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::date IS NULL OR ts >= $2)
+      AND ($3::date IS NULL OR ts < $3::date + 1)
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+# Exact ISO-week ($5 = 'week', Monday start) or month ($5 = 'month') totals
+SQL_SERIE_PERIODO = """
+    SELECT date_trunc($5, fecha::timestamp)::date AS fecha, SUM(casos) AS casos, SUM(defunciones) AS defunciones
+    FROM serie_oficial
+    WHERE cve_ent IS NOT NULL
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::int IS NULL OR morbilidad_id = $2)
+      AND fecha >= $3 AND fecha <= $4
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+SQL_SOCIAL_PERIODO = """
+    SELECT date_trunc($4, ts::date::timestamp)::date AS fecha, SUM(conteo) AS conteo,
+           SUM(sentimiento * conteo) / NULLIF(SUM(conteo), 0) AS sentimiento
+    FROM social_menciones
+    WHERE relevancia
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ts >= $2
+      AND ts < $3::date + 1
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+# API resolution -> date_trunc field
+PERIODOS = {"semana": "week", "mes": "month"}
+
+SQL_MAPA_ENTIDAD = """
+    SELECT g.cve_ent, g.nombre,
+           COALESCE(SUM(s.casos), 0) AS casos,
+           COALESCE(SUM(s.defunciones), 0) AS defunciones
+    FROM geo_entidad g
+    LEFT JOIN serie_oficial s ON s.cve_ent = g.cve_ent
+    GROUP BY g.cve_ent, g.nombre
+    ORDER BY g.cve_ent
+"""
+
+SQL_MAPA_MUNICIPIO = """
+    SELECT g.cve_mun, g.cve_ent, g.nombre,
+           COALESCE(SUM(s.casos), 0) AS casos,
+           COALESCE(SUM(s.defunciones), 0) AS defunciones
+    FROM geo_municipio g
+    LEFT JOIN serie_oficial s ON s.cve_mun = g.cve_mun
+    WHERE ($1::char(2) IS NULL OR g.cve_ent = $1)
+    GROUP BY g.cve_mun, g.cve_ent, g.nombre
+    ORDER BY g.cve_mun
+"""
+
+SQL_ALERTAS = """
+    SELECT id, tipo, regla, estado, evidencia, created_at, resolved_at
+    FROM alerta
+    WHERE estado = $1
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+SQL_BOLETIN = """
+    SELECT id, periodo_inicio, periodo_fin, resumen_html, estado, published_at
+    FROM boletin
+    WHERE id = $1
+"""
+
+
+# Morbidity catalog names (static), filled on first lookup
+_nombres_morbilidad: Dict[int, Optional[str]] = {}
+
+
+async def nombre_morbilidad(pool, morbilidad_id: int) -> Optional[str]:
+    """Catalog name of a morbidity, or None if it does not exist."""
+    if morbilidad_id not in _nombres_morbilidad:
+        async with pool.acquire() as conn:
+            _nombres_morbilidad[morbilidad_id] = await conn.fetchval(SQL_MORBILIDAD, morbilidad_id)
+    return _nombres_morbilidad[morbilidad_id]
+
+
+def _iso(valor) -> Optional[str]:
+    return valor.isoformat() if valor is not None else None
+
+
+async def consultar_kpis(
+    pool,
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: Optional[date],
+    fecha_fin: Optional[date],
+    ventana_activos: int
+) -> Dict[str, Any]:
+    """Totals, active cases and last update for an entity/morbidity selection."""
+    async with pool.acquire() as conn:
+        fila = await conn.fetchrow(
+            SQL_KPIS, entidad, morbilidad_id, fecha_ini, fecha_fin or date.today(), ventana_activos
+        )
+        morbilidad = (
+            await conn.fetchval(SQL_MORBILIDAD, morbilidad_id) if morbilidad_id is not None else None
+        )
+    casos, defunciones = int(fila["casos_totales"]), int(fila["defunciones_totales"])
+    tasas = tasas_100k([entidad], [casos, defunciones], anio=(fecha_fin or date.today()).year) or [None, None]
+    return {
+        "entidad": entidad or "nacional",
+        "morbilidad_id": morbilidad_id,
+        "morbilidad": morbilidad,
+        "casos_totales": casos,
+        "defunciones_totales": defunciones,
+        "casos_activos": int(fila["casos_activos"]),
+        "tasa_casos_100k": tasas[0],
+        "tasa_defunciones_100k": tasas[1],
+        "fecha_actualizacion": _iso(fila["actualizado"].date() if fila["actualizado"] else None),
+    }
+
+
+def _menciones(filas) -> List[Dict[str, Any]]:
+    return [
+        {
+            "fecha": f["fecha"].isoformat(),
+            "conteo": int(f["conteo"]),
+            "sentimiento": round(float(f["sentimiento"]), 3) if f["sentimiento"] is not None else None,
+        }
+        for f in filas
+    ]
+
+
+async def consultar_morbilidades(pool) -> List[int]:
+    """IDs of every catalogued morbidity."""
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(SQL_MORBILIDADES)
+    return [f["id"] for f in filas]
+
+
+async def consultar_kpis_lote(
+    pool,
+    entidades: List[Optional[str]],
+    morbilidad_ids: Optional[List[int]],
+    fecha_ini: Optional[date],
+    fecha_fin: date,
+    ventana_activos: int
+) -> Dict[str, Any]:
+    """
+    KPIs of many entity/morbidity pairs with one grouped query.
+
+    Args:
+        entidades: Entity codes; None entries are national totals
+        morbilidad_ids: One result per morbidity, or None to sum all of them
+
+    Returns:
+        Columnar dict (see api.lote.columnas_kpis)
+    """
+    codigos = [e for e in entidades if e is not None]
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(
+            SQL_KPIS_LOTE,
+            None if None in entidades else codigos,
+            morbilidad_ids,
+            fecha_ini,
+            fecha_fin,
+            ventana_activos
+        )
+    totales: Dict[Any, List[int]] = {}
+    actualizado = None
+    for f in filas:
+        clave = (None if f["nacional"] else f["cve_ent"], f["morbilidad_id"] if morbilidad_ids is not None else None)
+        acumulado = totales.setdefault(clave, [0, 0, 0])
+        acumulado[0] += int(f["casos_totales"] or 0)
+        acumulado[1] += int(f["defunciones_totales"] or 0)
+        acumulado[2] += int(f["casos_activos"] or 0)
+        if f["actualizado"] is not None and (actualizado is None or f["actualizado"] > actualizado):
+            actualizado = f["actualizado"]
+    morbs = morbilidad_ids if morbilidad_ids is not None else [None]
+    vacio = [0, 0, 0]
+    valores = [[totales.get((e, m), vacio) for m in morbs] for e in entidades]
+    return columnas_kpis(
+        entidades,
+        morbilidad_ids,
+        [[v[0] for v in fila] for fila in valores],
+        [[v[1] for v in fila] for fila in valores],
+        [[v[2] for v in fila] for fila in valores],
+        _iso(actualizado.date() if actualizado else None),
+        "serie_oficial",
+        fecha_fin.year
+    )
+
+
+async def consultar_serie(
+    pool,
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: date,
+    fecha_fin: date,
+    limite: int,
+    desde: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    One page of the daily official series and the social mentions of the same days.
+
+    Args:
+        pool: asyncpg pool
+        entidad: Entity code, or None for the national total
+        morbilidad_id: Morbidity ID, or None for all
+        fecha_ini: Start of the (already bounded) range
+        fecha_fin: End of the range
+        limite: Days per page
+        desde: First day of the page (decoded cursor); fecha_ini for the first page
+
+    Returns:
+        Dict with serie_oficial, serie_social and paginacion (next cursor or None)
+    """
+    inicio = desde or fecha_ini
+    async with pool.acquire() as conn:
+        oficial = await conn.fetch(SQL_SERIE_OFICIAL, entidad, morbilidad_id, inicio, fecha_fin, limite + 1)
+        siguiente = None
+        fin_pagina = fecha_fin
+        if len(oficial) > limite:
+            oficial = oficial[:limite]
+            fin_pagina = oficial[-1]["fecha"]
+            siguiente = codificar_cursor([fin_pagina + timedelta(days=1)])
+        social = await conn.fetch(SQL_SERIE_SOCIAL, entidad, inicio, fin_pagina)
+    return {
+        "serie_oficial": [
+            {"fecha": f["fecha"].isoformat(), "casos": int(f["casos"]), "defunciones": int(f["defunciones"])}
+            for f in oficial
+        ],
+        "serie_social": {"menciones": _menciones(social)},
+        "paginacion": {"limite": limite, "siguiente": siguiente},
+    }
+
+
+async def consultar_serie_resumida(
+    pool,
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: date,
+    fecha_fin: date,
+    resolucion: str,
+    max_puntos: Optional[int]
+) -> Dict[str, Any]:
+    """
+    Whole-range series reduced for charting, in a single response.
+
+    Args:
+        resolucion: "dia", or "semana"/"mes" for exact totals per ISO week
+                    (labelled by its Monday) or calendar month
+        max_puntos: If given, LTTB-downsample each series to at most this many points
+
+    Returns:
+        Same shape as consultar_serie, plus the resolution and point counts
+    """
+    async with pool.acquire() as conn:
+        if resolucion in PERIODOS:
+            periodo = PERIODOS[resolucion]
+            oficial = await conn.fetch(SQL_SERIE_PERIODO, entidad, morbilidad_id, fecha_ini, fecha_fin, periodo)
+            social = await conn.fetch(SQL_SOCIAL_PERIODO, entidad, fecha_ini, fecha_fin, periodo)
+        else:
+            dias = (fecha_fin - fecha_ini).days + 1
+            oficial = await conn.fetch(SQL_SERIE_OFICIAL, entidad, morbilidad_id, fecha_ini, fecha_fin, dias)
+            social = await conn.fetch(SQL_SERIE_SOCIAL, entidad, fecha_ini, fecha_fin)
+    serie_oficial = [
+        {"fecha": f["fecha"].isoformat(), "casos": int(f["casos"]), "defunciones": int(f["defunciones"])}
+        for f in oficial
+    ]
+    menciones = _menciones(social)
+    if max_puntos:
+        serie_oficial = submuestrear(serie_oficial, "casos", max_puntos)
+        menciones = submuestrear(menciones, "conteo", max_puntos)
+    return {
+        "serie_oficial": serie_oficial,
+        "serie_social": {"menciones": menciones},
+        "resolucion": resolucion,
+        "puntos": {"oficial": len(oficial), "devueltos": len(serie_oficial)},
+        "paginacion": {"limite": None, "siguiente": None},
+    }
+
+
+async def consultar_serie_municipio(
+    pool,
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: date,
+    fecha_fin: date,
+    limite: int,
+    despues_de: Optional[List[Any]] = None
+) -> Dict[str, Any]:
+    """
+    One page of serie_oficial rows ordered by (fecha, cve_ent, cve_mun, id).
+
+    Args:
+        despues_de: Sort key of the last row already returned (decoded
+                    cursor); None for the first page
+
+    Returns:
+        Dict with serie_oficial rows and paginacion (next cursor or None)
+    """
+    clave = despues_de or [fecha_ini, "", "", 0]
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(
+            SQL_SERIE_MUNICIPIO, entidad, morbilidad_id, *clave, fecha_fin, limite + 1
+        )
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(
+            [ultima["fecha"], ultima["cve_ent"], ultima["cve_mun"] or "", ultima["id"]]
+        )
+    return {
+        "serie_oficial": [
+            {
+                "fecha": f["fecha"].isoformat(),
+                "cve_ent": f["cve_ent"],
+                "cve_mun": f["cve_mun"],
+                "morbilidad_id": f["morbilidad_id"],
+                "fuente": f["fuente"],
+                "casos": int(f["casos"]),
+                "defunciones": int(f["defunciones"]),
+            }
+            for f in filas
+        ],
+        "paginacion": {"limite": limite, "siguiente": siguiente},
+    }
+
+
+def _tasas_mapa(filas, clave: str, nivel: str) -> List[List[Optional[float]]]:
+    """Per-100k (casos, defunciones) rates of map rows, with the latest census population."""
+    tasas = tasas_100k([f[clave] for f in filas], [[f["casos"], f["defunciones"]] for f in filas], nivel)
+    if tasas is None:
+        return [[None, None]] * len(filas)
+    return [tasas[i:i + 2] for i in range(0, len(tasas), 2)]
+
+
+async def consultar_mapa_entidad(pool) -> Dict[str, Any]:
+    """Cumulative cases, deaths and rates per 100k of every entity."""
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(SQL_MAPA_ENTIDAD)
+    return {
+        "entidades": [
+            {
+                "cve_ent": f["cve_ent"],
+                "nombre": f["nombre"],
+                "casos": int(f["casos"]),
+                "defunciones": int(f["defunciones"]),
+                "tasa_casos_100k": tasa_casos,
+                "tasa_defunciones_100k": tasa_defunciones,
+            }
+            for f, (tasa_casos, tasa_defunciones) in zip(filas, _tasas_mapa(filas, "cve_ent", "entidad"))
+        ]
+    }
+
+
+async def consultar_mapa_municipio(pool, entidad: Optional[str]) -> Dict[str, Any]:
+    """Cumulative cases, deaths and rates per 100k of every municipality (of one entity, if given)."""
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(SQL_MAPA_MUNICIPIO, entidad)
+    return {
+        "municipios": [
+            {
+                "cve_mun": f["cve_mun"],
+                "cve_ent": f["cve_ent"],
+                "nombre": f["nombre"],
+                "casos": int(f["casos"]),
+                "defunciones": int(f["defunciones"]),
+                "tasa_casos_100k": tasa_casos,
+                "tasa_defunciones_100k": tasa_defunciones,
+            }
+            for f, (tasa_casos, tasa_defunciones) in zip(filas, _tasas_mapa(filas, "cve_mun", "municipio"))
+        ]
+    }
+
+
+async def consultar_alertas(pool, estado: str, limite: int) -> List[Dict[str, Any]]:
+    """Most recent alerts in a given state."""
+    async with pool.acquire() as conn:
+        filas = await conn.fetch(SQL_ALERTAS, estado, limite)
+    return [
+        {
+            "id": f["id"],
+            "tipo": f["tipo"],
+            "regla": f["regla"],
+            "estado": f["estado"],
+            "evidencia": f["evidencia"],
+            "created_at": _iso(f["created_at"]),
+            "resolved_at": _iso(f["resolved_at"]),
+        }
+        for f in filas
+    ]
+
+
+async def consultar_boletin(pool, boletin_id: int) -> Optional[Dict[str, Any]]:
+    """A bulletin by ID, or None if it does not exist."""
+    async with pool.acquire() as conn:
+        fila = await conn.fetchrow(SQL_BOLETIN, boletin_id)
+    if fila is None:
+        return None
+    return {
+        "id": fila["id"],
+        "periodo": f"{fila['periodo_inicio'].isoformat()} a {fila['periodo_fin'].isoformat()}",
+        "resumen_html": fila["resumen_html"],
+        "estado": fila["estado"],
+        "published_at": _iso(fila["published_at"]),
+    }
@@ -0,0 +1,137 @@
+"""Async PostgreSQL connection pool for the API.
+
+The pool is opened by the FastAPI lifespan handler and sized from the
+``api`` section of settings.yaml. asyncpg prepares every query on first
+use and keeps it in a per-connection statement cache, so repeated
+endpoint queries skip parsing and planning.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - asyncpg is only required by the API image
+    asyncpg = None
+
+from fastapi import HTTPException
+
+from api.tiempos import medir
+from config.loader import load_config, load_api_settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reconnection attempts while the database is down
+REINTENTO_SEGUNDOS = 5.0
+
+# Errors meaning the database went away while serving a request (not every
+# OSError: missing files or permissions elsewhere are ordinary 500s)
+ERRORES_CONEXION = (
+    (ConnectionError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+    if asyncpg is not None else (ConnectionError, asyncio.TimeoutError)
+)
+
+if asyncpg is not None:
+    class ConexionMedida(asyncpg.Connection):
+        """Connection reporting query time to the request's Server-Timing ``db`` phase."""
+
+        async def execute(self, *args, **kwargs):
+            with medir("db"):
+                return await super().execute(*args, **kwargs)
+
+        async def fetch(self, *args, **kwargs):
+            with medir("db"):
+                return await super().fetch(*args, **kwargs)
+
+        async def fetchrow(self, *args, **kwargs):
+            with medir("db"):
+                return await super().fetchrow(*args, **kwargs)
+
+        async def fetchval(self, *args, **kwargs):
+            with medir("db"):
+                return await super().fetchval(*args, **kwargs)
+
+_pool = None
+_ultimo_intento = 0.0
+_lock = asyncio.Lock()
+
+
+async def _inicializar_conexion(conn):
+    """Decode JSON columns into Python objects."""
+    for tipo in ("json", "jsonb"):
+        await conn.set_type_codec(tipo, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def abrir_pool():
+    """
+    Open the connection pool; failures are logged and retried on demand.
+
+    Returns:
+        asyncpg pool, or None if the database is unavailable
+    """
+    global _pool, _ultimo_intento
+    _ultimo_intento = time.monotonic()
+    if asyncpg is None:
+        logger.warning("asyncpg no instalado, endpoints de datos deshabilitados")
+        return None
+
+    _, _, secrets = load_config()
+    settings = load_api_settings()
+    try:
+        _pool = await asyncpg.create_pool(
+            host=secrets.postgres_host,
+            port=secrets.postgres_port,
+            database=secrets.postgres_database,
+            user=secrets.postgres_user,
+            password=secrets.postgres_password,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            command_timeout=settings.db_command_timeout_seconds,
+            statement_cache_size=settings.db_statement_cache_size,
+            init=_inicializar_conexion,
+            connection_class=ConexionMedida,
+        )
+        logger.info(
+            f"Pool PostgreSQL abierto ({settings.db_pool_min_size}-{settings.db_pool_max_size} conexiones)"
+        )
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+        logger.warning(f"Base de datos no disponible ({e})")
+        _pool = None
+    return _pool
+
+
+async def cerrar_pool():
+    """Close the connection pool, waiting for in-flight queries."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def obtener_pool():
+    """
+    Get the pool, reconnecting (at most every REINTENTO_SEGUNDOS) if it is down.
+
+    Raises:
+        HTTPException: 503 if the database is unavailable
+    """
+    if _pool is None:
+        async with _lock:
+            if _pool is None and time.monotonic() - _ultimo_intento >= REINTENTO_SEGUNDOS:
+                await abrir_pool()
+    if _pool is None:
+        raise HTTPException(status_code=503, detail="Base de datos no disponible")
+    return _pool
+
+
+def estado_pool() -> Optional[Dict[str, int]]:
+    """Size, idle connections and maximum of the pool, or None while it is down."""
+    if _pool is None:
+        return None
+    return {
+        "conexiones": _pool.get_size(),
+        "libres": _pool.get_idle_size(),
+        "maximo": _pool.get_max_size(),
+    }
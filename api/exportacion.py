@@ -0,0 +1,262 @@
+"""Streaming bulk exports of serie_oficial and social_menciones.
+
+Rows are read from a server-side cursor in batches of
+``export_batch_rows`` and written to the response as they arrive
+(NDJSON, CSV or Arrow IPC stream), so memory per request stays constant
+whatever the size of the extract. Exports hold a pool connection for the
+whole transfer, so at most ``export_max_concurrent`` run at once.
+"""
+import csv
+import io
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Tuple
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - Arrow export is optional
+    pa = None
+
+from fastapi import HTTPException
+
+from api.respuestas import serializar
+from config.loader import load_api_settings
+
+logger = logging.getLogger(__name__)
+
+api_settings = load_api_settings()
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+SQL_EXPORTAR_OFICIAL = """
+    SELECT fecha, semana_iso, cve_ent, cve_mun, morbilidad_id, casos, defunciones, fuente, version
+    FROM serie_oficial
+    WHERE cve_ent IS NOT NULL
+      AND ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::int IS NULL OR morbilidad_id = $2)
+      AND ($3::date IS NULL OR fecha >= $3)
+      AND ($4::date IS NULL OR fecha <= $4)
+    ORDER BY fecha, cve_ent, COALESCE(cve_mun, ''), id
+"""
+
+SQL_EXPORTAR_SOCIAL = """
+    SELECT ts, plataforma, cve_ent, cve_mun, relevancia, sentimiento::float8 AS sentimiento, conteo
+    FROM social_menciones
+    WHERE ($1::char(2) IS NULL OR cve_ent = $1)
+      AND ($2::date IS NULL OR ts >= $2)
+      AND ($3::date IS NULL OR ts < $3::date + 1)
+    ORDER BY ts, id
+"""
+
+
+class Exportacion(NamedTuple):
+    """An exportable query and the Arrow type of each column."""
+    sql: str
+    columnas: List[Tuple[str, str]]
+
+
+# Arrow types by name, resolved lazily so pyarrow stays optional
+EXPORTACIONES: Dict[str, Exportacion] = {
+    "serie_oficial": Exportacion(SQL_EXPORTAR_OFICIAL, [
+        ("fecha", "date32"), ("semana_iso", "int32"), ("cve_ent", "string"),
+        ("cve_mun", "string"), ("morbilidad_id", "int32"), ("casos", "int32"),
+        ("defunciones", "int32"), ("fuente", "string"), ("version", "int32"),
+    ]),
+    "social": Exportacion(SQL_EXPORTAR_SOCIAL, [
+        ("ts", "timestamp_tz"), ("plataforma", "string"), ("cve_ent", "string"),
+        ("cve_mun", "string"), ("relevancia", "bool_"), ("sentimiento", "float64"),
+        ("conteo", "int32"),
+    ]),
+}
+
+# Exports currently streaming in this process
+_en_curso = 0
+
+
+def _esquema(exportacion: Exportacion):
+    """Arrow schema of an export."""
+    tipos = {"timestamp_tz": pa.timestamp("us", tz="UTC")}
+    return pa.schema([
+        (nombre, tipos[tipo] if tipo in tipos else getattr(pa, tipo)())
+        for nombre, tipo in exportacion.columnas
+    ])
+
+
+def _valor_csv(valor: Any) -> Any:
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+class _Sumidero(io.RawIOBase):
+    """Write-only buffer drained after every Arrow record batch."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _codificador(formato: str, exportacion: Exportacion):
+    """
+    Return (cabecera, codificar_lote, cierre) for a format.
+
+    ``codificar_lote`` turns a list of records into bytes; ``cabecera`` and
+    ``cierre`` are emitted before the first and after the last batch.
+    """
+    nombres = [nombre for nombre, _ in exportacion.columnas]
+
+    if formato == "ndjson":
+        def lote_ndjson(filas) -> bytes:
+            return b"".join(serializar(dict(f)) + b"\n" for f in filas)
+        return b"", lote_ndjson, lambda: b""
+
+    if formato == "csv":
+        def lote_csv(filas) -> bytes:
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerows([_valor_csv(v) for v in f.values()] for f in filas)
+            return buffer.getvalue().encode()
+        return (",".join(nombres) + "\r\n").encode(), lote_csv, lambda: b""
+
+    esquema = _esquema(exportacion)
+    sumidero = _Sumidero()
+    escritor = pa.ipc.new_stream(sumidero, esquema)
+
+    def lote_arrow(filas) -> bytes:
+        columnas = {nombre: [f[nombre] for f in filas] for nombre in nombres}
+        escritor.write_batch(pa.RecordBatch.from_pydict(columnas, schema=esquema))
+        return sumidero.vaciar()
+
+    def cierre_arrow() -> bytes:
+        escritor.close()
+        return sumidero.vaciar()
+
+    return sumidero.vaciar(), lote_arrow, cierre_arrow
+
+
+def validar(nombre: str, formato: str) -> Exportacion:
+    """
+    Resolve an export and check the format can be produced.
+
+    Raises:
+        HTTPException: 404 for unknown exports, 400/501 for bad or unavailable formats
+    """
+    exportacion = EXPORTACIONES.get(nombre)
+    if exportacion is None:
+        raise HTTPException(status_code=404, detail=f"Exportación desconocida: {nombre}")
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="formato debe ser: ndjson, csv o arrow")
+    if formato == "arrow" and pa is None:
+        raise HTTPException(status_code=501, detail="Exportación Arrow no disponible (pyarrow no instalado)")
+    return exportacion
+
+
+def reservar():
+    """
+    Claim one of the concurrent export slots (released by ``transmitir``).
+
+    Raises:
+        HTTPException: 429 if every slot is in use
+    """
+    global _en_curso
+    if _en_curso >= api_settings.export_max_concurrent:
+        raise HTTPException(status_code=429, detail="Demasiadas exportaciones en curso, reintente más tarde")
+    _en_curso += 1
+
+
+def liberar():
+    """Release an export slot."""
+    global _en_curso
+    _en_curso -= 1
+
+
+async def transmitir(
+    pool,
+    exportacion: Exportacion,
+    formato: str,
+    parametros: Tuple
+) -> AsyncIterator[bytes]:
+    """
+    Stream an export from a server-side cursor.
+
+    Owns the slot claimed by ``reservar``: it is released when the stream
+    ends, fails or is closed (client disconnect, cancellation).
+
+    Args:
+        pool: asyncpg pool
+        exportacion: Export to run
+        formato: "ndjson", "csv" or "arrow"
+        parametros: Query parameters
+
+    Yields:
+        Encoded chunks, one per batch of export_batch_rows rows
+    """
+    try:
+        filas_totales = 0
+        cabecera, codificar_lote, cierre = _codificador(formato, exportacion)
+        if cabecera:
+            yield cabecera
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(exportacion.sql, *parametros)
+                while True:
+                    filas = await cursor.fetch(api_settings.export_batch_rows)
+                    if not filas:
+                        break
+                    filas_totales += len(filas)
+                    yield codificar_lote(filas)
+        final = cierre()
+        if final:
+            yield final
+        logger.info(f"Exportación {formato} completada ({filas_totales} filas)")
+    finally:
+        liberar()
+
+
+async def _encadenar(primero: bytes, resto: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield primero
+    async for trozo in resto:
+        yield trozo
+
+
+async def iniciar(
+    pool,
+    exportacion: Exportacion,
+    formato: str,
+    parametros: Tuple
+) -> AsyncIterator[bytes]:
+    """
+    Claim a slot and start an export before its response is sent.
+
+    The stream is advanced to its first chunk here, so the slot is released
+    by the generator's finalization even if the response never iterates it,
+    and errors before the first chunk still get an error status.
+
+    Raises:
+        HTTPException: 429 if every slot is in use
+    """
+    reservar()
+    cuerpo = transmitir(pool, exportacion, formato, parametros)
+    try:
+        primero = await cuerpo.__anext__()
+    except StopAsyncIteration:
+        primero = b""
+    return _encadenar(primero, cuerpo)
@@ -0,0 +1,112 @@
+"""Static map geometries (GeoJSON and vector tiles) written by etl/geometrias.py.
+
+Geometry only changes when the pipeline regenerates it, so files are
+served with long-lived Cache-Control and an ETag derived from the
+manifest version; clients revalidate with a cheap 304.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from config.loader import load_geo_settings
+
+geo_settings = load_geo_settings()
+
+NIVELES = ("entidad", "municipio")
+
+TIPO_GEOJSON = "application/geo+json"
+TIPO_MVT = "application/vnd.mapbox-vector-tile"
+
+_manifiesto: Optional[Dict[str, Any]] = None
+_manifiesto_mtime: Optional[float] = None
+
+
+def _directorio() -> str:
+    return geo_settings.resolve_path(geo_settings.geometrias_dir)
+
+
+def manifiesto() -> Dict[str, Any]:
+    """
+    Manifest of the generated geometries, reloaded when it changes.
+
+    Raises:
+        HTTPException: 503 if the pipeline has not been run
+    """
+    global _manifiesto, _manifiesto_mtime
+    ruta = os.path.join(_directorio(), "manifest.json")
+    try:
+        mtime = os.stat(ruta).st_mtime
+    except OSError:
+        raise HTTPException(
+            status_code=503, detail="Geometrías no generadas (ejecute python etl/geometrias.py)"
+        )
+    if _manifiesto is None or mtime != _manifiesto_mtime:
+        with open(ruta, "r", encoding="utf-8") as f:
+            _manifiesto = json.load(f)
+        _manifiesto_mtime = mtime
+    return _manifiesto
+
+
+def enlaces(nivel: str) -> Dict[str, str]:
+    """Where a map payload's geometry is fetched from."""
+    return {
+        "geojson": f"/api/v1/geo/{nivel}",
+        "tiles": f"/api/v1/tiles/{nivel}/{{z}}/{{x}}/{{y}}.pbf",
+        "clave": "cve_ent" if nivel == "entidad" else "cve_mun",
+    }
+
+
+def _servir(request: Request, ruta: str, media_type: str, version: str) -> Response:
+    """File response with long-lived caching and If-None-Match support."""
+    etag = f'"{version}-{os.path.basename(ruta)}"'
+    encabezados = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={geo_settings.cache_max_age_seconds}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (e.strip().removeprefix("W/") for e in if_none_match.split(",")):
+        return Response(status_code=304, headers=encabezados)
+    return FileResponse(ruta, media_type=media_type, headers=encabezados)
+
+
+def geojson(request: Request, nivel: str, zoom: Optional[int]) -> Response:
+    """
+    Simplified GeoJSON of a level at the closest generated zoom.
+
+    Args:
+        nivel: "entidad" or "municipio"
+        zoom: Target map zoom (default: the coarsest generated level)
+    """
+    if nivel not in NIVELES:
+        raise HTTPException(status_code=404, detail="nivel debe ser: entidad o municipio")
+    meta = manifiesto()
+    zooms = sorted(meta["zooms"])
+    elegido = zooms[0] if zoom is None else ([z for z in zooms if z <= zoom] or zooms[:1])[-1]
+    ruta = os.path.join(_directorio(), f"{nivel}_z{elegido}.geojson")
+    if not os.path.exists(ruta):
+        raise HTTPException(status_code=404, detail=f"Geometría {nivel} z{elegido} no generada")
+    return _servir(request, ruta, TIPO_GEOJSON, meta["version"])
+
+
+def tesela(request: Request, nivel: str, z: int, x: int, y: int) -> Response:
+    """
+    A pregenerated vector tile; 204 for tiles with no features.
+
+    Raises:
+        HTTPException: 404 outside the generated zoom range (clients overzoom)
+    """
+    if nivel not in NIVELES:
+        raise HTTPException(status_code=404, detail="nivel debe ser: entidad o municipio")
+    meta = manifiesto()
+    if not meta["tiles_zoom_min"] <= z <= meta["tiles_zoom_max"]:
+        raise HTTPException(status_code=404, detail="Zoom fuera del rango de teselas generadas")
+    ruta = os.path.join(_directorio(), "tiles", nivel, str(z), str(x), f"{y}.pbf")
+    if not os.path.exists(ruta):
+        return Response(
+            status_code=204,
+            headers={"Cache-Control": f"public, max-age={geo_settings.cache_max_age_seconds}"}
+        )
+    return _servir(request, ruta, TIPO_MVT, meta["version"])
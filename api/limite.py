@@ -0,0 +1,324 @@
+"""Per-client rate limiting for the API (token bucket).
+
+Each client (a configured ``X-API-Key``, otherwise its IP address) owns a bucket
+of ``rate_limit_burst`` tokens refilled at ``rate_limit_per_minute``; a
+request spends one token and is answered 429 with ``Retry-After`` when the
+bucket is empty. Buckets live in process memory for a single worker, or
+in Redis (one atomic Lua script per request) so every gunicorn worker
+shares them. If Redis stops answering, the worker falls back to its local
+buckets instead of rejecting or blocking requests.
+
+Only ``/api/`` paths are limited. Loopback clients are exempt by default:
+in the unified deployment the dashboard calls the API through localhost.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as redis_async
+except ImportError:  # pragma: no cover - redis is optional for local runs
+    redis_async = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.loader import load_api_settings, load_cache_settings, load_config
+
+logger = logging.getLogger(__name__)
+
+api_settings = load_api_settings()
+
+# (permitido, tokens restantes, segundos hasta el próximo token)
+Resultado = Tuple[bool, float, float]
+
+# KEYS[1] = bucket; ARGV = capacidad, tokens por segundo. Uses the Redis
+# clock so every worker agrees on elapsed time.
+SCRIPT_CUBETA = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidad
+local ts = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * tasa)
+local permitido = 0
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    permitido = 1
+else
+    espera = (1 - tokens) / tasa
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', ahora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / tasa * 1000) + 1000)
+return {permitido, tostring(tokens), tostring(espera)}
+"""
+
+
+class LimitadorLocal:
+    """Token buckets in process memory."""
+
+    def __init__(self, por_minuto: int, rafaga: int, max_claves: int = 100_000):
+        """
+        Initialize empty buckets.
+
+        Args:
+            por_minuto: Sustained requests per minute per client
+            rafaga: Bucket capacity (requests allowed back to back)
+            max_claves: Buckets kept before idle ones are swept
+        """
+        self.tasa = por_minuto / 60.0
+        self.capacidad = float(rafaga)
+        self.max_claves = max_claves
+        self._cubetas: Dict[str, List[float]] = {}
+        self.rechazadas = 0
+
+    def consumir(self, cliente: str) -> Resultado:
+        """Spend one token of a client's bucket."""
+        ahora = time.monotonic()
+        cubeta = self._cubetas.get(cliente)
+        if cubeta is None:
+            if len(self._cubetas) >= self.max_claves:
+                self._barrer(ahora)
+            self._cubetas[cliente] = [self.capacidad - 1, ahora]
+            return True, self.capacidad - 1, 0.0
+        tokens = min(self.capacidad, cubeta[0] + (ahora - cubeta[1]) * self.tasa)
+        cubeta[1] = ahora
+        if tokens >= 1:
+            cubeta[0] = tokens - 1
+            return True, cubeta[0], 0.0
+        cubeta[0] = tokens
+        self.rechazadas += 1
+        return False, tokens, (1 - tokens) / self.tasa
+
+    def _barrer(self, ahora: float):
+        """Drop buckets that have refilled completely (same as a new client)."""
+        lleno = self.capacidad / self.tasa
+        self._cubetas = {
+            cliente: cubeta for cliente, cubeta in self._cubetas.items()
+            if ahora - cubeta[1] < lleno
+        }
+
+    def metricas(self) -> Dict[str, object]:
+        """Backend, buckets held and rejected requests."""
+        return {"backend": "local", "clientes": len(self._cubetas), "rechazadas": self.rechazadas}
+
+
+class LimitadorRedis:
+    """Token buckets shared by every worker through Redis."""
+
+    PREFIJO = "ep:limite:"
+    # Seconds before trying Redis again after an error
+    ESPERA_REINTENTO = 30.0
+
+    def __init__(self, cliente, por_minuto: int, rafaga: int, respaldo: LimitadorLocal):
+        """
+        Initialize with an asyncio Redis client.
+
+        Args:
+            cliente: ``redis.asyncio`` client
+            por_minuto: Sustained requests per minute per client
+            rafaga: Bucket capacity
+            respaldo: Local limiter used while Redis is unavailable
+        """
+        self.tasa = por_minuto / 60.0
+        self.capacidad = rafaga
+        self.respaldo = respaldo
+        self._script = cliente.register_script(SCRIPT_CUBETA)
+        self._reintento = 0.0
+        self.rechazadas = 0
+
+    async def consumir(self, cliente: str) -> Resultado:
+        """Spend one token of a client's bucket, locally while Redis is failing."""
+        if self._reintento and time.monotonic() < self._reintento:
+            return self.respaldo.consumir(cliente)
+        try:
+            permitido, tokens, espera = await self._script(
+                keys=[self.PREFIJO + cliente], args=[self.capacidad, self.tasa]
+            )
+        except Exception as e:
+            if not self._reintento:
+                logger.warning(f"Límite de peticiones sin Redis ({e}), usando cubetas en proceso")
+            self._reintento = time.monotonic() + self.ESPERA_REINTENTO
+            return self.respaldo.consumir(cliente)
+        if self._reintento:
+            logger.info("Límite de peticiones de nuevo en Redis")
+            self._reintento = 0.0
+        if not permitido:
+            self.rechazadas += 1
+        return bool(permitido), float(tokens), float(espera)
+
+    def metricas(self) -> Dict[str, object]:
+        """Backend and rejected requests (including those rejected locally as fallback)."""
+        return {
+            "backend": "redis",
+            "rechazadas": self.rechazadas + self.respaldo.rechazadas,
+        }
+
+
+def crear_limitador(backend: Optional[str] = None):
+    """
+    Build the limiter for the configured backend.
+
+    Args:
+        backend: "redis" or "local" (defaults to api.rate_limit_backend);
+            "redis" needs cache.use_redis, a redis_url and the redis package
+
+    Returns:
+        LimitadorRedis or LimitadorLocal
+    """
+    por_minuto = api_settings.rate_limit_per_minute
+    rafaga = api_settings.rate_limit_burst or por_minuto
+    local = LimitadorLocal(por_minuto, rafaga)
+    backend = backend or api_settings.rate_limit_backend
+    if backend != "redis" or redis_async is None or not load_cache_settings().use_redis:
+        return local
+    _, _, secrets = load_config()
+    if not secrets.redis_url:
+        return local
+    cliente = redis_async.Redis.from_url(
+        secrets.redis_url, socket_connect_timeout=0.2, socket_timeout=0.2
+    )
+    return LimitadorRedis(cliente, por_minuto, rafaga, local)
+
+
+# Process-wide limiter (the Redis client connects lazily on first use)
+limitador_peticiones = crear_limitador()
+
+
+def _encabezado(scope: Scope, nombre: bytes) -> Optional[bytes]:
+    for clave, valor in scope["headers"]:
+        if clave == nombre:
+            return valor
+    return None
+
+
+def direccion_cliente(scope: Scope) -> Tuple[str, bool]:
+    """
+    Client IP of a request.
+
+    Behind a proxy (``X-Forwarded-For`` present) the peer is the proxy. With
+    rate_limit_trust_forwarded_for the client is the address the proxy
+    appended (the last entry; earlier ones are supplied by the client).
+
+    Returns:
+        Tuple (IP, whether it is the client's own address rather than the proxy's)
+    """
+    ip = scope["client"][0] if scope.get("client") else ""
+    reenviado = _encabezado(scope, b"x-forwarded-for")
+    if reenviado is None:
+        return ip, True
+    if api_settings.rate_limit_trust_forwarded_for:
+        return reenviado.rsplit(b",", 1)[-1].strip().decode("latin-1"), True
+    return ip, False
+
+
+class LimiteMiddleware:
+    """ASGI middleware applying the per-client token bucket to /api/ paths."""
+
+    def __init__(self, app: ASGIApp, limitador=None):
+        """
+        Wrap an ASGI application.
+
+        Args:
+            app: Application to wrap
+            limitador: LimitadorLocal/LimitadorRedis (defaults to the process-wide one)
+        """
+        self.app = app
+        self.limitador = limitador if limitador is not None else limitador_peticiones
+        _, _, secrets = load_config()
+        # Unknown keys are ignored, otherwise rotating keys would bypass the limit
+        self.api_keys = {
+            k.strip().encode(): "k:" + hashlib.sha256(k.strip().encode()).hexdigest()[:16]
+            for k in secrets.security_api_keys.split(",") if k.strip()
+        }
+        self._asincrono = asyncio.iscoroutinefunction(self.limitador.consumir)
+        self.limite = str(api_settings.rate_limit_per_minute).encode()
+        self.exentas = tuple(api_settings.rate_limit_exempt_paths)
+        self.ips_exentas = frozenset(api_settings.rate_limit_exempt_ips)
+
+    def cliente(self, scope: Scope) -> Optional[str]:
+        """Bucket key of a request, or None if it is not limited."""
+        if self.api_keys:
+            api_key = _encabezado(scope, b"x-api-key")
+            if api_key in self.api_keys:
+                return self.api_keys[api_key]
+        ip, propia = direccion_cliente(scope)
+        # A same-host proxy's loopback address does not exempt its clients
+        if propia and ip in self.ips_exentas:
+            return None
+        return "ip:" + ip
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        ruta = scope.get("path", "")
+        if scope["type"] != "http" or not ruta.startswith("/api/") or ruta.startswith(self.exentas):
+            await self.app(scope, receive, send)
+            return
+        cliente = self.cliente(scope)
+        if cliente is None:
+            await self.app(scope, receive, send)
+            return
+        if self._asincrono:
+            permitido, tokens, espera = await self.limitador.consumir(cliente)
+        else:
+            permitido, tokens, espera = self.limitador.consumir(cliente)
+        if not permitido:
+            await self._rechazar(send, espera)
+            return
+        restantes = str(int(tokens)).encode()
+
+        async def enviar(mensaje: Message):
+            if mensaje["type"] == "http.response.start":
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-ratelimit-limit", self.limite),
+                    (b"x-ratelimit-remaining", restantes),
+                ]
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+    async def _rechazar(self, send: Send, espera: float):
+        cuerpo = b'{"detail":"Demasiadas peticiones, reintente m\xc3\xa1s tarde"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", str(max(1, math.ceil(espera))).encode()),
+                (b"x-ratelimit-limit", self.limite),
+                (b"x-ratelimit-remaining", b"0"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
+
+
+if __name__ == "__main__":
+    # Overhead per request of the local backend, end to end through the middleware
+    async def app_vacia(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def descartar(mensaje):
+        pass
+
+    async def medir(n: int = 100_000):
+        clientes = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+        directo, limitado = app_vacia, LimiteMiddleware(app_vacia, LimitadorLocal(10**9, 10**9))
+        for nombre, app in (("sin límite", directo), ("con límite", limitado)):
+            t0 = time.perf_counter()
+            for i in range(n):
+                scope = {"type": "http", "path": "/api/v1/kpi", "headers": [],
+                         "client": (clientes[i % len(clientes)], 5000)}
+                await app(scope, None, descartar)
+            print(f"{nombre:>11}: {(time.perf_counter() - t0) / n * 1e6:.2f} µs/petición")
+
+    asyncio.run(medir())
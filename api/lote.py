@@ -0,0 +1,213 @@
+"""KPI lookups from the prefix-sum cube.
+
+The KPI endpoints are answered from the cube written by
+``recalcular_kpis`` (one NumPy gather for every entity/morbidity pair) and
+fall back to queries over ``serie_oficial`` when no cube is available.
+The batch endpoint returns the same compact columnar payload either way.
+Rates per 100k inhabitants come from the INEGI population loaded into
+``motor_tasas`` by the API process.
+"""
+import logging
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi import HTTPException
+
+from analytics.cubo import CuboKPI
+from analytics.tasas import SQL_MARCA_POBLACION, SQL_POBLACION, motor_tasas
+from api.condicional import version_datos
+from api.db import ERRORES_CONEXION, REINTENTO_SEGUNDOS, obtener_pool
+from config.loader import load_analytics_settings
+
+logger = logging.getLogger(__name__)
+
+analytics_settings = load_analytics_settings()
+
+# INEGI entity codes, for entidades="todas"
+ENTIDADES = [f"{i:02d}" for i in range(1, 33)]
+
+_cubo: Optional[CuboKPI] = None
+_cubo_mtime: Optional[float] = None
+_poblacion_intento = float("-inf")
+_poblacion_version: Optional[int] = None
+
+
+def cubo_kpis() -> Optional[CuboKPI]:
+    """
+    The persisted KPI cube, memory-mapped and reloaded when it is rewritten.
+
+    Returns:
+        CuboKPI, or None if no cube has been written yet
+    """
+    global _cubo, _cubo_mtime
+    directorio = analytics_settings.resolve_path(analytics_settings.cube_dir)
+    try:
+        mtime = os.stat(os.path.join(directorio, "meta.json")).st_mtime
+    except OSError:
+        return None
+    if _cubo is None or mtime != _cubo_mtime:
+        try:
+            _cubo = CuboKPI.cargar(directorio, mmap_mode="r")
+            _cubo_mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cubo de KPIs no legible ({e}), usando serie_oficial")
+            return None
+    return _cubo if _cubo.origen is not None else None
+
+
+async def asegurar_poblacion():
+    """
+    Load the INEGI population into motor_tasas, and reload it if it changed.
+
+    Once loaded, the population watermark is only re-read when the
+    published data version moves, and the rows only when the watermark
+    differs. While the database is down the first load is retried at most
+    every REINTENTO_SEGUNDOS; until then rates are reported as null.
+    """
+    global _poblacion_intento, _poblacion_version
+    version = await version_datos()
+    numero = version[0] if version is not None else None
+    if motor_tasas.cargado:
+        if numero is None or numero == _poblacion_version:
+            return
+    elif time.monotonic() - _poblacion_intento < REINTENTO_SEGUNDOS:
+        return
+    _poblacion_intento = time.monotonic()
+    try:
+        pool = await obtener_pool()
+        async with pool.acquire() as conn:
+            marca = await conn.fetchval(SQL_MARCA_POBLACION)
+            filas = None
+            if not motor_tasas.cargado or marca != motor_tasas.marca:
+                filas = await conn.fetch(SQL_POBLACION)
+    except (HTTPException, *ERRORES_CONEXION) as e:
+        logger.warning(f"Población INEGI no disponible ({e}), tasas omitidas")
+        return
+    _poblacion_version = numero
+    if filas is not None:
+        motor_tasas.cargar_filas(filas, marca)
+
+
+def tasas_100k(
+    claves: Sequence[Optional[str]],
+    conteos: Any,
+    nivel: str = "entidad",
+    anio: Optional[int] = None
+) -> Optional[List[float]]:
+    """
+    Rounded per-100k rates of ``conteos`` (one row per code), flattened row-major.
+
+    Returns:
+        List of rates, or None while no population is loaded
+    """
+    if not motor_tasas.cargado:
+        return None
+    return np.round(motor_tasas.tasas_por_clave(claves, conteos, nivel, anio), 2).ravel().tolist()
+
+
+def columnas_kpis(
+    entidades: Sequence[Optional[str]],
+    morbilidad_ids: Optional[Sequence[int]],
+    casos: Any,
+    defunciones: Any,
+    activos: Any,
+    fecha_actualizacion: Optional[str],
+    fuente: str,
+    anio: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Columnar payload: one entry per (entidad, morbilidad) pair, entity-major.
+
+    ``casos``/``defunciones``/``activos`` are (entidades x morbilidades)
+    matrices (a single column when morbilidad_ids is None). Rates use the
+    population of ``anio`` (the latest census when None) and are null
+    while no population is loaded.
+    """
+    morbs = list(morbilidad_ids) if morbilidad_ids is not None else [None]
+    return {
+        "entidad": [e or "nacional" for e in entidades for _ in morbs],
+        "morbilidad_id": morbs * len(entidades),
+        "casos_totales": np.asarray(casos, dtype=np.int64).ravel().tolist(),
+        "defunciones_totales": np.asarray(defunciones, dtype=np.int64).ravel().tolist(),
+        "casos_activos": np.asarray(activos, dtype=np.int64).ravel().tolist(),
+        "tasa_casos_100k": tasas_100k(entidades, casos, anio=anio),
+        "tasa_defunciones_100k": tasas_100k(entidades, defunciones, anio=anio),
+        "fecha_actualizacion": fecha_actualizacion,
+        "fuente": fuente,
+    }
+
+
+def kpis_lote_cubo(
+    cubo: CuboKPI,
+    entidades: List[Optional[str]],
+    morbilidad_ids: Optional[List[int]],
+    fecha_ini: Optional[date],
+    fecha_fin: date,
+    ventana_activos: int
+) -> Dict[str, Any]:
+    """
+    KPIs of many entity/morbidity pairs from the cube.
+
+    Args:
+        cubo: Loaded KPI cube
+        entidades: Entity codes; None entries are national totals
+        morbilidad_ids: One result per morbidity, or None to sum all of them
+        fecha_ini: Start of the range, or None for the cube origin
+        fecha_fin: End of the range
+        ventana_activos: Days counted as active cases, ending at fecha_fin
+
+    Returns:
+        Columnar dict (see columnas_kpis)
+    """
+    casos, defunciones = cubo.totales_lote(entidades, morbilidad_ids, fecha_ini, fecha_fin)
+    inicio_activos = fecha_fin - timedelta(days=ventana_activos - 1)
+    if fecha_ini is not None:
+        inicio_activos = max(inicio_activos, fecha_ini)
+    activos, _ = cubo.totales_lote(entidades, morbilidad_ids, inicio_activos, fecha_fin)
+    fin = min(fecha_fin, cubo.fecha_fin) if cubo.fecha_fin else None
+    return columnas_kpis(
+        entidades, morbilidad_ids, casos, defunciones, activos,
+        fin.isoformat() if fin else None, "cubo", fecha_fin.year
+    )
+
+
+def _primera(columna: Optional[List[Any]]) -> Any:
+    return columna[0] if columna is not None else None
+
+
+def kpi_cubo(
+    cubo: CuboKPI,
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: Optional[date],
+    fecha_fin: date,
+    ventana_activos: int,
+    morbilidad: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    KPIs of one entity/morbidity selection from the cube.
+
+    Args:
+        morbilidad: Catalog name of morbilidad_id, echoed in the result
+
+    Returns:
+        Same fields as consultas.consultar_kpis
+    """
+    lote = kpis_lote_cubo(
+        cubo, [entidad], [morbilidad_id] if morbilidad_id is not None else None,
+        fecha_ini, fecha_fin, ventana_activos
+    )
+    return {
+        "entidad": lote["entidad"][0],
+        "morbilidad_id": morbilidad_id,
+        "morbilidad": morbilidad,
+        "casos_totales": lote["casos_totales"][0],
+        "defunciones_totales": lote["defunciones_totales"][0],
+        "casos_activos": lote["casos_activos"][0],
+        "tasa_casos_100k": _primera(lote["tasa_casos_100k"]),
+        "tasa_defunciones_100k": _primera(lote["tasa_defunciones_100k"]),
+        "fecha_actualizacion": lote["fecha_actualizacion"],
+    }
@@ -1,25 +1,77 @@
 """Episcopio API - FastAPI application."""
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
 import sys
 import os
 
 # Add parent directory to path for config import
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.loader import load_config
+from config.loader import load_config, load_analytics_settings, load_dashboard_settings
+from db.cache import obtener_cache, clave
+from api.db import ERRORES_CONEXION, abrir_pool, cerrar_pool, obtener_pool
+from api import consultas
+from api.condicional import respuestas_condicionales
+from api.coalescencia import coalescedor
+from api.respuestas import RespuestaJSON
+from api.compresion import CompresionMiddleware, cache_comprimidos
+from api.limite import LimiteMiddleware, limitador_peticiones
+from api.metricas import MetricasMiddleware, consultar_etapas, exposicion
+from api.tiempos import TiemposMiddleware, medir
+from api.perfilador import PerfiladorMiddleware, perfilador
+from api.paginacion import acotar_rango, decodificar_cursor
+from api.lote import ENTIDADES, asegurar_poblacion, cubo_kpis, kpi_cubo, kpis_lote_cubo
+from api.sondeos import escritor_sondeos, fila_sondeo
+from api import exportacion, geo
 
 # Initialize FastAPI app
 app_settings, alert_settings, secrets = load_config()
+analytics_settings = load_analytics_settings()
+dashboard_settings = load_dashboard_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the database pool, population and survey writer on startup; flush and drain them on shutdown."""
+    await abrir_pool()
+    await asegurar_poblacion()
+    escritor_sondeos.iniciar()
+    yield
+    await escritor_sondeos.detener()
+    await cerrar_pool()
+
 
 app = FastAPI(
     title="Episcopio API",
     description="API de lectura para monitoreo epidemiológico de México",
-    version="1.0.0-mvp"
+    version="1.0.0-mvp",
+    lifespan=lifespan,
+    default_response_class=RespuestaJSON
 )
 
+# ETag/Last-Modified validators and 304s for read endpoints (CORS wraps it)
+app.middleware("http")(respuestas_condicionales)
+
+# Compress large bodies; sits outside the conditional middleware to see its ETags
+app.add_middleware(CompresionMiddleware)
+
+# Per-client token bucket on /api/ paths (inside CORS so 429s stay readable)
+app.add_middleware(LimiteMiddleware)
+
+# Prometheus request counts and latencies (outside the limiter so 429s are counted)
+app.add_middleware(MetricasMiddleware)
+
+# Server-Timing breakdown (cache, db, serialize, compress, compute) of /api/ responses
+app.add_middleware(TiemposMiddleware)
+
+# Opt-in profiles of slow requests (toggled at runtime via /api/v1/admin/perfilador)
+app.add_middleware(PerfiladorMiddleware)
+
 # Configure CORS
 origins = secrets.security_cors_allowed_origins.split(",")
 app.add_middleware(
@@ -31,6 +83,25 @@ app.add_middleware(
 )
 
 
+async def base_no_disponible(request: Request, exc: Exception):
+    """Report lost database connections as 503 instead of 500."""
+    return JSONResponse(status_code=503, content={"detail": "Base de datos no disponible"})
+
+
+for _error in ERRORES_CONEXION:
+    app.add_exception_handler(_error, base_no_disponible)
+
+
+def _fecha(valor: Optional[str], nombre: str) -> Optional[date]:
+    """Parse an optional YYYY-MM-DD parameter, rejecting malformed dates with 400."""
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor[:10])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{nombre} debe tener formato YYYY-MM-DD")
+
+
 # Pydantic models
 class KPIRequest(BaseModel):
     """Request model for KPI endpoint."""
@@ -40,6 +111,25 @@ class KPIRequest(BaseModel):
     fecha_fin: Optional[str] = Field(None, description="Fecha fin (YYYY-MM-DD)")
 
 
+class KPILoteRequest(BaseModel):
+    """Request model for the batch KPI endpoint."""
+    entidades: Union[List[str], Literal["todas"]] = Field(
+        ["nacional"], description='Claves de entidad, "nacional", o "todas" (las 32 entidades)'
+    )
+    morbilidades: Optional[Union[List[int], Literal["todas"]]] = Field(
+        None, description='IDs de morbilidad (una columna cada una), "todas", o null para sumarlas'
+    )
+    fecha_ini: Optional[str] = Field(None, description="Fecha inicio (YYYY-MM-DD)")
+    fecha_fin: Optional[str] = Field(None, description="Fecha fin (YYYY-MM-DD)")
+
+
+class PerfiladorRequest(BaseModel):
+    """Request model for the profiler settings."""
+    activo: bool = Field(..., description="Perfilar peticiones muestreadas")
+    umbral_ms: float = Field(1000.0, ge=0, description="Latencia mínima para guardar el perfil (ms)")
+    muestreo: float = Field(0.1, gt=0, le=1, description="Fracción de peticiones perfiladas")
+
+
 class KPIResponse(BaseModel):
     """Response model for KPI endpoint."""
     entidad: str
@@ -82,10 +172,68 @@ def status():
         "app": app_settings.name,
         "version": app_settings.version,
         "status": "operational",
-        "docs": "/docs"
+        "docs": "/docs",
+        "coalescencia": coalescedor.metricas(),
+        "compresion": cache_comprimidos.metricas(),
+        "limite": limitador_peticiones.metricas(),
+        "sondeos": escritor_sondeos.metricas()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics (bearer token required when security_metrics_token is set)."""
+    token = secrets.security_metrics_token
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    try:
+        etapas = await consultar_etapas(await obtener_pool())
+    except (HTTPException, *ERRORES_CONEXION):
+        etapas = None
+    cuerpo, tipo = exposicion(etapas)
+    return Response(cuerpo, media_type=tipo)
+
+
+def _autorizar_diagnostico(request: Request):
+    """
+    Admin endpoints need the metrics token; without one configured they do not exist.
+
+    The client address is not trusted: behind a same-host proxy every request comes from localhost.
+    """
+    token = secrets.security_metrics_token
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Token de diagnóstico inválido")
+
+
+@app.get("/api/v1/admin/perfilador", include_in_schema=False, dependencies=[Depends(_autorizar_diagnostico)])
+def get_perfilador():
+    """Current slow-request profiler settings."""
+    return perfilador.estado()
+
+
+@app.put("/api/v1/admin/perfilador", include_in_schema=False, dependencies=[Depends(_autorizar_diagnostico)])
+def put_perfilador(req: PerfiladorRequest):
+    """Enable, disable or tune the profiler in every worker without a restart."""
+    return perfilador.configurar(req.activo, req.umbral_ms, req.muestreo)
+
+
+@app.get("/api/v1/admin/perfiles", include_in_schema=False, dependencies=[Depends(_autorizar_diagnostico)])
+def get_perfiles():
+    """Saved profiles of slow requests, newest first."""
+    return {"perfiles": perfilador.perfiles()}
+
+
+@app.get("/api/v1/admin/perfiles/{nombre}", include_in_schema=False, dependencies=[Depends(_autorizar_diagnostico)])
+def get_perfil(nombre: str, formato: str = "html"):
+    """A saved profile rendered as an interactive HTML tree or as text (formato=texto)."""
+    if formato not in ("html", "texto"):
+        raise HTTPException(status_code=400, detail="formato debe ser: html o texto")
+    contenido = perfilador.renderizar(nombre, formato)
+    return HTMLResponse(contenido) if formato == "html" else PlainTextResponse(contenido)
+
+
 @app.get("/api/v1/health")
 def health():
     """Health check endpoint."""
@@ -111,141 +259,383 @@ def meta():
 
 
 @app.post("/api/v1/kpi")
-def get_kpis(req: KPIRequest):
+async def get_kpis(req: KPIRequest):
     """
     Get KPIs (Key Performance Indicators) for epidemiological data.
     
-    MVP: Returns mock data. Production: Query from PostgreSQL.
+    Answered from the KPI cube written by recalcular_kpis; without a cube,
+    aggregated from serie_oficial (and cached).
     """
-    # TODO: Implement database query
-    # For MVP, return mock data
-    return {
-        "kpis": [
-            {
-                "entidad": req.entidad or "31",
-                "morbilidad": "COVID-19",
-                "casos_totales": 12500,
-                "defunciones_totales": 350,
-                "casos_activos": 450,
-                "fecha_actualizacion": "2025-01-15"
-            }
-        ]
-    }
+    return await _kpis(req.entidad, req.morbilidad_id, req.fecha_ini, req.fecha_fin)
 
 
-@app.get("/api/v1/timeseries")
-def get_timeseries(
+@app.get("/api/v1/kpi")
+async def get_kpis_condicional(
     entidad: Optional[str] = None,
     morbilidad_id: Optional[int] = None,
     fecha_ini: Optional[str] = None,
     fecha_fin: Optional[str] = None
+):
+    """
+    Same as POST /api/v1/kpi with query parameters, so it supports conditional requests.
+    """
+    return await _kpis(entidad, morbilidad_id, fecha_ini, fecha_fin)
+
+
+async def _kpis(
+    entidad: Optional[str],
+    morbilidad_id: Optional[int],
+    fecha_ini: Optional[str],
+    fecha_fin: Optional[str]
+):
+    await asegurar_poblacion()
+    cubo = cubo_kpis()
+    if cubo is not None:
+        if entidad is not None and entidad not in ENTIDADES:
+            raise HTTPException(status_code=400, detail="entidad debe ser una clave de entidad (01-32)")
+        ini, fin = _fecha(fecha_ini, "fecha_ini"), _fecha(fecha_fin, "fecha_fin") or date.today()
+        nombre = None
+        if morbilidad_id is not None:
+            try:
+                nombre = await consultas.nombre_morbilidad(await obtener_pool(), morbilidad_id)
+            except (HTTPException, *ERRORES_CONEXION):
+                pass  # the figures do not need the database
+        return RespuestaJSON({"kpis": [kpi_cubo(
+            cubo, entidad, morbilidad_id, ini, fin, analytics_settings.active_window_days, nombre
+        )]})
+
+    cache = obtener_cache()
+    key = clave(
+        "kpi",
+        entidad=entidad,
+        morbilidad_id=morbilidad_id,
+        fecha_ini=fecha_ini,
+        fecha_fin=fecha_fin
+    )
+    with medir("cache"):
+        cached = cache.obtener(key)
+    if cached is not None:
+        return RespuestaJSON({"kpis": [cached]})
+
+    ini, fin = _fecha(fecha_ini, "fecha_ini"), _fecha(fecha_fin, "fecha_fin")
+
+    async def calcular():
+        kpi = await consultas.consultar_kpis(
+            await obtener_pool(),
+            entidad,
+            morbilidad_id,
+            ini,
+            fin,
+            analytics_settings.active_window_days
+        )
+        with medir("cache"):
+            cache.guardar(key, kpi, [(entidad, morbilidad_id)])
+        return kpi
+
+    return RespuestaJSON({"kpis": [await coalescedor.ejecutar(key, calcular)]})
+
+
+@app.post("/api/v1/kpi/lote")
+async def get_kpis_lote(req: KPILoteRequest):
+    """
+    KPIs of many entities and morbidities in one request.
+
+    Answered with one KPI-cube lookup (or one grouped query when no cube
+    has been written). The payload is columnar: ``entidad``,
+    ``morbilidad_id``, ``casos_totales``, ``defunciones_totales``,
+    ``casos_activos``, ``tasa_casos_100k`` and ``tasa_defunciones_100k``
+    are parallel arrays, entity-major.
+    """
+    if req.entidades == "todas":
+        entidades: List[Optional[str]] = list(ENTIDADES)
+    else:
+        entidades = [None if e == "nacional" else e for e in dict.fromkeys(req.entidades)]
+        invalidas = [e for e in entidades if e is not None and e not in ENTIDADES]
+        if invalidas:
+            raise HTTPException(status_code=400, detail=f"Entidades inválidas: {', '.join(invalidas)}")
+    if not entidades:
+        raise HTTPException(status_code=400, detail="entidades no puede estar vacío")
+    ini = _fecha(req.fecha_ini, "fecha_ini")
+    fin = _fecha(req.fecha_fin, "fecha_fin") or date.today()
+
+    await asegurar_poblacion()
+    cubo = cubo_kpis()
+    if req.morbilidades == "todas":
+        morbilidades = list(cubo.morbilidades) if cubo is not None else None
+        if morbilidades is None:
+            morbilidades = await consultas.consultar_morbilidades(await obtener_pool())
+    else:
+        morbilidades = req.morbilidades
+
+    if cubo is not None:
+        return RespuestaJSON(kpis_lote_cubo(
+            cubo, entidades, morbilidades, ini, fin, analytics_settings.active_window_days
+        ))
+
+    cache = obtener_cache()
+    key = clave(
+        "kpi_lote",
+        entidades=",".join(e or "nacional" for e in entidades),
+        morbilidades=",".join(map(str, morbilidades)) if morbilidades is not None else None,
+        fecha_ini=req.fecha_ini,
+        fecha_fin=fin.isoformat()
+    )
+    with medir("cache"):
+        cached = cache.obtener(key)
+    if cached is not None:
+        return RespuestaJSON(cached)
+
+    async def calcular():
+        resultado = await consultas.consultar_kpis_lote(
+            await obtener_pool(), entidades, morbilidades, ini, fin, analytics_settings.active_window_days
+        )
+        with medir("cache"):
+            cache.guardar(key, resultado, [(None, None)])
+        return resultado
+
+    return RespuestaJSON(await coalescedor.ejecutar(key, calcular))
+
+
+@app.get("/api/v1/timeseries")
+async def get_timeseries(
+    entidad: Optional[str] = None,
+    morbilidad_id: Optional[int] = None,
+    fecha_ini: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    nivel: str = "total",
+    limite: Optional[int] = Query(None, ge=1, le=dashboard_settings.max_results),
+    cursor: Optional[str] = None,
+    resolucion: str = "dia",
+    max_points: Optional[int] = Query(None, ge=3, le=dashboard_settings.max_points)
 ):
     """
     Get time series data for official and social metrics.
     
-    MVP: Returns mock data. Production: Query from PostgreSQL.
+    ``nivel=total`` returns daily totals from serie_oficial and relevant
+    social_menciones, one page of ``limite`` days at a time; ``nivel=municipio``
+    returns the underlying rows ordered by (fecha, cve_ent, cve_mun). Pages
+    are chained with the ``paginacion.siguiente`` cursor, and the date range
+    is capped at dashboard.max_range_days (the last ones by default).
+
+    For charts, ``resolucion=semana|mes`` returns exact ISO-week/month totals
+    and ``max_points`` an LTTB downsample; either one returns the whole range
+    (up to dashboard.max_summary_range_days) in a single unpaginated response.
     """
-    # TODO: Implement database query
-    # For MVP, return mock data
-    return {
-        "serie_oficial": [
-            {"fecha": "2025-01-01", "casos": 120, "defunciones": 3},
-            {"fecha": "2025-01-08", "casos": 135, "defunciones": 4},
-            {"fecha": "2025-01-15", "casos": 145, "defunciones": 5}
-        ],
-        "serie_social": {
-            "menciones": [
-                {"fecha": "2025-01-01", "conteo": 45, "sentimiento": -0.1},
-                {"fecha": "2025-01-08", "conteo": 52, "sentimiento": -0.3},
-                {"fecha": "2025-01-15", "conteo": 68, "sentimiento": -0.4}
-            ]
-        }
-    }
+    if nivel not in ("total", "municipio"):
+        raise HTTPException(status_code=400, detail="nivel debe ser: total o municipio")
+    if resolucion not in ("dia", "semana", "mes"):
+        raise HTTPException(status_code=400, detail="resolucion debe ser: dia, semana o mes")
+    resumida = resolucion != "dia" or max_points is not None
+    if resumida and (nivel != "total" or cursor):
+        raise HTTPException(status_code=400, detail="resolucion/max_points solo aplican a nivel=total sin cursor")
+    ini, fin = acotar_rango(
+        _fecha(fecha_ini, "fecha_ini"),
+        _fecha(fecha_fin, "fecha_fin"),
+        dashboard_settings.max_summary_range_days if resumida else dashboard_settings.max_range_days
+    )
+    limite = limite or dashboard_settings.max_results
+    posicion = decodificar_cursor(cursor, 1 if nivel == "total" else 4) if cursor else None
+
+    cache = obtener_cache()
+    key = clave(
+        "timeseries",
+        entidad=entidad,
+        morbilidad_id=morbilidad_id,
+        fecha_ini=ini.isoformat(),
+        fecha_fin=fin.isoformat(),
+        nivel=nivel,
+        limite=limite,
+        cursor=cursor,
+        resolucion=resolucion,
+        max_points=max_points
+    )
+    with medir("cache"):
+        cached = cache.obtener(key)
+    if cached is not None:
+        return RespuestaJSON(cached)
+
+    async def calcular():
+        pool = await obtener_pool()
+        if resumida:
+            resultado = await consultas.consultar_serie_resumida(
+                pool, entidad, morbilidad_id, ini, fin, resolucion, max_points
+            )
+        elif nivel == "total":
+            resultado = await consultas.consultar_serie(
+                pool, entidad, morbilidad_id, ini, fin, limite, posicion[0] if posicion else None
+            )
+        else:
+            resultado = await consultas.consultar_serie_municipio(
+                pool, entidad, morbilidad_id, ini, fin, limite, posicion
+            )
+        with medir("cache"):
+            cache.guardar(key, resultado, [(entidad, morbilidad_id)])
+        return resultado
+
+    return RespuestaJSON(await coalescedor.ejecutar(key, calcular))
 
 
 @app.get("/api/v1/map/entidad")
-def get_map_data():
+async def get_map_data():
     """
     Get choropleth map data by entity.
     
-    MVP: Returns mock data. Production: Query from PostgreSQL with PostGIS.
+    Cumulative cases, deaths and rates per 100k inhabitants of every
+    entity in geo_entidad. Only the
+    values keyed by cve_ent are returned; the geometry is fetched once from
+    /api/v1/geo/entidad or the vector tiles and cached by the client.
     """
-    # TODO: Implement database query with geospatial data
-    return {
-        "entidades": [
-            {"cve_ent": "31", "nombre": "Yucatán", "casos": 1250, "defunciones": 35},
-            {"cve_ent": "23", "nombre": "Quintana Roo", "casos": 980, "defunciones": 28},
-            {"cve_ent": "04", "nombre": "Campeche", "casos": 650, "defunciones": 18}
-        ]
-    }
+    cache = obtener_cache()
+    key = clave("map", nivel="entidad")
+    with medir("cache"):
+        cached = cache.obtener(key)
+    if cached is not None:
+        return RespuestaJSON(cached)
+
+    async def calcular():
+        await asegurar_poblacion()
+        resultado = await consultas.consultar_mapa_entidad(await obtener_pool())
+        resultado["geometria"] = geo.enlaces("entidad")
+        with medir("cache"):
+            cache.guardar(key, resultado, [(None, None)])
+        return resultado
+
+    return RespuestaJSON(await coalescedor.ejecutar(key, calcular))
+
+
+@app.get("/api/v1/map/municipio")
+async def get_map_municipio(entidad: Optional[str] = None):
+    """
+    Get choropleth map data by municipality (optionally of one entity).
+
+    Cases, deaths and rates per 100k (municipal population) keyed by
+    cve_mun; geometry from /api/v1/geo/municipio or the tiles.
+    """
+    cache = obtener_cache()
+    key = clave("map", nivel="municipio", entidad=entidad)
+    with medir("cache"):
+        cached = cache.obtener(key)
+    if cached is not None:
+        return RespuestaJSON(cached)
+
+    async def calcular():
+        await asegurar_poblacion()
+        resultado = await consultas.consultar_mapa_municipio(await obtener_pool(), entidad)
+        resultado["geometria"] = geo.enlaces("municipio")
+        with medir("cache"):
+            cache.guardar(key, resultado, [(entidad, None)])
+        return resultado
+
+    return RespuestaJSON(await coalescedor.ejecutar(key, calcular))
+
+
+@app.get("/api/v1/geo/{nivel}")
+def get_geometria(request: Request, nivel: str, zoom: Optional[int] = Query(None, ge=0, le=22)):
+    """
+    Simplified GeoJSON geometry of entities or municipalities.
+
+    Precomputed by etl/geometrias.py at several zoom levels; the closest
+    level not finer than ``zoom`` is returned, with long-lived caching.
+    """
+    return geo.geojson(request, nivel, zoom)
+
+
+@app.get("/api/v1/tiles/{nivel}/{z}/{x}/{y}.pbf")
+def get_tesela(request: Request, nivel: str, z: int, x: int, y: int):
+    """
+    Pregenerated Mapbox Vector Tile of entities or municipalities.
+    """
+    return geo.tesela(request, nivel, z, x, y)
 
 
 @app.get("/api/v1/alerts")
-def get_alerts(estado: Optional[str] = "activa"):
+async def get_alerts(
+    estado: Optional[str] = "activa",
+    limite: int = Query(100, ge=1, le=1000)
+):
     """
-    Get alerts (active or resolved).
-    
-    MVP: Returns mock data. Production: Query from PostgreSQL.
+    Get alerts (active or resolved), most recent first.
     """
-    # TODO: Implement database query
-    return {
-        "alertas": [
-            {
-                "id": 1,
-                "tipo": "incremento_subito",
-                "regla": "a1",
-                "estado": "activa",
-                "evidencia": {
-                    "entidad": "31",
-                    "delta_porcentaje": 25.5,
-                    "casos_actual": 145,
-                    "casos_promedio": 115
-                },
-                "created_at": "2025-01-15T10:30:00Z"
-            }
-        ]
-    }
+    if estado not in ("activa", "resuelta"):
+        raise HTTPException(status_code=400, detail="estado debe ser: activa o resuelta")
+    async def calcular():
+        return await consultas.consultar_alertas(await obtener_pool(), estado, limite)
+
+    alertas = await coalescedor.ejecutar(clave("alerts", estado=estado, limite=limite), calcular)
+    return {"alertas": alertas}
 
 
 @app.get("/api/v1/bulletin/{bulletin_id}")
-def get_bulletin(bulletin_id: int):
+async def get_bulletin(bulletin_id: int):
     """
     Get rendered bulletin by ID.
-    
-    MVP: Returns mock data. Production: Query from PostgreSQL.
     """
-    # TODO: Implement database query
-    if bulletin_id < 1:
+    async def calcular():
+        return await consultas.consultar_boletin(await obtener_pool(), bulletin_id)
+
+    boletin = await coalescedor.ejecutar(clave("bulletin", id=bulletin_id), calcular)
+    if boletin is None:
         raise HTTPException(status_code=404, detail="Boletín no encontrado")
-    
-    return {
-        "id": bulletin_id,
-        "periodo": "2025-01-01 a 2025-01-15",
-        "resumen_html": "<h1>Boletín Epidemiológico</h1><p>Resumen del período...</p>",
-        "estado": "publicado",
-        "published_at": "2025-01-16T00:00:00Z"
-    }
+    return boletin
 
 
-@app.post("/api/v1/survey")
-def submit_survey(survey: SurveyRequest):
+@app.get("/api/v1/export/{nombre}")
+async def export_data(
+    nombre: str,
+    formato: str = "ndjson",
+    entidad: Optional[str] = None,
+    morbilidad_id: Optional[int] = None,
+    fecha_ini: Optional[str] = None,
+    fecha_fin: Optional[str] = None
+):
+    """
+    Stream a bulk extract of serie_oficial or social (menciones) rows.
+
+    Same filters as /api/v1/timeseries (morbilidad_id only applies to
+    serie_oficial). ``formato`` is ndjson, csv or arrow (Arrow IPC stream);
+    the body is sent with chunked transfer as rows are read.
+    """
+    definicion = exportacion.validar(nombre, formato)
+    ini, fin = _fecha(fecha_ini, "fecha_ini"), _fecha(fecha_fin, "fecha_fin")
+    parametros = (entidad, morbilidad_id, ini, fin) if nombre == "serie_oficial" else (entidad, ini, fin)
+    pool = await obtener_pool()
+    extension = "arrows" if formato == "arrow" else formato
+    return StreamingResponse(
+        await exportacion.iniciar(pool, definicion, formato, parametros),
+        media_type=exportacion.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{extension}"'}
+    )
+
+
+@app.post("/api/v1/survey", status_code=202)
+async def submit_survey(survey: SurveyRequest):
     """
     Submit anonymous clinical survey.
     
-    MVP: Validates and returns success. Production: Store in PostgreSQL.
+    The submission is validated and buffered; it is written to
+    sondeo_clinico with other submissions within survey_flush_ms
+    (202 Accepted). Answers 503 while the buffer is full.
     """
-    # TODO: Implement database insert with rate limiting
     # Validate nivel_actividad
     if survey.nivel_actividad not in ["bajo", "moderado", "alto"]:
         raise HTTPException(
             status_code=400,
             detail="nivel_actividad debe ser: bajo, moderado, o alto"
         )
-    
+    if survey.cve_ent not in ENTIDADES:
+        raise HTTPException(status_code=400, detail="cve_ent debe ser una clave de entidad (01-32)")
+    if survey.cve_mun is not None and not (len(survey.cve_mun) == 5 and survey.cve_mun.startswith(survey.cve_ent)):
+        raise HTTPException(status_code=400, detail="cve_mun debe tener 5 dígitos y pertenecer a cve_ent")
+    # PostgreSQL rejects NUL in text; other control characters have no place in a note
+    if any(c < " " and c not in "\t\n\r" or c == "\x7f" for c in survey.sintomas_observacion):
+        raise HTTPException(status_code=400, detail="sintomas_observacion contiene caracteres de control")
+
+    escritor_sondeos.encolar(fila_sondeo(
+        survey.cve_ent, survey.cve_mun, survey.sintomas_observacion, survey.nivel_actividad
+    ))
     return {
         "success": True,
-        "message": "Sondeo registrado exitosamente. Gracias por tu contribución.",
-        "id": 12345  # Mock ID
+        "message": "Sondeo registrado exitosamente. Gracias por tu contribución."
     }
 
 
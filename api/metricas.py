@@ -0,0 +1,266 @@
+"""Prometheus metrics for the API (``GET /metrics``).
+
+``MetricasMiddleware`` counts requests and observes their latency per
+route template (``/api/v1/geo/{nivel}``, never the raw path, so label
+cardinality stays bounded) and tracks requests in flight. The counters
+the API already keeps (cache and compression hits, coalesced queries,
+rate-limited requests, buffered surveys, pool usage) are mirrored into
+Prometheus metrics at most every ``metrics_refresh_seconds``.
+
+Pipeline stages run in the scheduler process and record themselves in
+``ingesta_log`` (fuente ``etapa:<nombre>``); the last run of each stage
+is read at scrape time.
+
+With several gunicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` (see
+startup.sh) so every scrape aggregates all workers.
+"""
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.coalescencia import coalescedor
+from api.compresion import cache_comprimidos
+from api.db import estado_pool
+from api.limite import limitador_peticiones
+from api.sondeos import escritor_sondeos
+from config.loader import load_api_settings
+from db.cache import obtener_cache
+
+api_settings = load_api_settings()
+
+# Request latencies span cache hits (sub-ms) to bulk exports (tens of seconds)
+BUCKETS_LATENCIA = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PETICIONES = Counter(
+    "episcopio_http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+LATENCIA = Histogram(
+    "episcopio_http_request_duration_seconds", "Time until the last body byte was sent",
+    ["method", "route"], buckets=BUCKETS_LATENCIA
+)
+EN_CURSO = Gauge(
+    "episcopio_http_requests_in_progress", "HTTP requests being served", multiprocess_mode="livesum"
+)
+CACHE = Counter(
+    "episcopio_cache_lookups_total", "KPI/timeseries cache lookups", ["result"]
+)
+COMPRESION = Counter(
+    "episcopio_compression_cache_lookups_total", "Compressed-body cache lookups", ["result"]
+)
+COALESCENCIA = Counter(
+    "episcopio_coalescer_requests_total", "Read queries executed or coalesced into an in-flight one", ["result"]
+)
+RECHAZADAS = Counter(
+    "episcopio_rate_limited_requests_total", "Requests rejected with 429 by the rate limiter"
+)
+SONDEOS_ESCRITOS = Counter(
+    "episcopio_survey_rows_written_total", "Survey rows written by the batch writer"
+)
+SONDEOS_PENDIENTES = Gauge(
+    "episcopio_survey_rows_pending", "Survey rows buffered awaiting a flush", multiprocess_mode="livesum"
+)
+POOL = Gauge(
+    "episcopio_db_pool_connections", "asyncpg pool connections", ["state"], multiprocess_mode="livesum"
+)
+
+for _resultado in ("hit", "miss"):
+    CACHE.labels(_resultado)
+    COMPRESION.labels(_resultado)
+for _resultado in ("executed", "coalesced"):
+    COALESCENCIA.labels(_resultado)
+
+SQL_ETAPAS = """
+    SELECT DISTINCT ON (l.fuente)
+           substr(l.fuente, 7) AS etapa,
+           l.duracion_segundos::float8 AS duracion,
+           l.estado,
+           (SELECT extract(epoch FROM max(e.fecha_fin)) FROM ingesta_log e
+            WHERE e.fuente = l.fuente AND e.estado = 'completado')::float8 AS ultimo_exito
+    FROM ingesta_log l
+    WHERE l.fuente LIKE 'etapa:%'
+    ORDER BY l.fuente, l.id DESC
+"""
+
+_RUTAS: Dict[Any, str] = {}
+
+# Labelled children by (method, route, status); labels() takes a lock on every call
+_HIJOS: Dict[Tuple[str, str, str], Tuple[Any, Any]] = {}
+
+
+def plantilla_ruta(scope: Scope) -> str:
+    """Route template of a routed request ("/*" under the dashboard mount)."""
+    ruta = scope.get("route")
+    if ruta is None:
+        # Older Starlette only records the endpoint
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if not _RUTAS and "app" in scope:
+            for r in scope["app"].routes:
+                _RUTAS[getattr(r, "endpoint", None) or getattr(r, "app", None)] = (
+                    r.path + "/*" if isinstance(r, Mount) else r.path
+                )
+        return _RUTAS.get(endpoint, "unmatched")
+    return ruta.path + "/*" if isinstance(ruta, Mount) else ruta.path
+
+
+class _Espejo:
+    """Mirrors cumulative counters kept elsewhere into Prometheus counters."""
+
+    def __init__(self):
+        self._previos: Dict[Tuple, float] = {}
+
+    def sincronizar(self, contador, valor: float, *etiquetas: str):
+        clave = (contador, etiquetas)
+        delta = valor - self._previos.get(clave, 0)
+        if delta > 0:
+            (contador.labels(*etiquetas) if etiquetas else contador).inc(delta)
+        self._previos[clave] = valor
+
+
+_espejo = _Espejo()
+_proxima_sincronizacion = 0.0
+
+
+def sincronizar():
+    """Copy this worker's internal counters and pool usage into the metrics."""
+    global _proxima_sincronizacion
+    _proxima_sincronizacion = time.monotonic() + api_settings.metrics_refresh_seconds
+    cache = obtener_cache().metricas()
+    _espejo.sincronizar(CACHE, cache["aciertos"], "hit")
+    _espejo.sincronizar(CACHE, cache["fallos"], "miss")
+    compresion = cache_comprimidos.metricas()
+    _espejo.sincronizar(COMPRESION, compresion["aciertos"], "hit")
+    _espejo.sincronizar(COMPRESION, compresion["fallos"], "miss")
+    coalescencia = coalescedor.metricas()
+    _espejo.sincronizar(COALESCENCIA, coalescencia["ejecutadas"], "executed")
+    _espejo.sincronizar(COALESCENCIA, coalescencia["coalescidas"], "coalesced")
+    _espejo.sincronizar(RECHAZADAS, limitador_peticiones.metricas()["rechazadas"])
+    sondeos = escritor_sondeos.metricas()
+    _espejo.sincronizar(SONDEOS_ESCRITOS, sondeos["escritas"])
+    SONDEOS_PENDIENTES.set(sondeos["pendientes"])
+    pool = estado_pool() or {"conexiones": 0, "libres": 0, "maximo": 0}
+    POOL.labels("in_use").set(pool["conexiones"] - pool["libres"])
+    POOL.labels("idle").set(pool["libres"])
+    POOL.labels("max").set(pool["maximo"])
+
+
+class MetricasMiddleware:
+    """ASGI middleware recording request counts, latencies and requests in flight."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        if time.monotonic() >= _proxima_sincronizacion:
+            sincronizar()
+        estado = [500]
+
+        async def enviar(mensaje: Message):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        EN_CURSO.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            EN_CURSO.dec()
+            clave = (scope["method"], plantilla_ruta(scope), str(estado[0]))
+            hijos = _HIJOS.get(clave)
+            if hijos is None:
+                hijos = _HIJOS[clave] = (PETICIONES.labels(*clave), LATENCIA.labels(*clave[:2]))
+            hijos[0].inc()
+            hijos[1].observe(time.perf_counter() - inicio)
+
+
+async def consultar_etapas(pool) -> List[Dict[str, Any]]:
+    """Last recorded run of every pipeline stage."""
+    async with pool.acquire() as conn:
+        return [dict(f) for f in await conn.fetch(SQL_ETAPAS)]
+
+
+def _registro_etapas(etapas: List[Dict[str, Any]]) -> CollectorRegistry:
+    duracion = GaugeMetricFamily(
+        "episcopio_pipeline_stage_duration_seconds", "Duration of the last run of a pipeline stage", labels=["stage"]
+    )
+    exito = GaugeMetricFamily(
+        "episcopio_pipeline_stage_success", "Whether the last run of a pipeline stage succeeded", labels=["stage"]
+    )
+    ultimo = GaugeMetricFamily(
+        "episcopio_pipeline_stage_last_success_timestamp_seconds",
+        "End of the last successful run of a pipeline stage", labels=["stage"]
+    )
+    for etapa in etapas:
+        duracion.add_metric([etapa["etapa"]], etapa["duracion"] or 0.0)
+        exito.add_metric([etapa["etapa"]], 1.0 if etapa["estado"] == "completado" else 0.0)
+        if etapa["ultimo_exito"] is not None:
+            ultimo.add_metric([etapa["etapa"]], etapa["ultimo_exito"])
+
+    class _Etapas:
+        def collect(self):
+            return [duracion, exito, ultimo]
+
+    registro = CollectorRegistry(auto_describe=True)
+    registro.register(_Etapas())
+    return registro
+
+
+def exposicion(etapas: Optional[List[Dict[str, Any]]] = None) -> Tuple[bytes, str]:
+    """
+    Render every metric in the Prometheus text format.
+
+    Args:
+        etapas: Rows of consultar_etapas, or None if the database is unavailable
+
+    Returns:
+        (body, content type)
+    """
+    sincronizar()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    cuerpo = generate_latest(registro)
+    if etapas:
+        cuerpo += generate_latest(_registro_etapas(etapas))
+    return cuerpo, CONTENT_TYPE_LATEST
+
+
+if __name__ == "__main__":
+    # Overhead per request of the middleware around an empty application
+    import asyncio
+
+    async def app_vacia(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def descartar(mensaje):
+        pass
+
+    async def medir(n: int = 100_000):
+        global _proxima_sincronizacion
+        _proxima_sincronizacion = float("inf")
+        for nombre, app in (("sin métricas", app_vacia), ("con métricas", MetricasMiddleware(app_vacia))):
+            t0 = time.perf_counter()
+            for _ in range(n):
+                await app({"type": "http", "method": "GET", "path": "/api/v1/kpi"}, None, descartar)
+            print(f"{nombre:>13}: {(time.perf_counter() - t0) / n * 1e6:.2f} µs/petición")
+
+    asyncio.run(medir())
@@ -0,0 +1,128 @@
+"""How the Dash (Flask/WSGI) dashboard is served inside the unified app.
+
+Starlette's ``WSGIMiddleware`` runs every dashboard request in anyio's
+default threadpool, the same 40 threads that serve the API's sync
+endpoints. A burst of slow dashboard callbacks, which themselves call
+the API over localhost, can then take every thread and stall API
+requests, including the ones those callbacks are waiting for.
+
+``modo="aislado"`` (default) serves the dashboard with a2wsgi, which runs
+the WSGI app on its own bounded ``ThreadPoolExecutor`` of
+``dashboard.wsgi_threads`` threads: excess dashboard requests queue there
+and the API keeps its threadpool. ``modo="compartido"`` is the previous
+Starlette mount, kept for comparison (``python api/montaje.py``, or
+``api/carga.py --mezcla mixta`` against a running server) and used as a
+fallback when a2wsgi is not installed.
+"""
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from a2wsgi import WSGIMiddleware as A2WSGIMiddleware
+except ImportError:  # pragma: no cover - without a2wsgi the dashboard shares the threadpool
+    A2WSGIMiddleware = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.types import ASGIApp
+
+from config.loader import load_dashboard_settings
+
+logger = logging.getLogger(__name__)
+
+dashboard_settings = load_dashboard_settings()
+
+MODOS = ("aislado", "compartido")
+
+
+def envolver_wsgi(
+    servidor,
+    modo: Optional[str] = None,
+    hilos: Optional[int] = None
+) -> Tuple[ASGIApp, Dict[str, Any]]:
+    """
+    Wrap a WSGI app (the Dash Flask server) for mounting on the FastAPI app.
+
+    Args:
+        servidor: WSGI application
+        modo: "aislado" or "compartido" (defaults to EP_DASHBOARD_WSGI_MODE,
+            then dashboard.wsgi_mode)
+        hilos: Dedicated threads in "aislado" mode (defaults to dashboard.wsgi_threads)
+
+    Returns:
+        Tuple (ASGI app, description of the serving mode for diagnostics)
+
+    Raises:
+        ValueError: For an unknown mode
+    """
+    modo = modo or os.getenv("EP_DASHBOARD_WSGI_MODE") or dashboard_settings.wsgi_mode
+    hilos = hilos or dashboard_settings.wsgi_threads
+    if modo not in MODOS:
+        raise ValueError(f"wsgi_mode debe ser: {', '.join(MODOS)}")
+    if modo == "aislado" and A2WSGIMiddleware is None:
+        logger.warning("a2wsgi no instalado, el dashboard comparte el threadpool de la API")
+        modo = "compartido"
+    if modo == "aislado":
+        return A2WSGIMiddleware(servidor, workers=hilos), {"modo": modo, "hilos": hilos}
+    return WSGIMiddleware(servidor), {"modo": modo, "hilos": None}
+
+
+if __name__ == "__main__":
+    # Mixed load in one process: dashboard callbacks blocking 200 ms (as when
+    # they wait on slow API calls) alongside a sync API endpoint. Reports API
+    # latency and dashboard throughput for each serving mode.
+    import asyncio
+    import time
+
+    import httpx
+    import numpy as np
+    from fastapi import FastAPI
+
+    def callback_lento(environ, start_response):
+        time.sleep(0.2)
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [b'{"response": {}}']
+
+    def construir(modo: str) -> Tuple[FastAPI, Dict[str, Any]]:
+        app = FastAPI()
+
+        @app.get("/api/v1/health")
+        def health():
+            return {"ok": True}
+
+        envuelto, descripcion = envolver_wsgi(callback_lento, modo)
+        app.mount("/", envuelto)
+        return app, descripcion
+
+    async def medir(modo: str, clientes_dash: int = 80, clientes_api: int = 10, duracion: float = 5.0):
+        app, descripcion = construir(modo)
+        transporte = httpx.ASGITransport(app=app)
+        latencias_api, dash = [], 0
+        async with httpx.AsyncClient(transport=transporte, base_url="http://x", timeout=60) as http:
+            fin = time.perf_counter() + duracion
+
+            async def cliente_dash():
+                nonlocal dash
+                while time.perf_counter() < fin:
+                    await http.post("/_dash-update-component")
+                    dash += 1
+
+            async def cliente_api():
+                while time.perf_counter() < fin:
+                    t0 = time.perf_counter()
+                    await http.get("/api/v1/health")
+                    latencias_api.append(time.perf_counter() - t0)
+
+            await asyncio.gather(
+                *(cliente_dash() for _ in range(clientes_dash)),
+                *(cliente_api() for _ in range(clientes_api)),
+            )
+        p50, p99 = np.percentile(latencias_api, [50, 99]) * 1000
+        print(f"{modo:<11} hilos={descripcion['hilos'] or '-':<4} API: {len(latencias_api) / duracion:>7.1f} req/s "
+              f"p50 {p50:>6.1f} ms p99 {p99:>6.1f} ms | dashboard: {dash / duracion:>6.1f} req/s")
+
+    for modo in ("compartido", "aislado"):
+        asyncio.run(medir(modo))
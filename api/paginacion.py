@@ -0,0 +1,70 @@
+"""Keyset (cursor) pagination and range limits for read endpoints.
+
+A cursor is the sort key of the last row of a page, encoded as an opaque
+URL-safe token. The next page is read with a row comparison against it,
+which the ordered index turns into a range scan: every page costs the
+same, unlike OFFSET, which reads and discards all previous rows.
+"""
+import base64
+import json
+from datetime import date, timedelta
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def codificar_cursor(valores: List[Any]) -> str:
+    """Opaque token for a sort key (dates as ISO strings)."""
+    crudo = json.dumps([v.isoformat() if isinstance(v, date) else v for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, longitud: int) -> List[Any]:
+    """
+    Decode a cursor produced by codificar_cursor.
+
+    Args:
+        cursor: Token received from the client
+        longitud: Number of values expected in the sort key
+
+    Returns:
+        Sort key values; the first one (the date) parsed as ``date``
+
+    Raises:
+        HTTPException: 400 if the token is malformed
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != longitud:
+            raise ValueError(cursor)
+        valores[0] = date.fromisoformat(valores[0])
+        return valores
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+def acotar_rango(
+    fecha_ini: Optional[date],
+    fecha_fin: Optional[date],
+    max_dias: int
+) -> Tuple[date, date]:
+    """
+    Apply the server-side maximum date range.
+
+    Missing bounds default to the ``max_dias`` days ending at ``fecha_fin``
+    (today if not given); explicit ranges longer than that are rejected.
+
+    Raises:
+        HTTPException: 400 if the range is inverted or too long
+    """
+    fecha_fin = fecha_fin or date.today()
+    fecha_ini = fecha_ini or fecha_fin - timedelta(days=max_dias - 1)
+    if fecha_ini > fecha_fin:
+        raise HTTPException(status_code=400, detail="fecha_ini debe ser anterior a fecha_fin")
+    if (fecha_fin - fecha_ini).days + 1 > max_dias:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango máximo es de {max_dias} días; use fecha_ini/fecha_fin más cercanas"
+        )
+    return fecha_ini, fecha_fin
@@ -0,0 +1,190 @@
+"""Opt-in sampling profiler for slow API requests.
+
+When enabled, a ``profiler_sample_rate`` fraction of /api/ requests runs
+under pyinstrument (statistical sampling every ``profiler_interval_ms``,
+following the request's task across awaits). Profiles of requests slower
+than ``profiler_threshold_ms`` are saved to ``profiler_dir`` (the newest
+``profiler_max_files`` are kept) and rendered on demand by the admin
+endpoints (which require EP_SECURITY_METRICS_TOKEN); the rest are
+discarded.
+
+The settings can be changed without a restart: ``PUT
+/api/v1/admin/perfilador`` writes them to ``control.json`` in the profile
+directory, which every worker re-reads when it changes. Only the event
+loop thread is sampled, so time inside sync endpoints (threadpool) shows
+up as a wait.
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer
+    from pyinstrument.session import Session
+except ImportError:  # pragma: no cover - the profiler is optional
+    Profiler = None
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.loader import load_api_settings
+
+logger = logging.getLogger(__name__)
+
+api_settings = load_api_settings()
+
+EXTENSION = ".pyisession"
+
+# Admin endpoints (rendering profiles is slow) are never profiled
+PREFIJO_ADMIN = "/api/v1/admin/"
+
+# Seconds between checks of control.json
+REVISION_SEGUNDOS = 2.0
+
+
+class Perfilador:
+    """Runtime-adjustable profiler configuration and profile storage."""
+
+    def __init__(self):
+        """Start from the settings.yaml values (overridden by control.json)."""
+        self.directorio = api_settings.resolve_path(api_settings.profiler_dir)
+        self.config: Dict[str, Any] = {
+            "activo": api_settings.profiler_enabled,
+            "umbral_ms": api_settings.profiler_threshold_ms,
+            "muestreo": api_settings.profiler_sample_rate,
+        }
+        self._control_mtime: Optional[float] = None
+        self._proxima_revision = 0.0
+        self.guardados = 0
+
+    @property
+    def _control(self) -> str:
+        return os.path.join(self.directorio, "control.json")
+
+    def _revisar(self):
+        """Reload control.json if it changed (at most every REVISION_SEGUNDOS)."""
+        ahora = time.monotonic()
+        if ahora < self._proxima_revision:
+            return
+        self._proxima_revision = ahora + REVISION_SEGUNDOS
+        try:
+            mtime = os.stat(self._control).st_mtime
+        except OSError:
+            return
+        if mtime == self._control_mtime:
+            return
+        try:
+            with open(self._control, "r", encoding="utf-8") as f:
+                self.config.update(json.load(f))
+            self._control_mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"control.json del perfilador no legible ({e})")
+
+    def debe_perfilar(self) -> bool:
+        """Whether the next request should be profiled."""
+        if Profiler is None:
+            return False
+        self._revisar()
+        return self.config["activo"] and random.random() < self.config["muestreo"]
+
+    def configurar(self, activo: bool, umbral_ms: float, muestreo: float) -> Dict[str, Any]:
+        """
+        Change the settings of every worker (written to control.json).
+
+        Raises:
+            HTTPException: 501 if pyinstrument is not installed
+        """
+        if Profiler is None:
+            raise HTTPException(status_code=501, detail="Perfilador no disponible (pyinstrument no instalado)")
+        self.config = {"activo": activo, "umbral_ms": umbral_ms, "muestreo": muestreo}
+        os.makedirs(self.directorio, exist_ok=True)
+        tmp = self._control + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.config, f)
+        os.replace(tmp, self._control)
+        self._control_mtime = os.stat(self._control).st_mtime
+        logger.info(f"Perfilador configurado: {self.config}")
+        return self.estado()
+
+    def guardar(self, scope: Scope, sesion, duracion_ms: float):
+        """Save a slow request's profile and drop the oldest beyond profiler_max_files."""
+        ruta = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")[:60]
+        nombre = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{scope['method']}-{ruta}-{duracion_ms:.0f}ms{EXTENSION}"
+        os.makedirs(self.directorio, exist_ok=True)
+        sesion.save(os.path.join(self.directorio, nombre))
+        self.guardados += 1
+        for viejo in self.perfiles()[api_settings.profiler_max_files:]:
+            try:
+                os.remove(os.path.join(self.directorio, viejo["nombre"]))
+            except OSError:
+                pass
+
+    def perfiles(self) -> List[Dict[str, Any]]:
+        """Saved profiles, newest first."""
+        try:
+            nombres = [n for n in os.listdir(self.directorio) if n.endswith(EXTENSION)]
+        except OSError:
+            return []
+        return [
+            {"nombre": n, "bytes": os.path.getsize(os.path.join(self.directorio, n))}
+            for n in sorted(nombres, reverse=True)
+        ]
+
+    def renderizar(self, nombre: str, formato: str) -> str:
+        """
+        Render a saved profile as HTML (flame-style tree) or text.
+
+        Raises:
+            HTTPException: 404 for unknown profiles, 501 without pyinstrument
+        """
+        if Profiler is None:
+            raise HTTPException(status_code=501, detail="Perfilador no disponible (pyinstrument no instalado)")
+        ruta = os.path.join(self.directorio, os.path.basename(nombre))
+        if not nombre.endswith(EXTENSION) or not os.path.exists(ruta):
+            raise HTTPException(status_code=404, detail="Perfil no encontrado")
+        sesion = Session.load(ruta)
+        if formato == "html":
+            return HTMLRenderer().render(sesion)
+        return ConsoleRenderer(unicode=True, show_all=False).render(sesion)
+
+    def estado(self) -> Dict[str, Any]:
+        """Current settings and counters of this worker."""
+        self._revisar()
+        return {**self.config, "disponible": Profiler is not None, "guardados": self.guardados}
+
+
+# Process-wide profiler state
+perfilador = Perfilador()
+
+
+class PerfiladorMiddleware:
+    """ASGI middleware profiling sampled /api/ requests and keeping the slow ones."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        ruta = scope.get("path", "")
+        if (scope["type"] != "http" or not ruta.startswith("/api/") or ruta.startswith(PREFIJO_ADMIN)
+                or not perfilador.debe_perfilar()):
+            await self.app(scope, receive, send)
+            return
+        profiler = Profiler(interval=api_settings.profiler_interval_ms / 1000.0, async_mode="enabled")
+        inicio = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sesion = profiler.stop()
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            if duracion_ms >= perfilador.config["umbral_ms"]:
+                try:
+                    perfilador.guardar(scope, sesion, duracion_ms)
+                except OSError as e:
+                    logger.warning(f"No se pudo guardar el perfil ({e})")
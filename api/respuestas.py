@@ -0,0 +1,117 @@
+"""Fast JSON responses.
+
+``RespuestaJSON`` renders with orjson, including NumPy arrays/scalars and
+pandas objects (as columns of NumPy arrays), so analytics results are
+serialized directly. Endpoints with large payloads return it explicitly,
+which also skips FastAPI's ``jsonable_encoder`` pass over every row.
+"""
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from api.tiempos import medir
+
+OPCIONES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(obj: Any) -> Any:
+    """Convert values orjson does not serialize natively."""
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or non-native dtypes (strings, objects, datetime64)
+        if obj.dtype.kind in "biuf":
+            return np.ascontiguousarray(obj)
+        if obj.dtype.kind == "M":
+            return np.datetime_as_string(obj, unit="D").tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "columns") and hasattr(obj, "to_numpy"):
+        # pandas DataFrame -> {columna: valores}
+        return {str(col): obj[col].to_numpy() for col in obj.columns}
+    if hasattr(obj, "to_numpy"):
+        # pandas Series / Index
+        return obj.to_numpy()
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def serializar(contenido: Any) -> bytes:
+    """Serialize a payload to JSON bytes."""
+    return orjson.dumps(contenido, default=_por_defecto, option=OPCIONES)
+
+
+class RespuestaJSON(ORJSONResponse):
+    """orjson response with NumPy/pandas support."""
+
+    def render(self, content: Any) -> bytes:
+        with medir("serialize"):
+            return serializar(content)
+
+
+def _payloads_sinteticos():
+    """Multi-year national daily series and a municipality-level map payload."""
+    from datetime import date, timedelta
+
+    rng = np.random.default_rng(0)
+    inicio = date(2020, 1, 1)
+    dias = 5 * 365
+    serie = {
+        "serie_oficial": [
+            {"fecha": (inicio + timedelta(days=d)).isoformat(),
+             "casos": int(c), "defunciones": int(m)}
+            for d, c, m in zip(range(dias), rng.poisson(900, dias), rng.poisson(20, dias))
+        ],
+        "serie_social": {
+            "menciones": [
+                {"fecha": (inicio + timedelta(days=d)).isoformat(),
+                 "conteo": int(c), "sentimiento": round(float(s), 3)}
+                for d, c, s in zip(range(dias), rng.poisson(300, dias), rng.uniform(-1, 1, dias))
+            ]
+        },
+    }
+    n_mun = 2469
+    mapa = {
+        "municipios": [
+            {"cve_mun": f"{31000 + i:05d}", "nombre": f"Municipio {i}",
+             "casos": int(c), "defunciones": int(m), "tasa_100k": round(float(t), 2)}
+            for i, c, m, t in zip(range(n_mun), rng.poisson(400, n_mun),
+                                  rng.poisson(9, n_mun), rng.uniform(0, 900, n_mun))
+        ]
+    }
+    mapa_columnar = {
+        "cve_mun": np.array([f"{31000 + i:05d}" for i in range(n_mun)]),
+        "casos": rng.poisson(400, n_mun),
+        "defunciones": rng.poisson(9, n_mun),
+        "tasa_100k": np.round(rng.uniform(0, 900, n_mun), 2),
+    }
+    return {"timeseries": serie, "map (filas)": mapa, "map (columnas NumPy)": mapa_columnar}
+
+
+def benchmark(repeticiones: int = 50):
+    """Compare FastAPI's default JSON path with RespuestaJSON for large payloads."""
+    import time
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    print(f"{'payload':<22} {'ruta':<28} {'ms':>8} {'bytes':>10}")
+    for nombre, payload in _payloads_sinteticos().items():
+        rutas = {"orjson (RespuestaJSON)": lambda p=payload: RespuestaJSON(p).body}
+        if "NumPy" not in nombre:
+            rutas = {
+                "jsonable_encoder + json": lambda p=payload: JSONResponse(jsonable_encoder(p)).body,
+                **rutas,
+            }
+        for ruta, render in rutas.items():
+            t0 = time.perf_counter()
+            for _ in range(repeticiones):
+                cuerpo = render()
+            ms = (time.perf_counter() - t0) / repeticiones * 1000
+            print(f"{nombre:<22} {ruta:<28} {ms:>8.2f} {len(cuerpo):>10}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,238 @@
+"""Buffered writer for clinical survey submissions (sondeo_clinico).
+
+``POST /api/v1/survey`` only validates and appends the row to an
+in-process buffer; a background task writes the buffer to PostgreSQL with
+one multi-row INSERT (``unnest`` over column arrays) every
+``survey_flush_ms`` or as soon as ``survey_batch_rows`` rows are waiting.
+A campaign spike therefore costs one pool connection per batch instead
+of one transaction per submission.
+
+Rows that cannot be written yet (database down) stay buffered and are
+retried; the buffer is bounded by ``survey_max_pending`` (503 beyond it).
+A batch rejected for its data is split in halves until the offending
+rows are isolated; those are logged and dropped.
+On shutdown the buffer is flushed, and whatever still cannot be written
+is spooled to ``survey_spool_dir`` and re-queued by the next start.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - asyncpg is only required by the API image
+    asyncpg = None
+
+from fastapi import HTTPException
+
+from api.db import ERRORES_CONEXION, obtener_pool
+from config.loader import load_api_settings
+
+logger = logging.getLogger(__name__)
+
+api_settings = load_api_settings()
+
+# (ts, cve_ent, cve_mun, sintomas_observacion, nivel_actividad)
+Fila = Tuple[datetime, str, Optional[str], str, str]
+
+# Unknown municipalities are stored as NULL rather than failing the whole
+# batch on the foreign key (cve_ent is validated by the endpoint)
+SQL_INSERTAR_SONDEOS = """
+    INSERT INTO sondeo_clinico (ts, cve_ent, cve_mun, sintomas_observacion, nivel_actividad)
+    SELECT s.ts, s.cve_ent, m.cve_mun, s.sintomas, s.nivel
+    FROM unnest($1::timestamptz[], $2::char(2)[], $3::char(5)[], $4::text[], $5::text[])
+         AS s(ts, cve_ent, cve_mun, sintomas, nivel)
+    JOIN geo_entidad e ON e.cve_ent = s.cve_ent
+    LEFT JOIN geo_municipio m ON m.cve_mun = s.cve_mun
+"""
+
+# Failures that leave the batch unwritten but writable later: the pool is
+# down (503), the connection dropped, or the server is out of resources or
+# shutting down. Any other error is blamed on the batch's rows.
+ERRORES_TRANSITORIOS = (HTTPException, *ERRORES_CONEXION) + (
+    (asyncpg.InsufficientResourcesError, asyncpg.OperatorInterventionError)
+    if asyncpg is not None else ()
+)
+
+
+class EscritorSondeos:
+    """Collects survey rows and writes them in batches from a background task."""
+
+    def __init__(
+        self,
+        max_filas: int = api_settings.survey_batch_rows,
+        intervalo_ms: int = api_settings.survey_flush_ms,
+        max_pendientes: int = api_settings.survey_max_pending
+    ):
+        """
+        Initialize an empty buffer (``iniciar`` starts the flush task).
+
+        Args:
+            max_filas: Rows per INSERT; a full batch is flushed immediately
+            intervalo_ms: Longest time a row waits in the buffer
+            max_pendientes: Buffered rows before submissions are refused
+        """
+        self.max_filas = max_filas
+        self.intervalo = intervalo_ms / 1000.0
+        self.max_pendientes = max_pendientes
+        self._pendientes: List[Fila] = []
+        self._lote_lleno = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+        self._cerrando = False
+        self._fallando = False
+        self.escritas = 0
+        self.lotes = 0
+        self.descartadas = 0
+
+    def encolar(self, fila: Fila):
+        """
+        Buffer one submission.
+
+        Raises:
+            HTTPException: 503 if the buffer is full (database not keeping up)
+        """
+        if len(self._pendientes) >= self.max_pendientes:
+            raise HTTPException(
+                status_code=503,
+                detail="Sondeos temporalmente no disponibles, reintente más tarde",
+                headers={"Retry-After": "5"}
+            )
+        self._pendientes.append(fila)
+        if len(self._pendientes) >= self.max_filas:
+            self._lote_lleno.set()
+
+    async def _insertar(self, lote: List[Fila]) -> int:
+        """Write one batch in a single statement; returns the rows inserted."""
+        pool = await obtener_pool()
+        columnas = list(zip(*lote))
+        estado = await pool.execute(SQL_INSERTAR_SONDEOS, *columnas)
+        return int(estado.rsplit(" ", 1)[-1])
+
+    async def vaciar(self) -> int:
+        """
+        Write every buffered row, batch by batch.
+
+        After a transient failure the unwritten rows go back to the front
+        of the buffer and are retried on the next flush. A batch failing
+        for any other reason is bisected, and rows rejected on their own
+        are dropped.
+
+        Returns:
+            Rows written
+        """
+        escritas = 0
+        while self._pendientes:
+            lote = self._pendientes[:self.max_filas]
+            del self._pendientes[:len(lote)]
+            partes = [lote]
+            while partes:
+                parte = partes.pop()
+                try:
+                    insertadas = await self._insertar(parte)
+                except ERRORES_TRANSITORIOS as e:
+                    self._pendientes[:0] = parte + [f for p in reversed(partes) for f in p]
+                    if not self._fallando:
+                        logger.warning(f"No se pudieron escribir sondeos ({e}), se reintentará")
+                        self._fallando = True
+                    self.escritas += escritas
+                    return escritas
+                except Exception as e:
+                    if len(parte) == 1:
+                        self.descartadas += 1
+                        logger.error(f"Sondeo descartado, rechazado por la base de datos ({e}): {parte[0]!r}")
+                    else:
+                        mitad = len(parte) // 2
+                        partes += [parte[mitad:], parte[:mitad]]
+                    continue
+                if self._fallando:
+                    logger.info("Escritura de sondeos restablecida")
+                    self._fallando = False
+                if insertadas < len(parte):
+                    logger.warning(f"{len(parte) - insertadas} sondeos descartados (entidad inexistente)")
+                escritas += insertadas
+                self.lotes += 1
+        self.escritas += escritas
+        return escritas
+
+    async def _bucle(self):
+        while not self._cerrando:
+            try:
+                await asyncio.wait_for(self._lote_lleno.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_lleno.clear()
+            await self.vaciar()
+
+    def iniciar(self):
+        """Re-queue spooled rows and start the flush task (call from the lifespan)."""
+        self._cargar_respaldo()
+        self._cerrando = False
+        self._tarea = asyncio.ensure_future(self._bucle())
+
+    async def detener(self):
+        """Stop the flush task and write (or spool) everything still buffered."""
+        self._cerrando = True
+        self._lote_lleno.set()
+        if self._tarea is not None:
+            await self._tarea
+            self._tarea = None
+        await self.vaciar()
+        if self._pendientes:
+            self._guardar_respaldo()
+
+    def _directorio_respaldo(self) -> str:
+        return api_settings.resolve_path(api_settings.survey_spool_dir)
+
+    def _guardar_respaldo(self):
+        """Spool unwritten rows to a JSONL file for the next start."""
+        directorio = self._directorio_respaldo()
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"{os.getpid()}-{datetime.now():%Y%m%d%H%M%S%f}.jsonl")
+        with open(ruta, "w", encoding="utf-8") as f:
+            for ts, *resto in self._pendientes:
+                f.write(json.dumps([ts.isoformat(), *resto], ensure_ascii=False) + "\n")
+        logger.warning(f"{len(self._pendientes)} sondeos sin escribir guardados en {ruta}")
+        self._pendientes = []
+
+    def _cargar_respaldo(self):
+        """Re-queue spooled rows; each file is claimed by renaming so only one worker loads it."""
+        for ruta in glob.glob(os.path.join(self._directorio_respaldo(), "*.jsonl")):
+            reclamada = f"{ruta}.{os.getpid()}"
+            try:
+                os.rename(ruta, reclamada)
+            except OSError:
+                continue  # another worker took it
+            with open(reclamada, "r", encoding="utf-8") as f:
+                filas = [json.loads(linea) for linea in f if linea.strip()]
+            self._pendientes.extend(
+                (datetime.fromisoformat(ts), *resto) for ts, *resto in filas
+            )
+            os.remove(reclamada)
+            logger.info(f"{len(filas)} sondeos recuperados de {ruta}")
+
+    def metricas(self) -> Dict[str, int]:
+        """Counters of buffered, written and dropped rows."""
+        return {
+            "pendientes": len(self._pendientes),
+            "escritas": self.escritas,
+            "lotes": self.lotes,
+            "descartadas": self.descartadas,
+        }
+
+
+def fila_sondeo(
+    cve_ent: str,
+    cve_mun: Optional[str],
+    sintomas_observacion: str,
+    nivel_actividad: str
+) -> Fila:
+    """Build a buffered row stamped with the submission time."""
+    return (datetime.now(timezone.utc), cve_ent, cve_mun, sintomas_observacion, nivel_actividad)
+
+
+# Process-wide writer, started and stopped by the API lifespan
+escritor_sondeos = EscritorSondeos()
@@ -0,0 +1,95 @@
+"""Server-Timing breakdown of every API response.
+
+Code on the request path wraps its phases in ``medir(fase)``; the time
+spent is accumulated in a per-request dict held in a context variable
+(copied by reference into coalesced tasks and threadpool calls), and
+``TiemposMiddleware`` reports it when the response starts:
+
+    Server-Timing: cache;dur=0.21, db;desc="2 consultas";dur=14.80,
+                   serialize;dur=0.95, compute;dur=1.30, total;dur=17.26
+
+``compute`` is whatever the request spent outside the measured phases
+(handler logic, downsampling, middleware), so the parts add up to
+``total``. Durations are in milliseconds, as browsers' devtools expect.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Measured phases in the order they are reported
+FASES = ("cache", "db", "serialize", "compress")
+
+# fase -> [segundos acumulados, veces medida]
+_fases: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("fases_peticion", default=None)
+
+
+@contextmanager
+def medir(fase: str) -> Iterator[None]:
+    """Add the time spent in the block to a phase of the current request (no-op outside requests)."""
+    fases = _fases.get()
+    if fases is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        acumulado = fases.get(fase)
+        if acumulado is None:
+            fases[fase] = [time.perf_counter() - inicio, 1]
+        else:
+            acumulado[0] += time.perf_counter() - inicio
+            acumulado[1] += 1
+
+
+def server_timing(fases: Dict[str, List[float]], total: float) -> str:
+    """
+    Format a Server-Timing header value.
+
+    Args:
+        fases: Accumulated phases of a request
+        total: Seconds from request start to response start
+    """
+    partes = []
+    medido = 0.0
+    for fase in FASES:
+        if fase not in fases:
+            continue
+        segundos, veces = fases[fase]
+        medido += segundos
+        descripcion = f';desc="{int(veces)} consultas"' if fase == "db" else ""
+        partes.append(f"{fase}{descripcion};dur={segundos * 1000:.2f}")
+    partes.append(f"compute;dur={max(0.0, total - medido) * 1000:.2f}")
+    partes.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(partes)
+
+
+class TiemposMiddleware:
+    """ASGI middleware adding a Server-Timing header to /api/ responses."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        fases: Dict[str, List[float]] = {}
+        token = _fases.set(fases)
+
+        async def enviar(mensaje: Message):
+            if mensaje["type"] == "http.response.start":
+                valor = server_timing(fases, time.perf_counter() - inicio)
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"server-timing", valor.encode("latin-1")),
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _fases.reset(token)
@@ -8,6 +8,9 @@ This unified approach simplifies deployment to Azure App Service by:
 - Running a single process on port 8000
 - Eliminating the need for port 8050
 - Enabling relative API URLs ("/api/v1") for inter-service communication
+
+The dashboard runs on its own bounded thread pool (see api/montaje.py),
+so its callbacks cannot take the threads serving the API.
 """
 import sys
 import os
@@ -22,12 +25,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from starlette.middleware.wsgi import WSGIMiddleware
 from api.main import app as fastapi_app
+from api.montaje import envolver_wsgi
 from dashboard.app import build_dashboard_app
 
 # Track dashboard mount state (use list to make it mutable in closure)
-_dashboard_state = {"mounted": False}
+_dashboard_state = {"mounted": False, "wsgi": None}
 
 # Add diagnostic endpoint BEFORE mounting Dashboard
 # The endpoint will check the actual state at runtime, not at definition time
@@ -38,6 +41,7 @@ def unified_ping():
         "unified": True,
         "dash_loaded": _dashboard_state["mounted"],
         "dashboard_mount": "/" if _dashboard_state["mounted"] else None,
+        "dashboard_wsgi": _dashboard_state["wsgi"],
         "api_prefix": "/api/v1"
     }
 
@@ -49,8 +53,9 @@ try:
     # Mount the Dash Flask server onto FastAPI at root '/' path
     # This makes the Dashboard accessible at "/" and keeps API at "/api/v1/*"
     logger.info("Mounting Dash at '/' (root) - FastAPI + Dash unified")
-    fastapi_app.mount("/", WSGIMiddleware(dash_app.server))
-    logger.info("Mount completed successfully")
+    dash_asgi, _dashboard_state["wsgi"] = envolver_wsgi(dash_app.server)
+    fastapi_app.mount("/", dash_asgi)
+    logger.info(f"Mount completed successfully ({_dashboard_state['wsgi']})")
     _dashboard_state["mounted"] = True
 except Exception as e:
     logger.error(f"Failed to build or mount dashboard: {e}")
@@ -1,4 +1,34 @@
 """Configuration module for Episcopio."""
-from .loader import load_config, AppSettings, AlertSettings, Secrets
+from .loader import (
+    load_config,
+    load_analytics_settings,
+    load_cache_settings,
+    load_api_settings,
+    load_dashboard_settings,
+    load_geo_settings,
+    AppSettings,
+    AlertSettings,
+    AnalyticsSettings,
+    CacheSettings,
+    ApiSettings,
+    DashboardSettings,
+    GeoSettings,
+    Secrets,
+)
 
-__all__ = ["load_config", "AppSettings", "AlertSettings", "Secrets"]
+__all__ = [
+    "load_config",
+    "load_analytics_settings",
+    "load_cache_settings",
+    "load_api_settings",
+    "load_dashboard_settings",
+    "load_geo_settings",
+    "AppSettings",
+    "AlertSettings",
+    "AnalyticsSettings",
+    "CacheSettings",
+    "ApiSettings",
+    "DashboardSettings",
+    "GeoSettings",
+    "Secrets",
+]
@@ -3,7 +3,10 @@ from pydantic import BaseModel, Field, ConfigDict
 from pydantic_settings import BaseSettings
 import yaml
 import os
-from typing import Optional
+from typing import Optional, List
+
+# Repository root, used to resolve relative data paths from settings.yaml
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class AppSettings(BaseModel):
@@ -23,6 +26,93 @@ class AlertSettings(BaseModel):
     sentiment_negative_threshold: float = -0.2
 
 
+class AnalyticsSettings(BaseModel):
+    """Analytics configuration."""
+    moving_window_days: List[int] = [7, 14, 28]
+    correlation_window_days: int = 14
+    active_window_days: int = 14
+    cube_dir: str = "data/cubo_kpis"
+    workers: int = 0
+    detectores_dir: str = "data/detectores"
+
+    def resolve_path(self, path: str) -> str:
+        """Resolve a data path relative to the repository root."""
+        return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class CacheSettings(BaseModel):
+    """KPI/timeseries cache configuration."""
+    use_redis: bool = True
+    ttl_seconds: int = 3600
+    local_max_entries: int = 10000
+
+
+class GeoSettings(BaseModel):
+    """Simplified map geometries and vector tiles."""
+    geometrias_dir: str = "data/geometrias"
+    zooms: List[int] = [4, 6, 8]
+    tiles_zoom_min: int = 3
+    tiles_zoom_max: int = 9
+    bbox: List[float] = [-118.5, 14.4, -86.6, 32.8]
+    cache_max_age_seconds: int = 604800
+
+    def resolve_path(self, path: str) -> str:
+        """Resolve a data path relative to the repository root."""
+        return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class ApiSettings(BaseModel):
+    """API configuration."""
+    title: str = "Episcopio API"
+    description: str = "API de lectura para monitoreo epidemiológico"
+    version: str = "1.0"
+    rate_limit_per_minute: int = 60
+    rate_limit_burst: Optional[int] = None
+    rate_limit_backend: str = "redis"
+    rate_limit_exempt_paths: List[str] = ["/api/v1/health"]
+    rate_limit_exempt_ips: List[str] = ["127.0.0.1", "::1"]
+    rate_limit_trust_forwarded_for: bool = False
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_command_timeout_seconds: float = 10.0
+    db_statement_cache_size: int = 100
+    http_cache_max_age_seconds: int = 60
+    data_version_refresh_seconds: float = 5.0
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_cache_max_bytes: int = 64 * 1024 * 1024
+    export_batch_rows: int = 5000
+    export_max_concurrent: int = 2
+    survey_batch_rows: int = 500
+    survey_flush_ms: int = 250
+    survey_max_pending: int = 20000
+    survey_spool_dir: str = "data/sondeos_pendientes"
+    metrics_refresh_seconds: float = 5.0
+    profiler_enabled: bool = False
+    profiler_threshold_ms: float = 1000.0
+    profiler_sample_rate: float = 0.1
+    profiler_interval_ms: float = 1.0
+    profiler_dir: str = "data/perfiles"
+    profiler_max_files: int = 100
+
+    def resolve_path(self, path: str) -> str:
+        """Resolve a data path relative to the repository root."""
+        return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class DashboardSettings(BaseModel):
+    """Dashboard configuration (also bounds what the API returns per request)."""
+    refresh_interval_seconds: int = 300
+    default_entity: str = "31"
+    max_results: int = 100
+    max_range_days: int = 366
+    max_summary_range_days: int = 3660
+    max_points: int = 2000
+    wsgi_mode: str = "aislado"
+    wsgi_threads: int = 16
+
+
 class Secrets(BaseSettings):
     """Secrets loaded from environment variables or secrets.local.yaml."""
     
@@ -53,6 +143,8 @@ class Secrets(BaseSettings):
     # Security
     security_jwt_secret: str = Field(default="changeme_jwt_secret")
     security_cors_allowed_origins: str = Field(default="http://localhost:8050,http://localhost:8000")
+    security_api_keys: str = Field(default="")
+    security_metrics_token: Optional[str] = None
 
     model_config = ConfigDict(
         env_prefix="EP_",
@@ -72,12 +164,42 @@ def flatten_yaml_keys(d: dict, prefix: str = "") -> dict:
     return out
 
 
+def load_static_settings() -> dict:
+    """Load the non-sensitive settings.yaml as a plain dictionary."""
+    settings_path = os.path.join(os.path.dirname(__file__), "settings.yaml")
+    with open(settings_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_analytics_settings() -> AnalyticsSettings:
+    """Load the analytics section of settings.yaml."""
+    return AnalyticsSettings(**load_static_settings().get("analytics", {}))
+
+
+def load_cache_settings() -> CacheSettings:
+    """Load the cache section of settings.yaml."""
+    return CacheSettings(**load_static_settings().get("cache", {}))
+
+
+def load_geo_settings() -> GeoSettings:
+    """Load the geo section of settings.yaml."""
+    return GeoSettings(**load_static_settings().get("geo", {}))
+
+
+def load_api_settings() -> ApiSettings:
+    """Load the api section of settings.yaml."""
+    return ApiSettings(**load_static_settings().get("api", {}))
+
+
+def load_dashboard_settings() -> DashboardSettings:
+    """Load the dashboard section of settings.yaml."""
+    return DashboardSettings(**load_static_settings().get("dashboard", {}))
+
+
 def load_config():
     """Load configuration from YAML files and environment variables."""
     # Load settings.yaml
-    settings_path = os.path.join(os.path.dirname(__file__), "settings.yaml")
-    with open(settings_path, "r", encoding="utf-8") as f:
-        static_cfg = yaml.safe_load(f)
+    static_cfg = load_static_settings()
     
     app_settings = AppSettings(**static_cfg.get("app", {}))
     alert_settings = AlertSettings(**static_cfg.get("alerts", {}))
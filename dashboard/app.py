@@ -6,7 +6,23 @@ import plotly.express as px
 from datetime import datetime, timedelta
 import pandas as pd
 
-from dashboard.services.api_client import api_client
+from dashboard.services.api_client import api_client, PUNTOS_GRAFICA
+
+
+def _tarjeta_kpi(titulo, valor, nota, color):
+    """KPI card with a value and a note line."""
+    return html.Div([
+        html.H4(titulo, style={"color": "#7f8c8d"}),
+        html.H2(f"{valor:,}", style={"color": color, "margin": "10px 0"}),
+        html.P(nota, style={"color": "#7f8c8d", "fontSize": "12px"})
+    ], style={
+        "backgroundColor": "white",
+        "padding": "20px",
+        "borderRadius": "5px",
+        "boxShadow": "0 2px 4px rgba(0,0,0,0.1)",
+        "flex": "1",
+        "margin": "0 10px"
+    })
 
 
 def build_dashboard_app(requests_pathname_prefix="/"):
@@ -453,6 +469,33 @@ def build_dashboard_app(requests_pathname_prefix="/"):
             return "🎭 Modo: Datos de Muestra"
     
     
+    @app.callback(
+        Output("kpi-cards", "children"),
+        [Input("update-button", "n_clicks")],
+        [State("entidad-dropdown", "value")]
+    )
+    def update_kpi_cards(n_clicks, entidad):
+        """Update the KPI cards with one batch request (entity + national)."""
+        try:
+            entidad = entidad or "31"
+            data = api_client.get_kpis_lote([entidad, "nacional"])
+            fila = data["entidad"].index(entidad)
+            nacional = data["entidad"].index("nacional")
+            tarjetas = []
+            for titulo, campo, color in (
+                ("Casos Totales", "casos_totales", "#3498db"),
+                ("Casos Activos", "casos_activos", "#e67e22"),
+                ("Defunciones", "defunciones_totales", "#e74c3c"),
+            ):
+                valor, total = data[campo][fila], data[campo][nacional]
+                nota = f"{valor / total:.1%} del total nacional" if total else "Sin datos nacionales"
+                tarjetas.append(_tarjeta_kpi(titulo, valor, nota, color))
+            return html.Div(tarjetas, style={"display": "flex", "marginBottom": "20px"})
+        except Exception as e:
+            # Keep the current cards on error
+            return dash.no_update
+    
+    
     @app.callback(
         Output("timeseries-chart", "figure"),
         [Input("update-button", "n_clicks")],
@@ -461,7 +504,7 @@ def build_dashboard_app(requests_pathname_prefix="/"):
     def update_timeseries(n_clicks, entidad):
         """Update time series chart."""
         try:
-            data = api_client.get_timeseries(entidad=entidad)
+            data = api_client.get_timeseries(entidad=entidad, max_points=PUNTOS_GRAFICA)
             serie_oficial = data.get("serie_oficial", [])
             
             df = pd.DataFrame(serie_oficial)
@@ -497,7 +540,7 @@ def build_dashboard_app(requests_pathname_prefix="/"):
     def update_sentiment(n_clicks, entidad):
         """Update sentiment chart."""
         try:
-            data = api_client.get_timeseries(entidad=entidad)
+            data = api_client.get_timeseries(entidad=entidad, max_points=PUNTOS_GRAFICA)
             menciones = data.get("serie_social", {}).get("menciones", [])
             
             df = pd.DataFrame(menciones)
@@ -2,7 +2,7 @@
 import requests
 from requests.exceptions import RequestException, ConnectionError, Timeout
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from .sample_data_loader import sample_data_loader
 
 
@@ -27,6 +27,8 @@ from .sample_data_loader import sample_data_loader
 # Note: The default is now "/api/v1" for the unified deployment architecture.
 BASE_URL = os.getenv("EP_API_URL", "/api/v1")
 TIMEOUT = 30
+# Points requested for time series charts (the API downsamples with LTTB)
+PUNTOS_GRAFICA = int(os.getenv("EP_CHART_POINTS", "400"))
 
 
 class EpiscopioAPIClient:
@@ -47,6 +49,9 @@ class EpiscopioAPIClient:
         self.base_url = base_url.rstrip("/")
         self.use_sample_data = use_sample_data
         self.api_keys = {}
+        self.session = requests.Session()
+        # Last validators and body per URL, for conditional requests
+        self._respuestas: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
     
     def set_api_keys(self, keys: Dict[str, str]):
         """Set API keys for different platforms.
@@ -73,6 +78,39 @@ class EpiscopioAPIClient:
         """Set whether to use sample data."""
         self.use_sample_data = use_sample
     
+    def _get_condicional(self, ruta: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET with If-None-Match/If-Modified-Since, reusing the last body on 304.
+        
+        Args:
+            ruta: Path below base_url (e.g. "/api/v1/timeseries")
+            params: Query parameters
+        
+        Returns:
+            Parsed JSON body
+        """
+        params = params or {}
+        clave = (ruta, tuple(sorted(params.items())))
+        previa = self._respuestas.get(clave)
+        headers = {}
+        if previa is not None:
+            if previa["etag"]:
+                headers["If-None-Match"] = previa["etag"]
+            if previa["last_modified"]:
+                headers["If-Modified-Since"] = previa["last_modified"]
+        
+        r = self.session.get(f"{self.base_url}{ruta}", params=params, headers=headers, timeout=TIMEOUT)
+        if r.status_code == 304 and previa is not None:
+            return previa["body"]
+        r.raise_for_status()
+        body = r.json()
+        if r.headers.get("ETag") or r.headers.get("Last-Modified"):
+            self._respuestas[clave] = {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "body": body,
+            }
+        return body
+    
     def health(self) -> Dict[str, Any]:
         """Check API health."""
         if self.use_sample_data:
@@ -100,11 +138,31 @@ class EpiscopioAPIClient:
         if self.use_sample_data:
             entidad = payload.get("entidad", "31")
             return sample_data_loader.get_kpis(entidad)
-        r = requests.post(
-            f"{self.base_url}/api/v1/kpi",
-            json=payload,
-            timeout=TIMEOUT
-        )
+        params = {k: v for k, v in payload.items() if v is not None}
+        return self._get_condicional("/api/v1/kpi", params)
+    
+    def get_kpis_lote(
+        self,
+        entidades: List[str],
+        morbilidades: Optional[List[int]] = None,
+        fecha_ini: Optional[str] = None,
+        fecha_fin: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get KPIs of several entities (and "nacional") in one request.
+        
+        Returns:
+            Columnar dict: entidad, morbilidad_id, casos_totales,
+            defunciones_totales and casos_activos are parallel lists.
+        """
+        if self.use_sample_data:
+            return sample_data_loader.get_kpis_lote(entidades)
+        payload = {
+            "entidades": entidades,
+            "morbilidades": morbilidades,
+            "fecha_ini": fecha_ini,
+            "fecha_fin": fecha_fin,
+        }
+        r = self.session.post(f"{self.base_url}/api/v1/kpi/lote", json=payload, timeout=TIMEOUT)
         r.raise_for_status()
         return r.json()
     
@@ -113,9 +171,16 @@ class EpiscopioAPIClient:
         entidad: Optional[str] = None,
         morbilidad_id: Optional[int] = None,
         fecha_ini: Optional[str] = None,
-        fecha_fin: Optional[str] = None
+        fecha_fin: Optional[str] = None,
+        resolucion: Optional[str] = None,
+        max_points: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Get time series data."""
+        """Get time series data.
+        
+        Args:
+            resolucion: "dia", "semana" or "mes" (exact weekly/monthly totals)
+            max_points: Downsample the series to at most this many points
+        """
         if self.use_sample_data:
             return sample_data_loader.get_timeseries(entidad or "31")
         
@@ -128,34 +193,34 @@ class EpiscopioAPIClient:
             params["fecha_ini"] = fecha_ini
         if fecha_fin:
             params["fecha_fin"] = fecha_fin
-        
-        r = requests.get(
-            f"{self.base_url}/api/v1/timeseries",
-            params=params,
-            timeout=TIMEOUT
-        )
-        r.raise_for_status()
-        return r.json()
+        if resolucion:
+            params["resolucion"] = resolucion
+        if max_points:
+            params["max_points"] = max_points
+
+        # Follow the pagination cursor and join the pages
+        data = self._get_condicional("/api/v1/timeseries", params)
+        serie_oficial = list(data.get("serie_oficial", []))
+        menciones = list(data.get("serie_social", {}).get("menciones", []))
+        siguiente = data.get("paginacion", {}).get("siguiente")
+        while siguiente:
+            pagina = self._get_condicional("/api/v1/timeseries", {**params, "cursor": siguiente})
+            serie_oficial.extend(pagina.get("serie_oficial", []))
+            menciones.extend(pagina.get("serie_social", {}).get("menciones", []))
+            siguiente = pagina.get("paginacion", {}).get("siguiente")
+        return {"serie_oficial": serie_oficial, "serie_social": {"menciones": menciones}}
     
     def get_map_data(self) -> Dict[str, Any]:
         """Get map data by entity."""
         if self.use_sample_data:
             return {"entidades": [], "message": "Sample data mode"}
-        r = requests.get(f"{self.base_url}/api/v1/map/entidad", timeout=TIMEOUT)
-        r.raise_for_status()
-        return r.json()
+        return self._get_condicional("/api/v1/map/entidad")
     
     def get_alerts(self, estado: str = "activa") -> Dict[str, Any]:
         """Get alerts."""
         if self.use_sample_data:
             return sample_data_loader.get_alerts()
-        r = requests.get(
-            f"{self.base_url}/api/v1/alerts",
-            params={"estado": estado},
-            timeout=TIMEOUT
-        )
-        r.raise_for_status()
-        return r.json()
+        return self._get_condicional("/api/v1/alerts", {"estado": estado})
     
     def submit_survey(self, survey_data: Dict[str, Any]) -> Dict[str, Any]:
         """Submit clinical survey."""
@@ -2,7 +2,7 @@
 import json
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +65,37 @@ class SampleDataLoader:
             "variacion_defunciones": 0
         })
     
+    def get_kpis_lote(self, entidades: List[str]) -> Dict[str, Any]:
+        """Get KPIs for several entities in the API's columnar batch format.
+        
+        Args:
+            entidades: Entity codes; "nacional" sums every sample entity
+        
+        Returns:
+            Dictionary of parallel lists (entidad, casos_totales, ...).
+        """
+        kpis = self._data.get("kpis", {})
+        filas = []
+        for entidad in entidades:
+            if entidad == "nacional":
+                seleccion = list(kpis.values())
+            else:
+                seleccion = [self.get_kpis(entidad)]
+            filas.append((
+                entidad,
+                sum(k.get("casos_totales", 0) for k in seleccion),
+                sum(k.get("defunciones", 0) for k in seleccion),
+                sum(k.get("casos_activos", 0) for k in seleccion),
+            ))
+        return {
+            "entidad": [f[0] for f in filas],
+            "morbilidad_id": [None] * len(filas),
+            "casos_totales": [f[1] for f in filas],
+            "defunciones_totales": [f[2] for f in filas],
+            "casos_activos": [f[3] for f in filas],
+            "fuente": "sample_data",
+        }
+    
     def get_timeseries(self, entidad: str) -> Dict[str, Any]:
         """Get time series data for an entity.
         
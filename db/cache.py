@@ -0,0 +1,284 @@
+"""KPI and timeseries cache.
+
+Values are serialized with msgpack and stored in Redis with a TTL. When
+Redis is not configured or not reachable, an in-process cache with the
+same interface is used instead.
+
+Every entry is tagged with the (entidad, morbilidad) partitions it was
+computed from, using ``*`` as a wildcard for aggregated queries, so a
+loader commit invalidates exactly the entries that depend on it.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import msgpack
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional for local runs
+    redis = None
+
+from config.loader import load_config, load_cache_settings
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "ep"
+COMODIN = "*"
+
+Particion = Tuple[Optional[str], Optional[int]]
+
+
+def clave(recurso: str, **params: Any) -> str:
+    """
+    Build a cache key from a resource name and normalized parameters.
+
+    Args:
+        recurso: Resource name (e.g. "kpi", "timeseries")
+        **params: Query parameters; None values are omitted
+
+    Returns:
+        Cache key such as ``ep:kpi:entidad=31&morbilidad_id=5``
+    """
+    partes = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if v is not None)
+    return f"{PREFIJO}:{recurso}:{partes}"
+
+
+def etiqueta(cve_ent: Optional[str], morbilidad_id: Optional[int]) -> str:
+    """Tag key for a partition; None means "all" (wildcard)."""
+    ent = cve_ent if cve_ent is not None else COMODIN
+    morb = morbilidad_id if morbilidad_id is not None else COMODIN
+    return f"{PREFIJO}:tag:{ent}:{morb}"
+
+
+def etiquetas_afectadas(cve_ent: str, morbilidad_id: int) -> List[str]:
+    """Tags invalidated by new data in one (entidad, morbilidad) partition."""
+    return [
+        etiqueta(cve_ent, morbilidad_id),
+        etiqueta(cve_ent, None),
+        etiqueta(None, morbilidad_id),
+        etiqueta(None, None),
+    ]
+
+
+def _empacar(valor: Any) -> bytes:
+    return msgpack.packb(valor, use_bin_type=True)
+
+
+def _desempacar(datos: bytes) -> Any:
+    return msgpack.unpackb(datos, raw=False)
+
+
+class CacheLocal:
+    """In-process LRU cache backend with TTLs and tag sets."""
+
+    def __init__(self, max_entradas: int = 10000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entradas: Entries kept before the least recently used is evicted
+        """
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[str, Tuple[float, bytes, Set[str]]]" = OrderedDict()
+        self._etiquetas: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _quitar(self, key: str):
+        """Drop an entry and its tag memberships (lock held)."""
+        _, _, etiquetas = self._datos.pop(key)
+        for tag in etiquetas:
+            claves = self._etiquetas.get(tag)
+            if claves is not None:
+                claves.discard(key)
+                if not claves:
+                    del self._etiquetas[tag]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                self._quitar(key)
+                return None
+            self._datos.move_to_end(key)
+            return entrada[1]
+
+    def set(self, key: str, datos: bytes, ttl: int, etiquetas: Iterable[str]):
+        etiquetas = set(etiquetas)
+        with self._lock:
+            if key in self._datos:
+                self._quitar(key)
+            self._datos[key] = (time.monotonic() + ttl, datos, etiquetas)
+            for tag in etiquetas:
+                self._etiquetas.setdefault(tag, set()).add(key)
+            while len(self._datos) > self.max_entradas:
+                self._quitar(next(iter(self._datos)))
+
+    def invalidar(self, etiquetas: Iterable[str]) -> int:
+        with self._lock:
+            claves: Set[str] = set()
+            for tag in etiquetas:
+                claves |= self._etiquetas.get(tag, set())
+            for key in claves:
+                self._quitar(key)
+            return len(claves)
+
+
+class CacheRedis:
+    """Redis cache backend; tag sets are Redis sets of dependent keys."""
+
+    def __init__(self, cliente):
+        """Initialize the backend with a connected Redis client."""
+        self._r = cliente
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._r.get(key)
+
+    def set(self, key: str, datos: bytes, ttl: int, etiquetas: Iterable[str]):
+        pipe = self._r.pipeline(transaction=False)
+        pipe.set(key, datos, ex=ttl)
+        for tag in etiquetas:
+            pipe.sadd(tag, key)
+            # Tag sets live as long as their longest-lived entry
+            pipe.expire(tag, ttl, nx=True)
+            pipe.expire(tag, ttl, gt=True)
+        pipe.execute()
+
+    def invalidar(self, etiquetas: Iterable[str]) -> int:
+        etiquetas = list(etiquetas)
+        claves = self._r.sunion(etiquetas) if etiquetas else set()
+        pipe = self._r.pipeline(transaction=True)
+        if claves:
+            pipe.delete(*claves)
+        pipe.delete(*etiquetas)
+        pipe.execute()
+        return len(claves)
+
+
+class CacheEpiscopio:
+    """Cache facade used by analytics jobs and API endpoints."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl_segundos: int = 3600,
+        cliente=None,
+        max_entradas_local: int = 10000
+    ):
+        """
+        Initialize the cache, falling back to in-process storage if Redis is unavailable.
+
+        Args:
+            redis_url: Redis connection URL, or None to use the local backend
+            ttl_segundos: Default TTL for entries
+            cliente: Pre-built Redis-compatible client (e.g. a local stand-in)
+            max_entradas_local: Size bound of the in-process backend
+        """
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas_local = max_entradas_local
+        self.backend = CacheRedis(cliente) if cliente is not None else self._conectar(redis_url)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _conectar(self, redis_url: Optional[str]):
+        if redis is None or not redis_url:
+            return CacheLocal(self.max_entradas_local)
+        try:
+            cliente = redis.Redis.from_url(redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+            cliente.ping()
+            logger.info("Cache Redis conectado")
+            return CacheRedis(cliente)
+        except redis.RedisError as e:
+            logger.warning(f"Redis no disponible ({e}), usando cache en proceso")
+            return CacheLocal(self.max_entradas_local)
+
+    @property
+    def es_redis(self) -> bool:
+        """Whether entries are stored in Redis."""
+        return isinstance(self.backend, CacheRedis)
+
+    def obtener(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on miss or backend error."""
+        try:
+            datos = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Error leyendo cache ({e})")
+            self.fallos += 1
+            return None
+        if datos is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return _desempacar(datos)
+
+    def guardar(
+        self,
+        key: str,
+        valor: Any,
+        particiones: Iterable[Particion] = ((None, None),),
+        ttl: Optional[int] = None
+    ):
+        """
+        Store a value tagged with the partitions it depends on.
+
+        Args:
+            key: Cache key (see ``clave``)
+            valor: msgpack-serializable value
+            particiones: (cve_ent, morbilidad_id) pairs, None meaning "all"
+            ttl: TTL in seconds, or None for the default
+        """
+        etiquetas = {etiqueta(ent, morb) for ent, morb in particiones}
+        try:
+            self.backend.set(key, _empacar(valor), ttl or self.ttl_segundos, etiquetas)
+        except Exception as e:
+            logger.warning(f"Error escribiendo cache ({e})")
+
+    def metricas(self) -> Dict[str, Any]:
+        """Backend and hit/miss counters of this process."""
+        return {
+            "backend": "redis" if self.es_redis else "local",
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+    def invalidar(self, particiones: Iterable[Tuple[str, int]]) -> int:
+        """
+        Drop every entry that depends on new data in the given partitions.
+
+        Args:
+            particiones: (cve_ent, morbilidad_id) pairs committed by the loader
+
+        Returns:
+            Number of entries invalidated
+        """
+        etiquetas: Set[str] = set()
+        for cve_ent, morbilidad_id in particiones:
+            etiquetas.update(etiquetas_afectadas(cve_ent, morbilidad_id))
+        if not etiquetas:
+            return 0
+        try:
+            return self.backend.invalidar(etiquetas)
+        except Exception as e:
+            logger.warning(f"Error invalidando cache ({e})")
+            return 0
+
+
+_cache: Optional[CacheEpiscopio] = None
+
+
+def obtener_cache() -> CacheEpiscopio:
+    """Get the process-wide cache, connecting on first use."""
+    global _cache
+    if _cache is None:
+        _, _, secrets = load_config()
+        settings = load_cache_settings()
+        _cache = CacheEpiscopio(
+            secrets.redis_url if settings.use_redis else None,
+            settings.ttl_seconds,
+            max_entradas_local=settings.local_max_entries
+        )
+    return _cache
@@ -0,0 +1,21 @@
+"""PostgreSQL connection helpers for batch jobs (scheduler, analytics)."""
+import psycopg2
+
+from config.loader import load_config
+
+
+def get_connection():
+    """
+    Open a new PostgreSQL connection using the configured secrets.
+
+    Returns:
+        psycopg2 connection (caller is responsible for closing it)
+    """
+    _, _, secrets = load_config()
+    return psycopg2.connect(
+        host=secrets.postgres_host,
+        port=secrets.postgres_port,
+        dbname=secrets.postgres_database,
+        user=secrets.postgres_user,
+        password=secrets.postgres_password,
+    )
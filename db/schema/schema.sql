@@ -20,6 +20,33 @@ CREATE TABLE IF NOT EXISTS geo_municipio (
     created_at TIMESTAMPTZ DEFAULT now()
 );
 
+-- Geometrías simplificadas por zoom (ST_SimplifyPreserveTopology), generadas
+-- por etl/geometrias.py; nivel = 'entidad' (clave = cve_ent) o 'municipio'
+CREATE TABLE IF NOT EXISTS geo_simplificada (
+    nivel TEXT NOT NULL CHECK (nivel IN ('entidad', 'municipio')),
+    clave TEXT NOT NULL,
+    zoom INT NOT NULL,
+    geom GEOMETRY(MULTIPOLYGON, 4326) NOT NULL,
+    PRIMARY KEY (nivel, zoom, clave)
+);
+
+CREATE INDEX IF NOT EXISTS idx_geo_simplificada_geom ON geo_simplificada USING GIST (geom);
+
+-- Población INEGI por entidad/municipio y año (denominadores de tasas)
+-- Filas con cve_mun NULL son totales de entidad
+CREATE TABLE IF NOT EXISTS poblacion (
+    id BIGSERIAL PRIMARY KEY,
+    anio INT NOT NULL,
+    cve_ent CHAR(2) NOT NULL REFERENCES geo_entidad(cve_ent),
+    cve_mun CHAR(5) REFERENCES geo_municipio(cve_mun),
+    poblacion BIGINT NOT NULL CHECK (poblacion >= 0),
+    fuente TEXT DEFAULT 'INEGI',
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_poblacion_area_anio
+    ON poblacion(anio, cve_ent, COALESCE(cve_mun, ''));
+
 -- Catálogo de morbilidades
 CREATE TABLE IF NOT EXISTS morbilidad (
     id SERIAL PRIMARY KEY,
@@ -43,7 +70,7 @@ CREATE TABLE IF NOT EXISTS serie_oficial (
     version INT DEFAULT 1,
     created_at TIMESTAMPTZ DEFAULT now(),
     updated_at TIMESTAMPTZ DEFAULT now(),
-    UNIQUE (fecha, cve_ent, cve_mun, morbilidad_id, fuente)
+    UNIQUE NULLS NOT DISTINCT (fecha, cve_ent, cve_mun, morbilidad_id, fuente)
 );
 
 -- Índices para serie_oficial
@@ -51,6 +78,27 @@ CREATE INDEX IF NOT EXISTS idx_serie_oficial_fecha ON serie_oficial(fecha);
 CREATE INDEX IF NOT EXISTS idx_serie_oficial_entidad ON serie_oficial(cve_ent);
 CREATE INDEX IF NOT EXISTS idx_serie_oficial_morbilidad ON serie_oficial(morbilidad_id);
 CREATE INDEX IF NOT EXISTS idx_serie_oficial_semana ON serie_oficial(semana_iso);
+-- Paginación por cursor de /timeseries (nivel municipio): orden total de filas
+CREATE INDEX IF NOT EXISTS idx_serie_oficial_cursor
+    ON serie_oficial(fecha, cve_ent, (COALESCE(cve_mun, '')), id)
+    WHERE cve_ent IS NOT NULL;
+
+-- Bitácora de cambios de serie_oficial (particiones tocadas por cada carga)
+-- La escribe el cargador en la misma transacción que los datos; la consume
+-- recalcular_kpis para recalcular solo las particiones afectadas.
+CREATE TABLE IF NOT EXISTS serie_oficial_cambio (
+    id BIGSERIAL PRIMARY KEY,
+    cve_ent CHAR(2) NOT NULL,
+    morbilidad_id INT NOT NULL,
+    fecha_ini DATE NOT NULL,
+    fecha_fin DATE NOT NULL,
+    fuente TEXT NOT NULL,
+    procesado BOOLEAN DEFAULT false,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_serie_oficial_cambio_pendiente
+    ON serie_oficial_cambio(id) WHERE NOT procesado;
 
 -- Menciones en redes sociales
 CREATE TABLE IF NOT EXISTS social_menciones (
@@ -103,6 +151,7 @@ CREATE TABLE IF NOT EXISTS alerta (
 -- Índices para alertas
 CREATE INDEX IF NOT EXISTS idx_alerta_estado ON alerta(estado);
 CREATE INDEX IF NOT EXISTS idx_alerta_created ON alerta(created_at);
+CREATE INDEX IF NOT EXISTS idx_alerta_resolved ON alerta(resolved_at);
 
 -- Boletines
 CREATE TABLE IF NOT EXISTS boletin (
@@ -149,3 +198,15 @@ CREATE TABLE IF NOT EXISTS ingesta_log (
 -- Índices para ingesta_log
 CREATE INDEX IF NOT EXISTS idx_ingesta_log_fuente ON ingesta_log(fuente);
 CREATE INDEX IF NOT EXISTS idx_ingesta_log_created ON ingesta_log(created_at);
+
+-- Versión de los datos publicados (una sola fila)
+-- La incrementan el cargador, el recálculo de KPIs y la evaluación de
+-- alertas en la misma transacción que sus escrituras; la API deriva de ella
+-- los ETag/Last-Modified de sus respuestas.
+CREATE TABLE IF NOT EXISTS version_datos (
+    id INT PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO version_datos (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,22 @@
+"""Published data version, used by the API for HTTP caching.
+
+Writers bump the counter inside the transaction that changes the data
+the API serves, so a new version becomes visible exactly when the data
+does.
+"""
+
+SQL_INCREMENTAR_VERSION = """
+    UPDATE version_datos SET version = version + 1, updated_at = now() WHERE id = 1
+"""
+
+SQL_LEER_VERSION = "SELECT version, updated_at FROM version_datos WHERE id = 1"
+
+
+def incrementar_version(cur):
+    """
+    Bump the data version.
+
+    Args:
+        cur: Cursor of the transaction that writes the new data
+    """
+    cur.execute(SQL_INCREMENTAR_VERSION)
@@ -0,0 +1,230 @@
+"""Geometry pipeline for the choropleth maps.
+
+Entity and municipality MULTIPOLYGONs are simplified once per configured
+zoom with ``ST_SimplifyPreserveTopology`` (tolerance = one pixel at that
+zoom) into ``geo_simplificada``, then exported as static files:
+
+- ``{nivel}_z{zoom}.geojson``: FeatureCollection with the area code and name
+- ``tiles/{nivel}/{z}/{x}/{y}.pbf``: Mapbox Vector Tiles over the bbox
+- ``manifest.json``: zooms and a version used by the API as ETag
+
+The API serves these files with long-lived cache headers; metric values
+are fetched separately from /api/v1/map/* and joined on the client by
+``cve_ent`` / ``cve_mun``.
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Add parent directory to path for config/db imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.loader import load_geo_settings
+from db.conexion import get_connection
+
+geo_settings = load_geo_settings()
+
+# nivel -> (tabla, columna clave); fixed identifiers interpolated into SQL
+NIVELES: Dict[str, Tuple[str, str]] = {
+    "entidad": ("geo_entidad", "cve_ent"),
+    "municipio": ("geo_municipio", "cve_mun"),
+}
+
+SQL_SIMPLIFICAR = """
+    INSERT INTO geo_simplificada (nivel, clave, zoom, geom)
+    SELECT %(nivel)s, {columna}, %(zoom)s,
+           ST_Multi(ST_CollectionExtract(ST_MakeValid(
+               ST_SimplifyPreserveTopology(geom, %(tolerancia)s)
+           ), 3))
+    FROM {tabla}
+    WHERE geom IS NOT NULL
+    ON CONFLICT (nivel, zoom, clave) DO UPDATE SET geom = EXCLUDED.geom
+"""
+
+SQL_PURGAR = """
+    DELETE FROM geo_simplificada
+    WHERE nivel = %(nivel)s
+      AND (zoom <> ALL(%(zooms)s) OR clave NOT IN (SELECT {columna} FROM {tabla} WHERE geom IS NOT NULL))
+"""
+
+SQL_GEOJSON = """
+    SELECT json_build_object(
+        'type', 'FeatureCollection',
+        'features', COALESCE(json_agg(json_build_object(
+            'type', 'Feature',
+            'id', s.clave,
+            'properties', json_build_object('{columna}', s.clave, 'nombre', g.nombre),
+            'geometry', ST_AsGeoJSON(s.geom, %(decimales)s)::json
+        ) ORDER BY s.clave), '[]'::json)
+    )::text
+    FROM geo_simplificada s
+    JOIN {tabla} g ON g.{columna} = s.clave
+    WHERE s.nivel = %(nivel)s AND s.zoom = %(zoom)s
+"""
+
+SQL_TESELA = """
+    SELECT ST_AsMVT(t, %(nivel)s, 4096, 'geom')
+    FROM (
+        SELECT s.clave AS {columna}, g.nombre,
+               ST_AsMVTGeom(
+                   ST_Transform(s.geom, 3857), ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4096, 64, true
+               ) AS geom
+        FROM geo_simplificada s
+        JOIN {tabla} g ON g.{columna} = s.clave
+        WHERE s.nivel = %(nivel)s AND s.zoom = %(zoom)s
+          AND s.geom && ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326)
+    ) t
+    WHERE t.geom IS NOT NULL
+"""
+
+
+def tolerancia(zoom: int) -> float:
+    """Degrees per pixel of a 256 px tile at a zoom level (at the equator)."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def decimales(zoom: int) -> int:
+    """Coordinate decimals that keep sub-pixel precision at a zoom level."""
+    return max(1, math.ceil(-math.log10(tolerancia(zoom))) + 1)
+
+
+def zoom_simplificado(z: int, zooms: List[int]) -> int:
+    """Most detailed simplification level not finer than tile zoom ``z``."""
+    candidatos = [zoom for zoom in sorted(zooms) if zoom <= z]
+    return candidatos[-1] if candidatos else min(zooms)
+
+
+def teselas(z: int, bbox: List[float]) -> List[Tuple[int, int]]:
+    """XYZ tiles covering a lon/lat bbox at zoom z."""
+    oeste, sur, este, norte = bbox
+    n = 2 ** z
+
+    def x_de(lon: float) -> int:
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def y_de(lat: float) -> int:
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(rad)) / math.pi) / 2.0 * n)))
+
+    return [
+        (x, y)
+        for x in range(x_de(oeste), x_de(este) + 1)
+        for y in range(y_de(norte), y_de(sur) + 1)
+    ]
+
+
+def _escribir(ruta: str, datos: bytes):
+    """Write a file atomically (readers never see it half written)."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, ruta)
+
+
+def simplificar(conn, niveles: List[str], zooms: List[int]):
+    """Recompute geo_simplificada for every level and zoom in one transaction."""
+    try:
+        with conn.cursor() as cur:
+            for nivel in niveles:
+                tabla, columna = NIVELES[nivel]
+                cur.execute(SQL_PURGAR.format(tabla=tabla, columna=columna), {"nivel": nivel, "zooms": zooms})
+                for zoom in zooms:
+                    cur.execute(
+                        SQL_SIMPLIFICAR.format(tabla=tabla, columna=columna),
+                        {"nivel": nivel, "zoom": zoom, "tolerancia": tolerancia(zoom)}
+                    )
+                    print(f"[INFO] {nivel} z{zoom}: {cur.rowcount} geometrías simplificadas "
+                          f"(tolerancia {tolerancia(zoom):.5f}°)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def exportar(conn, niveles: List[str], zooms: List[int], directorio: str) -> Dict[str, int]:
+    """
+    Write the static GeoJSON files and vector tiles.
+
+    Returns:
+        Dict with the number of GeoJSON files, tiles and bytes written
+    """
+    resumen = {"geojson": 0, "teselas": 0, "bytes": 0}
+    digest = hashlib.sha1()
+    with conn.cursor() as cur:
+        for nivel in niveles:
+            tabla, columna = NIVELES[nivel]
+            for zoom in zooms:
+                cur.execute(
+                    SQL_GEOJSON.format(tabla=tabla, columna=columna),
+                    {"nivel": nivel, "zoom": zoom, "decimales": decimales(zoom)}
+                )
+                datos = cur.fetchone()[0].encode()
+                _escribir(os.path.join(directorio, f"{nivel}_z{zoom}.geojson"), datos)
+                digest.update(datos)
+                resumen["geojson"] += 1
+                resumen["bytes"] += len(datos)
+
+            for z in range(geo_settings.tiles_zoom_min, geo_settings.tiles_zoom_max + 1):
+                zoom = zoom_simplificado(z, zooms)
+                for x, y in teselas(z, geo_settings.bbox):
+                    cur.execute(
+                        SQL_TESELA.format(tabla=tabla, columna=columna),
+                        {"nivel": nivel, "zoom": zoom, "z": z, "x": x, "y": y}
+                    )
+                    datos = bytes(cur.fetchone()[0] or b"")
+                    if not datos:
+                        continue
+                    _escribir(os.path.join(directorio, "tiles", nivel, str(z), str(x), f"{y}.pbf"), datos)
+                    digest.update(datos)
+                    resumen["teselas"] += 1
+                    resumen["bytes"] += len(datos)
+
+    manifiesto = {
+        "version": digest.hexdigest()[:16],
+        "generado": datetime.now().isoformat(),
+        "niveles": niveles,
+        "zooms": zooms,
+        "tiles_zoom_min": geo_settings.tiles_zoom_min,
+        "tiles_zoom_max": geo_settings.tiles_zoom_max,
+    }
+    _escribir(os.path.join(directorio, "manifest.json"), json.dumps(manifiesto, indent=2).encode())
+    return resumen
+
+
+def generar_geometrias(niveles: List[str] = None) -> Dict[str, int]:
+    """
+    Run the geometry pipeline: simplify in PostGIS, then export GeoJSON and tiles.
+
+    Args:
+        niveles: Levels to generate (default: entidad and municipio)
+
+    Returns:
+        Summary of files written
+    """
+    niveles = niveles or list(NIVELES)
+    zooms = sorted(geo_settings.zooms)
+    directorio = geo_settings.resolve_path(geo_settings.geometrias_dir)
+    t0 = time.perf_counter()
+    print(f"[{datetime.now()}] Generando geometrías simplificadas ({', '.join(niveles)}; zooms {zooms})...")
+
+    conn = get_connection()
+    try:
+        simplificar(conn, niveles, zooms)
+        resumen = exportar(conn, niveles, zooms, directorio)
+    finally:
+        conn.close()
+
+    print(f"[INFO] {resumen['geojson']} GeoJSON y {resumen['teselas']} teselas "
+          f"({resumen['bytes'] / 1e6:.1f} MB) en {directorio} "
+          f"[{time.perf_counter() - t0:.1f} s]")
+    return resumen
+
+
+if __name__ == "__main__":
+    generar_geometrias(sys.argv[1:] or None)
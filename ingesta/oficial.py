@@ -1,25 +1,175 @@
 """Official data ingestion connectors."""
 import requests
-from datetime import datetime
-from typing import Dict, Any, List
+from datetime import date, datetime
+from typing import Dict, Any, List, Tuple
+import sys
+import os
 
+# Add parent directory to path for db imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def fetch_dge():
+from psycopg2.extras import execute_values
+
+from db.cache import obtener_cache
+from db.conexion import get_connection
+from db.version import incrementar_version
+
+
+SQL_UPSERT_SERIE_OFICIAL = """
+    INSERT INTO serie_oficial AS s
+        (fecha, semana_iso, cve_ent, cve_mun, morbilidad_id, casos, defunciones, fuente)
+    VALUES %s
+    ON CONFLICT (fecha, cve_ent, cve_mun, morbilidad_id, fuente) DO UPDATE
+        SET casos = EXCLUDED.casos,
+            defunciones = EXCLUDED.defunciones,
+            version = s.version + 1,
+            updated_at = now()
+        WHERE (s.casos, s.defunciones) IS DISTINCT FROM (EXCLUDED.casos, EXCLUDED.defunciones)
+    RETURNING fecha, cve_ent, morbilidad_id
+"""
+
+
+def descargar_dge() -> List[Dict[str, Any]]:
     """
-    Fetch data from DGE (Dirección General de Epidemiología).
-    
+    Download and parse the latest DGE data.
+
     MVP: Placeholder function. Production: Implement actual API/scraping.
+
+    Returns:
+        Rows with fecha, cve_ent, cve_mun, morbilidad_id, casos and defunciones keys
     """
-    print(f"[{datetime.now()}] Conectando a DGE...")
-    
     # TODO: Implement actual data fetching
     # 1. Connect to DGE API or download CSV files
     # 2. Parse and normalize data
-    # 3. Insert into database (serie_oficial table)
-    # 4. Log ingestion results
-    
-    print("[INFO] Datos DGE procesados exitosamente (mock)")
-    return {"status": "success", "filas_procesadas": 100, "filas_insertadas": 95}
+    return []
+
+
+def fetch_dge():
+    """
+    Fetch data from DGE (Dirección General de Epidemiología) and load it.
+
+    The rows are upserted into serie_oficial, the partitions they changed
+    are recorded in the same transaction, and confirmar_carga publishes
+    them.
+    """
+    print(f"[{datetime.now()}] Conectando a DGE...")
+    filas = descargar_dge()
+    if not filas:
+        print("[INFO] DGE sin datos nuevos")
+        return {"status": "success", "filas_procesadas": 0, "filas_insertadas": 0}
+
+    conn = get_connection()
+    try:
+        cambiadas = cargar_serie_oficial(conn, filas, "DGE")
+        with conn.cursor() as cur:
+            particiones = registrar_cambios(cur, cambiadas, "DGE")
+        invalidadas = confirmar_carga(conn, particiones)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(
+        f"[INFO] Datos DGE procesados: {len(cambiadas)}/{len(filas)} filas nuevas o cambiadas, "
+        f"{len(particiones)} particiones, {invalidadas} entradas de caché invalidadas"
+    )
+    return {"status": "success", "filas_procesadas": len(filas), "filas_insertadas": len(cambiadas)}
+
+
+def cargar_serie_oficial(conn, filas: List[Dict[str, Any]], fuente: str) -> List[Dict[str, Any]]:
+    """
+    Upsert rows into serie_oficial without committing.
+
+    Rows whose figures did not change are left untouched, so they are
+    neither returned nor recorded as changes. When a key is repeated the
+    last row wins.
+
+    Args:
+        conn: Connection holding the loading transaction
+        filas: Rows with fecha, cve_ent, cve_mun, morbilidad_id, casos and defunciones keys
+        fuente: Source name (e.g. "DGE")
+
+    Returns:
+        Inserted or changed rows, with fecha, cve_ent and morbilidad_id keys
+    """
+    valores = {}
+    for fila in filas:
+        fecha = date.fromisoformat(str(fila["fecha"])[:10])
+        clave = (fecha, fila["cve_ent"], fila.get("cve_mun"), fila["morbilidad_id"])
+        valores[clave] = (
+            fecha, fecha.isocalendar()[1], fila["cve_ent"], fila.get("cve_mun"), fila["morbilidad_id"],
+            int(fila.get("casos") or 0), int(fila.get("defunciones") or 0), fuente
+        )
+    with conn.cursor() as cur:
+        cambiadas = execute_values(cur, SQL_UPSERT_SERIE_OFICIAL, list(valores.values()), fetch=True)
+    return [{"fecha": f[0], "cve_ent": f[1], "morbilidad_id": f[2]} for f in cambiadas]
+
+
+def registrar_cambios(cur, filas: List[Dict[str, Any]], fuente: str) -> List[Tuple[str, int]]:
+    """
+    Record which serie_oficial partitions a load touched.
+
+    Must run on the loader's cursor, inside the same transaction as the
+    upsert, so the change log commits atomically with the data.
+
+    Args:
+        cur: Cursor of the loading transaction
+        filas: Loaded rows with fecha, cve_ent and morbilidad_id keys
+        fuente: Source name (e.g. "DGE")
+
+    Returns:
+        List of (cve_ent, morbilidad_id) partitions recorded
+    """
+    particiones: Dict[tuple, List[str]] = {}
+    for fila in filas:
+        if not fila.get("cve_ent") or fila.get("morbilidad_id") is None:
+            continue
+        clave = (fila["cve_ent"], fila["morbilidad_id"])
+        fecha = str(fila["fecha"])
+        rango = particiones.setdefault(clave, [fecha, fecha])
+        rango[0] = min(rango[0], fecha)
+        rango[1] = max(rango[1], fecha)
+
+    if particiones:
+        execute_values(
+            cur,
+            """
+            INSERT INTO serie_oficial_cambio
+                (cve_ent, morbilidad_id, fecha_ini, fecha_fin, fuente)
+            VALUES %s
+            """,
+            [(ent, morb, ini, fin, fuente) for (ent, morb), (ini, fin) in particiones.items()]
+        )
+    return list(particiones)
+
+
+def confirmar_carga(conn, particiones: List[Tuple[str, int]]) -> int:
+    """
+    Commit a load, bumping the data version, and invalidate the cache
+    entries that depend on it.
+
+    The entries are dropped before the new version is published, so no
+    client revalidating against it is served a body cached from the old
+    data, and again after the commit to drop entries refilled in between.
+    A load that changed nothing commits without bumping the version.
+
+    Args:
+        conn: Connection holding the loading transaction
+        particiones: Partitions returned by registrar_cambios
+
+    Returns:
+        Number of cache entries invalidated
+    """
+    if not particiones:
+        conn.commit()
+        return 0
+    cache = obtener_cache()
+    invalidadas = cache.invalidar(particiones)
+    with conn.cursor() as cur:
+        incrementar_version(cur)
+    conn.commit()
+    return invalidadas + cache.invalidar(particiones)
 
 
 def fetch_inegi():
@@ -33,8 +183,9 @@ def fetch_inegi():
     # TODO: Implement actual INEGI API calls
     # 1. Use INEGI API token from secrets
     # 2. Fetch population and demographic indicators
-    # 3. Store in database for KPI calculations
+    # 3. Upsert population into the poblacion table for KPI rates
     # 4. Log ingestion results
+    # indicadores_actualizados > 0 makes MotorTasas check the poblacion watermark
     
     print("[INFO] Datos INEGI procesados exitosamente (mock)")
     return {"status": "success", "indicadores_actualizados": 32}
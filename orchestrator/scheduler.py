@@ -1,7 +1,9 @@
 """Simple scheduler for MVP (alternative to Airflow)."""
 import time
 import schedule
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Optional
 import sys
 import os
 
@@ -11,7 +13,50 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ingesta.oficial import fetch_dge, fetch_inegi
 from etl.normaliza import normalizar_dge
 from analytics.kpis import recalcular_kpis
+from analytics.tasas import motor_tasas
 from analytics.alertas import evaluar_alertas
+from db.conexion import get_connection
+
+
+def registrar_etapa(nombre: str, inicio: datetime, duracion: float, estado: str, error: Optional[str]):
+    """Record a pipeline stage run in ingesta_log (exported by the API's /metrics)."""
+    try:
+        conn = get_connection()
+    except Exception as e:
+        print(f"[WARNING] No se pudo registrar la etapa {nombre}: {e}")
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO ingesta_log
+                    (fuente, fecha_inicio, fecha_fin, duracion_segundos, estado, error_mensaje)
+                VALUES (%s, %s, now(), %s, %s, %s)
+                """,
+                (f"etapa:{nombre}", inicio, round(duracion, 2), estado, error)
+            )
+        conn.commit()
+    except Exception as e:
+        print(f"[WARNING] No se pudo registrar la etapa {nombre}: {e}")
+    finally:
+        conn.close()
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Time a pipeline stage and record its duration and outcome."""
+    inicio = datetime.now()
+    t0 = time.perf_counter()
+    estado, error = "completado", None
+    try:
+        yield
+    except Exception as e:
+        estado, error = "fallido", str(e)
+        raise
+    finally:
+        duracion = time.perf_counter() - t0
+        print(f"[INFO] Etapa {nombre}: {estado} en {duracion:.1f} s")
+        registrar_etapa(nombre, inicio, duracion, estado, error)
 
 
 def job_ingesta_oficial():
@@ -22,11 +67,16 @@ def job_ingesta_oficial():
     
     try:
         # Fetch data from sources
-        fetch_dge()
-        fetch_inegi()
+        with etapa("ingesta"):
+            fetch_dge()
+            resultado_inegi = fetch_inegi()
+        
+        # Reload population denominators on the next KPI run if its rows changed
+        motor_tasas.notificar_inegi(resultado_inegi)
         
         # Normalize data
-        normalizar_dge()
+        with etapa("etl"):
+            normalizar_dge()
         
         print(f"[{datetime.now()}] Job de ingesta completado exitosamente")
     except Exception as e:
@@ -41,10 +91,12 @@ def job_analytics():
     
     try:
         # Calculate KPIs
-        recalcular_kpis()
+        with etapa("kpis"):
+            recalcular_kpis()
         
         # Evaluate alerts
-        evaluar_alertas()
+        with etapa("alertas"):
+            evaluar_alertas()
         
         print(f"[{datetime.now()}] Job de analítica completado exitosamente")
     except Exception as e:
@@ -76,6 +76,10 @@ echo "  - Health check: /api/v1/health"
 echo "  - Diagnostics: /__unified_ping"
 echo "=========================================="
 
+# Prometheus metrics shared by the gunicorn workers (cleared on every start)
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/episcopio-metrics}
+rm -rf "${PROMETHEUS_MULTIPROC_DIR}" && mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+
 # Use Gunicorn with Uvicorn workers for the unified FastAPI+Dash app
 gunicorn api.unified:app \
   --workers 2 \
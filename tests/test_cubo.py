@@ -0,0 +1,90 @@
+"""Tests for the prefix-sum KPI cube."""
+import json
+import os
+from datetime import date
+
+import numpy as np
+
+from analytics.cubo import CuboKPI
+
+
+def _cubo() -> CuboKPI:
+    cubo = CuboKPI()
+    cubo.actualizar(
+        [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 2)],
+        ["01", "01", "01", "02"],
+        [1, 1, 1, 2],
+        [5, 7, 3, 10],
+        [1, 0, 1, 2],
+    )
+    return cubo
+
+
+def test_totales_por_rango():
+    cubo = _cubo()
+    assert cubo.total("01", 1) == (15, 2)
+    assert cubo.total("01", 1, date(2024, 1, 2), date(2024, 1, 2)) == (7, 0)
+    assert cubo.total() == (25, 4)
+    assert cubo.total("02", 1) == (0, 0)
+    # Ranges are clamped to the cube's days
+    assert cubo.total("01", 1, date(2023, 1, 1), date(2030, 1, 1)) == (15, 2)
+
+
+def test_actualizar_sobrescribe_valores_absolutos():
+    cubo = _cubo()
+    cubo.actualizar([date(2024, 1, 2)], ["01"], [1], [4], [0])
+    assert cubo.total("01", 1) == (12, 2)
+    assert cubo.total("01", 1, date(2024, 1, 3), date(2024, 1, 3)) == (3, 1)
+
+
+def test_actualizar_celdas_repetidas_gana_la_ultima():
+    cubo = _cubo()
+    cubo.actualizar(
+        [date(2024, 1, 2), date(2024, 1, 2)], ["01", "01"], [1, 1], [4, 9], [0, 1]
+    )
+    assert cubo.total("01", 1) == (17, 3)
+
+
+def test_totales_lote_y_nacional():
+    cubo = _cubo()
+    casos, defunciones = cubo.totales_lote(["01", "02", None], [1, 2, 99])
+    np.testing.assert_array_equal(casos, [[15, 0, 0], [0, 10, 0], [15, 10, 0]])
+    np.testing.assert_array_equal(defunciones, [[2, 0, 0], [0, 2, 0], [2, 2, 0]])
+    casos, _ = cubo.totales_lote(["01", None], None, date(2024, 1, 2), date(2024, 1, 2))
+    np.testing.assert_array_equal(casos, [[7], [17]])
+
+
+def test_cubo_vacio():
+    casos, defunciones = CuboKPI().totales_lote(["01", None], [1])
+    assert casos.shape == (2, 1) and not casos.any() and not defunciones.any()
+    assert CuboKPI().total() == (0, 0)
+
+
+def test_promedio_movil():
+    cubo = _cubo()
+    assert cubo.promedio_movil(3, "01", 1) == (5.0, 2 / 3)
+
+
+def test_guardar_y_cargar_por_generaciones(tmp_path):
+    directorio = str(tmp_path)
+    cubo = _cubo()
+    cubo.guardar(directorio)
+    cubo.actualizar([date(2024, 1, 4)], ["01"], [1], [1], [0])
+    cubo.guardar(directorio)
+    cubo.guardar(directorio)
+
+    with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as f:
+        assert json.load(f)["generacion"] == 3
+    # The new generation and the previous one are kept, older ones removed
+    assert sorted(n for n in os.listdir(directorio) if n.startswith("g")) == ["g000002", "g000003"]
+
+    cargado = CuboKPI.cargar(directorio, mmap_mode="r")
+    assert cargado.fecha_origen == date(2024, 1, 1)
+    assert cargado.fecha_fin == date(2024, 1, 4)
+    assert cargado.total("01", 1) == (16, 2)
+    assert cargado.total("02", 2) == (10, 2)
+
+
+def test_cargar_sin_cubo(tmp_path):
+    cubo = CuboKPI.cargar(str(tmp_path))
+    assert cubo.origen is None and cubo.total() == (0, 0)
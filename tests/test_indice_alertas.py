@@ -0,0 +1,55 @@
+"""Tests for open-alert deduplication and cooldown."""
+from datetime import datetime, timedelta, timezone
+
+from analytics.indice_alertas import EntradaAlerta, IndiceAlertas, PlanAlertas
+
+AHORA = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def _indice() -> IndiceAlertas:
+    indice = IndiceAlertas(cooldown_horas=24)
+    indice._entradas = {
+        ("a1", "01001", 1): EntradaAlerta(10, True, None),
+        ("a1", "01002", 1): EntradaAlerta(11, True, None),
+        ("a1", "01003", 1): EntradaAlerta(12, False, AHORA - timedelta(hours=2)),
+        ("a1", "01004", 1): EntradaAlerta(13, False, AHORA - timedelta(hours=30)),
+        ("a2", "01", None): EntradaAlerta(14, True, None),
+    }
+    indice._cargado = True
+    return indice
+
+
+def _evidencia(area: str) -> dict:
+    return {"area": area, "morbilidad_id": 1}
+
+
+def test_planificar_nuevas_actualizadas_suprimidas_y_resueltas():
+    plan = PlanAlertas()
+    evidencias = [_evidencia(a) for a in ("01001", "01003", "01004", "01005")]
+    _indice().planificar(plan, "a1", "incremento_subito", {}, evidencias, AHORA)
+
+    assert plan.actualizadas == [(10, _evidencia("01001"))]
+    assert plan.suprimidas == 1  # 01003 resolved 2 h ago, inside the cooldown
+    assert [clave for clave, _, _, _ in plan.nuevas] == [("a1", "01004", 1), ("a1", "01005", 1)]
+    # Only the rule's own open alerts that did not trigger are resolved
+    assert plan.resueltas == [("a1", "01002", 1)]
+
+
+def test_planificar_solo_resuelve_claves_evaluadas():
+    plan = PlanAlertas()
+    _indice().planificar(plan, "a1", "incremento_subito", {}, [], AHORA, evaluadas=[("a1", "01001", 1)])
+    assert plan.resueltas == [("a1", "01001", 1)]
+
+
+def test_plan_vacio():
+    plan = PlanAlertas()
+    _indice().planificar(plan, "a3", "incremento_subito", {}, [], AHORA)
+    assert plan.vacio
+
+
+def test_purgar_olvida_enfriamientos_vencidos():
+    indice = _indice()
+    indice._purgar(AHORA)
+    assert ("a1", "01004", 1) not in indice._entradas
+    assert ("a1", "01003", 1) in indice._entradas
+    assert indice.activas == 3
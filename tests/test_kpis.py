@@ -0,0 +1,33 @@
+"""Tests for the incremental KPI change-log handling."""
+from datetime import date
+
+from analytics.kpis import _filas_particiones, fusionar_particiones
+
+
+def test_fusionar_particiones_une_rangos_por_particion():
+    cambios = [
+        (1, "01", 1, date(2024, 1, 5), date(2024, 1, 7)),
+        (2, "01", 1, date(2024, 1, 1), date(2024, 1, 3)),
+        (3, "02", 1, date(2024, 1, 2), date(2024, 1, 2)),
+        (4, "01", 2, date(2024, 1, 9), date(2024, 1, 9)),
+        (5, "01", 1, date(2024, 1, 6), date(2024, 1, 10)),
+    ]
+    assert sorted(fusionar_particiones(cambios)) == [
+        ("01", 1, date(2024, 1, 1), date(2024, 1, 10)),
+        ("01", 2, date(2024, 1, 9), date(2024, 1, 9)),
+        ("02", 1, date(2024, 1, 2), date(2024, 1, 2)),
+    ]
+
+
+def test_fusionar_particiones_vacio():
+    assert fusionar_particiones([]) == []
+
+
+def test_filas_particiones_rellena_dias_sin_datos():
+    particiones = [("01", 1, date(2024, 1, 1), date(2024, 1, 3))]
+    agregados = [(date(2024, 1, 2), "01", 1, 4, 1)]
+    assert _filas_particiones(particiones, agregados) == [
+        (date(2024, 1, 1), "01", 1, 0, 0),
+        (date(2024, 1, 2), "01", 1, 4, 1),
+        (date(2024, 1, 3), "01", 1, 0, 0),
+    ]
@@ -0,0 +1,44 @@
+"""Tests for the in-process token bucket."""
+import pytest
+
+from api import limite
+from api.limite import LimitadorLocal
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(limite.time, "monotonic", lambda: ahora[0])
+    return ahora
+
+
+def test_rafaga_y_rechazo(reloj):
+    limitador = LimitadorLocal(por_minuto=60, rafaga=3)
+    assert [limitador.consumir("a")[0] for _ in range(4)] == [True, True, True, False]
+    permitido, _, espera = limitador.consumir("a")
+    assert not permitido and espera == pytest.approx(1.0)
+    assert limitador.rechazadas == 2
+    # Clients have independent buckets
+    assert limitador.consumir("b")[0]
+
+
+def test_recarga_con_el_tiempo(reloj):
+    limitador = LimitadorLocal(por_minuto=60, rafaga=2)
+    limitador.consumir("a")
+    limitador.consumir("a")
+    assert not limitador.consumir("a")[0]
+    reloj[0] += 1.0
+    assert limitador.consumir("a")[0]
+    assert not limitador.consumir("a")[0]
+    # Never refills above the burst size
+    reloj[0] += 3600
+    assert [limitador.consumir("a")[0] for _ in range(3)] == [True, True, False]
+
+
+def test_barrido_de_cubetas_llenas(reloj):
+    limitador = LimitadorLocal(por_minuto=60, rafaga=2, max_claves=2)
+    limitador.consumir("a")
+    reloj[0] += 10
+    limitador.consumir("b")
+    limitador.consumir("c")
+    assert set(limitador._cubetas) == {"b", "c"}
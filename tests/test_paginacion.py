@@ -0,0 +1,40 @@
+"""Tests for cursor encoding and range limits."""
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from api.paginacion import acotar_rango, codificar_cursor, decodificar_cursor
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = codificar_cursor([date(2024, 3, 1), "09", "09004", 1234])
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor, 4) == [date(2024, 3, 1), "09", "09004", 1234]
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", codificar_cursor(["2024-03-01"]), codificar_cursor([1, 2])])
+def test_cursor_invalido(cursor):
+    with pytest.raises(HTTPException) as error:
+        decodificar_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+def test_acotar_rango_por_defecto():
+    assert acotar_rango(None, date(2024, 1, 31), 31) == (date(2024, 1, 1), date(2024, 1, 31))
+    ini, fin = acotar_rango(None, None, 7)
+    assert fin == date.today() and (fin - ini).days == 6
+
+
+def test_acotar_rango_explicito():
+    assert acotar_rango(date(2024, 1, 1), date(2024, 1, 31), 31) == (date(2024, 1, 1), date(2024, 1, 31))
+
+
+@pytest.mark.parametrize("ini,fin", [
+    (date(2024, 2, 1), date(2024, 1, 1)),  # inverted
+    (date(2024, 1, 1), date(2024, 2, 1)),  # 32 days
+])
+def test_acotar_rango_rechaza(ini, fin):
+    with pytest.raises(HTTPException) as error:
+        acotar_rango(ini, fin, 31)
+    assert error.value.status_code == 400
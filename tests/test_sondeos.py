@@ -0,0 +1,73 @@
+"""Tests for the batched survey writer."""
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+from api.sondeos import EscritorSondeos
+
+
+class EscritorPrueba(EscritorSondeos):
+    """Writer whose database rejects rows with cve_ent "XX" and can be taken down."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.caida = False
+        self.sentencias = []
+        self.tabla = []
+
+    async def _insertar(self, lote):
+        self.sentencias.append(len(lote))
+        if self.caida:
+            raise HTTPException(status_code=503, detail="Base de datos no disponible")
+        if any(fila[1] == "XX" for fila in lote):
+            raise ValueError("valor inválido")
+        self.tabla.extend(lote)
+        return len(lote)
+
+
+def _fila(i: int, cve_ent: str = "01"):
+    return (datetime(2024, 1, 1, tzinfo=timezone.utc), cve_ent, None, f"obs {i}", "bajo")
+
+
+def test_vaciar_escribe_por_lotes():
+    escritor = EscritorPrueba(max_filas=4, max_pendientes=100)
+    for i in range(10):
+        escritor.encolar(_fila(i))
+    assert asyncio.run(escritor.vaciar()) == 10
+    assert escritor.sentencias == [4, 4, 2]
+    assert escritor.metricas() == {"pendientes": 0, "escritas": 10, "lotes": 3, "descartadas": 0}
+
+
+def test_bisecta_y_descarta_filas_rechazadas():
+    escritor = EscritorPrueba(max_filas=8, max_pendientes=100)
+    for i in range(8):
+        escritor.encolar(_fila(i, "XX" if i in (2, 5) else "01"))
+    assert asyncio.run(escritor.vaciar()) == 6
+    assert escritor.descartadas == 2
+    assert [f[3] for f in escritor.tabla] == [f"obs {i}" for i in (0, 1, 3, 4, 6, 7)]
+    assert escritor.metricas()["pendientes"] == 0
+
+
+def test_error_transitorio_conserva_las_filas_en_orden():
+    escritor = EscritorPrueba(max_filas=3, max_pendientes=100)
+    for i in range(5):
+        escritor.encolar(_fila(i))
+    escritor.caida = True
+    assert asyncio.run(escritor.vaciar()) == 0
+    assert [f[3] for f in escritor._pendientes] == [f"obs {i}" for i in range(5)]
+    escritor.caida = False
+    assert asyncio.run(escritor.vaciar()) == 5
+    assert [f[3] for f in escritor.tabla] == [f"obs {i}" for i in range(5)]
+
+
+def test_bufer_lleno_responde_503():
+    escritor = EscritorPrueba(max_filas=10, max_pendientes=2)
+    escritor.encolar(_fila(0))
+    escritor.encolar(_fila(1))
+    try:
+        escritor.encolar(_fila(2))
+    except HTTPException as e:
+        assert e.status_code == 503
+    else:
+        raise AssertionError("se esperaba 503")
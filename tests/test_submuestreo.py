@@ -0,0 +1,37 @@
+"""Tests for LTTB downsampling."""
+from datetime import date, timedelta
+
+import numpy as np
+
+from api.submuestreo import lttb, submuestrear
+
+
+def test_lttb_conserva_extremos_y_picos():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[400] = 100.0
+    y[700] = -50.0
+    indices = lttb(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 400 in indices and 700 in indices
+
+
+def test_lttb_serie_corta_sin_cambios():
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 20), np.arange(10))
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 2), np.arange(10))
+
+
+def test_submuestrear_filas():
+    inicio = date(2024, 1, 1)
+    filas = [
+        {"fecha": (inicio + timedelta(days=i)).isoformat(), "casos": 500 if i == 123 else i % 7, "otro": i}
+        for i in range(365)
+    ]
+    resultado = submuestrear(filas, "casos", 60)
+    assert len(resultado) == 60
+    assert resultado[0] is filas[0] and resultado[-1] is filas[-1]
+    assert filas[123] in resultado
+    assert [f["fecha"] for f in resultado] == sorted(f["fecha"] for f in resultado)
+    assert submuestrear(filas[:10], "casos", 60) == filas[:10]
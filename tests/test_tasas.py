@@ -0,0 +1,75 @@
+"""Tests for per-100k rates and population reloads."""
+import numpy as np
+
+from analytics.tasas import SQL_MARCA_POBLACION, MotorTasas
+
+FILAS = [
+    (2020, "01", None, 1_000_000),
+    (2020, "02", None, 2_000_000),
+    (2020, "01", "01001", 500_000),
+    (2020, "03", "03001", 100_000),
+    (2025, "01", None, 2_000_000),
+]
+
+
+def test_cargar_filas_y_tasas():
+    motor = MotorTasas()
+    motor.cargar_filas(FILAS, "marca")
+    assert motor.cargado and motor.marca == "marca"
+    # Entities without a total row take the sum of their municipalities
+    assert motor.poblacion("entidad", 2020)[3] == 100_000
+    assert motor.poblacion("entidad", 2019)[1] == 1_000_000
+    assert motor.poblacion("entidad", 2030)[1] == 2_000_000
+    assert motor.tasa_100k(50, "01", 2020) == 5.0
+    tasas = motor.tasas_por_clave(["01", "02", None, "04"], [[10, 1], [20, 2], [31, 0], [5, 5]], anio=2020)
+    np.testing.assert_allclose(tasas, [[1.0, 0.1], [1.0, 0.1], [1.0, 0.0], [0.0, 0.0]])
+    np.testing.assert_allclose(motor.tasas_por_clave(["01001"], [[50]], "municipio", 2020), [[10.0]])
+    assert motor.tasas_por_clave([], []).shape == (0, 1)
+
+
+class _Conexion:
+    """psycopg2-like connection serving the population watermark and rows."""
+
+    def __init__(self, marca):
+        self.marca = marca
+        self.consultas = []
+
+    def cursor(self):
+        conexion = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql, *args):
+                conexion.consultas.append("marca" if sql == SQL_MARCA_POBLACION else "filas")
+
+            def fetchone(self):
+                return (conexion.marca,)
+
+            def fetchall(self):
+                return FILAS
+
+        return Cursor()
+
+
+def test_notificar_inegi_solo_recarga_si_cambio_la_poblacion():
+    motor = MotorTasas()
+    conn = _Conexion("a")
+    assert motor.asegurar_cargado(conn)
+    conn.consultas.clear()
+
+    motor.notificar_inegi({"indicadores_actualizados": 0})
+    assert not motor.asegurar_cargado(conn) and conn.consultas == []
+
+    motor.notificar_inegi({"indicadores_actualizados": 32})
+    assert not motor.asegurar_cargado(conn) and conn.consultas == ["marca"]
+
+    conn.marca = "b"
+    conn.consultas.clear()
+    motor.notificar_inegi({"indicadores_actualizados": 32})
+    assert motor.asegurar_cargado(conn)
+    assert conn.consultas == ["marca", "marca", "filas"] and motor.marca == "b"